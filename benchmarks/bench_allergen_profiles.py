@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark: one product against up to 1M user allergen profiles
+
+Profiles are random allergen subsets compiled into an AllergenProfileMatrix.
+For a sample of users the vectorized result is checked against the
+per-user _analyze_allergens / _calculate_overall_risk_score path.
+
+Usage:
+    python benchmarks/bench_allergen_profiles.py
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src.services.feature_matrix import AllergenProfileMatrix
+from src.services.hazard_knowledge_base import get_knowledge_base
+from src.services.risk_analyzer import RiskAnalyzer
+
+PRODUCT = ['Wheat Flour', 'Sugar', 'Milk Powder', 'Soy Lecithin', 'Peanuts',
+           'Sodium Benzoate', 'Artificial Color', 'Whey (milk)', 'Salt']
+
+
+def random_profiles(allergens, size, rng):
+    """Random bitsets with one to three allergens per user"""
+    bits = np.zeros((size, 1), dtype=np.uint64)
+    for _ in range(3):
+        chosen = rng.integers(0, len(allergens), size).astype(np.uint64)
+        keep = rng.random(size) < 0.6
+        bits[keep, 0] |= np.left_shift(np.uint64(1), chosen[keep])
+    return bits
+
+
+def main():
+    analyzer = RiskAnalyzer()
+    allergens = get_knowledge_base().allergens()
+    risk_analysis = analyzer._perform_comprehensive_risk_analysis(PRODUCT, [], 'food')
+    rng = np.random.default_rng(7)
+
+    print(f"{'profiles':>9} {'ms':>8} {'affected':>9}")
+
+    for size in (1_000, 100_000, 1_000_000):
+        profiles = AllergenProfileMatrix(allergens, np.arange(size), random_profiles(allergens, size, rng))
+
+        start = time.perf_counter()
+        result = analyzer.match_user_profiles(risk_analysis, profiles)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        print(f"{size:>9} {elapsed:>8.2f} {len(result['user_ids']):>9}")
+
+    # Spot-check against the per-user path
+    affected = dict(zip(result['user_ids'].tolist(), zip(result['risk_scores'], result['risk_levels'])))
+    for user_id in random.Random(7).sample(range(size), 200):
+        word = int(profiles.bitsets[user_id, 0])
+        user_allergens = [a for bit, a in enumerate(allergens) if word >> bit & 1]
+        allergen_analysis = analyzer._analyze_allergens(PRODUCT, user_allergens)
+        expected = analyzer._calculate_overall_risk_score(
+            risk_analysis['ewg_analysis'], allergen_analysis,
+            risk_analysis['additive_analysis'], risk_analysis['banned_substances']
+        )
+        if allergen_analysis['user_allergen_matches']:
+            score, level = affected[user_id]
+            assert (float(score), str(level)) == (expected['score'], expected['level'])
+        else:
+            assert user_id not in affected
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Vision response cache lookups
+
+Measures near-duplicate search in the multi-index hash table against a
+linear Hamming scan, then the latency of exact, near-duplicate and
+missed lookups of 12 MP photos in an AnnotationCache (temporary file).
+
+Usage:
+    python benchmarks/bench_annotation_cache.py [ENTRIES]
+"""
+
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from google.cloud import vision
+from PIL import Image, ImageEnhance
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src.services.annotation_cache import AnnotationCache, MultiIndexHashTable
+from benchmarks.bench_upload_optimizer import synthetic_photo
+
+MAX_DISTANCE = 4
+QUERIES = 1000
+
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rng = random.Random(0)
+    hashes = [rng.getrandbits(64) for _ in range(entries)]
+    index = MultiIndexHashTable(MAX_DISTANCE)
+    for entry_id, value in enumerate(hashes):
+        index.add(entry_id, value)
+
+    # Queries a few bits away from stored hashes
+    queries = []
+    for value in rng.sample(hashes, QUERIES):
+        for bit in rng.sample(range(64), rng.randint(0, MAX_DISTANCE)):
+            value ^= 1 << bit
+        queries.append(value)
+
+    start = time.perf_counter()
+    found = sum(bool(index.search(query)) for query in queries)
+    index_us = (time.perf_counter() - start) / QUERIES * 1e6
+
+    scanned = queries[:20]
+    start = time.perf_counter()
+    for query in scanned:
+        [entry_id for entry_id, value in enumerate(hashes) if bin(value ^ query).count('1') <= MAX_DISTANCE]
+    linear_us = (time.perf_counter() - start) / len(scanned) * 1e6
+
+    print(f"{entries} hashes, radius {MAX_DISTANCE}: multi-index {index_us:.0f} us/query "
+          f"({found}/{QUERIES} found), linear scan {linear_us / 1000:.0f} ms/query ({linear_us / index_us:.0f}x)\n")
+
+    original = synthetic_photo(0, noise=4.0, quality=90)
+    buffer = io.BytesIO()
+    ImageEnhance.Brightness(Image.open(io.BytesIO(original))).enhance(1.05).save(buffer, format='JPEG', quality=85)
+    recompressed = buffer.getvalue()
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = AnnotationCache(os.path.join(directory, 'cache.sqlite3'), MAX_DISTANCE)
+        response = vision.AnnotateImageResponse(
+            text_annotations=[vision.EntityAnnotation(description="INGREDIENTS: sugar, salt")]
+        )
+        _, key = cache.get(original)
+        cache.put(key, response)
+
+        for name, content in (('exact', original), ('near-duplicate', recompressed),
+                              ('miss', b'not an image' * 1000)):
+            start = time.perf_counter()
+            cached, _ = cache.get(content)
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            print(f"{name:>15}: {elapsed_ms:6.1f} ms  {'hit' if cached else 'miss'}")
+        print(f"\n{cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Benchmark: vectorized catalog scoring vs. per-product analysis
+
+Scores random products drawn from the knowledge base vocabulary with
+RiskAnalyzer.score_products_batch and with the per-product
+_perform_comprehensive_risk_analysis path, checks that the scores match
+and reports throughput. Both runs use warm verdict caches.
+
+Usage:
+    python benchmarks/bench_batch_scoring.py
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src.services.hazard_knowledge_base import get_knowledge_base
+from src.services.risk_analyzer import RiskAnalyzer
+
+FILLER = ['water', 'sugar', 'sea salt', 'wheat flour', 'milk powder', 'natural flavor',
+          'may contain traces of nuts', 'e330', 'preservative (e202)', 'hydrogenated palm oil']
+
+
+def per_product(analyzer, products, user_allergens):
+    results = []
+    for ingredients in products:
+        analysis = analyzer._perform_comprehensive_risk_analysis(ingredients, user_allergens, 'food')
+        results.append((analysis['ewg_analysis']['overall_score'], analysis['overall_risk_score']))
+    return results
+
+
+def main():
+    rng = random.Random(7)
+    knowledge_base = get_knowledge_base()
+    analyzer = RiskAnalyzer()
+    pool = FILLER + list(knowledge_base.hazard_table()) + knowledge_base.allergens()
+    user_allergens = ['milk', 'peanuts']
+
+    print(f"{'products':>9} {'per-product/s':>14} {'batch/s':>10} {'speedup':>8}")
+
+    for size in (100, 1_000, 10_000):
+        products = [[rng.choice(pool) for _ in range(rng.randint(5, 30))] for _ in range(size)]
+        analyzer.score_products_batch(products, user_allergens)  # warm caches
+
+        start = time.perf_counter()
+        expected = per_product(analyzer, products, user_allergens)
+        scalar = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch = analyzer.score_products_batch(products, user_allergens)
+        vectorized = time.perf_counter() - start
+
+        assert expected == [(b['ewg_analysis']['overall_score'], b['overall_risk_score']) for b in batch]
+        print(f"{size:>9} {size / scalar:>14.0f} {size / vectorized:>10.0f} {scalar / vectorized:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark: OCR-tolerant hazard lookup latency vs. table size
+
+Queries are hazard names with one or two OCR-style character errors.
+Compares FuzzyIndex with a brute-force banded Levenshtein scan over the
+whole table, then checks that real ingredients one or two edits away
+from a hazard name are not "corrected" into it.
+
+Usage:
+    python benchmarks/bench_fuzzy_index.py
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src.services.ewg_service import EWGService
+from src.services.fuzzy_index import FuzzyIndex, bounded_levenshtein
+from bench_pattern_matcher import make_table
+
+# Real ingredients that must not resolve to the hazard next to them
+NOT_MISREADS = [('sodium citrate', 'sodium nitrite'), ('potassium bromide', 'potassium bromate'),
+                ('sodium nitrate', 'sodium nitrite')]
+# OCR misreads that must still resolve
+MISREADS = [('sodlum benzoate', 'sodium benzoate'), ('sodium nitrlte', 'sodium nitrite'),
+            ('potassium bromatc', 'potassium bromate'), ('sodium benz0ote', 'sodium benzoate')]
+
+OCR_CONFUSIONS = {'i': 'l', 'l': '1', 'o': '0', 'e': 'c', 'n': 'm', 'm': 'rn', 's': '5', 'a': 'o'}
+
+
+def corrupt(name: str, rng: random.Random, edits: int) -> str:
+    """Apply OCR-style substitutions to a name"""
+    chars = list(name)
+    positions = [i for i, char in enumerate(chars) if char in OCR_CONFUSIONS]
+    for position in rng.sample(positions, min(edits, len(positions))):
+        chars[position] = OCR_CONFUSIONS[chars[position]]
+    return ''.join(chars)
+
+
+def brute_force(index: FuzzyIndex, text: str):
+    budget = index.distance_budget(text)
+    best = None
+    for name in index.names:
+        limit = best[1] - 1 if best else budget
+        if limit < 0:
+            break
+        distance = bounded_levenshtein(text, name, limit)
+        if distance <= limit and index.accepts(text, name):
+            best = (name, distance)
+    return best
+
+
+def main():
+    rng = random.Random(7)
+    print(f"{'entries':>8} {'build s':>8} {'fuzzy us':>9} {'brute us':>10} {'recall':>7}")
+
+    for size in (20, 1_000, 10_000, 100_000):
+        table = make_table(size, rng)
+
+        start = time.perf_counter()
+        index = FuzzyIndex(table)
+        build = time.perf_counter() - start
+
+        queries = [corrupt(name, rng, rng.randint(1, 2)) for name in rng.sample(table, min(200, size))]
+
+        start = time.perf_counter()
+        results = [index.find_best(query) for query in queries]
+        fuzzy = (time.perf_counter() - start) / len(queries) * 1e6
+
+        sample = queries[:max(1, 2_000 // size * 10)][:50]
+        start = time.perf_counter()
+        expected = [brute_force(index, query) for query in sample]
+        brute = (time.perf_counter() - start) / len(sample) * 1e6
+
+        assert results[:len(sample)] == expected
+        recall = sum(result is not None for result in results) / len(results)
+
+        print(f"{size:>8} {build:>8.2f} {fuzzy:>9.1f} {brute:>10.1f} {recall:>7.2f}")
+
+    service = EWGService()
+    for text, hazard in NOT_MISREADS:
+        verdict = service._lookup_normalized(text)
+        assert verdict.get('matched_chemical') != hazard, f"{text!r} resolved to {hazard!r}"
+    for text, hazard in MISREADS:
+        verdict = service._lookup_normalized(text)
+        assert verdict.get('matched_chemical') == hazard, f"{text!r} did not resolve to {hazard!r}"
+    print(f"\n{len(NOT_MISREADS)} real ingredients kept, {len(MISREADS)} misreads corrected")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Benchmark: OpenFoodFacts lookups with and without the on-disk HTTP cache
+
+Starts a local stand-in for the OpenFoodFacts API (fixed latency, ETag
+support, "product not found" for unknown barcodes) and replays a skewed
+mix of barcode lookups and searches through OpenFoodFactsService. The
+first worker process starts with an empty cache; a second process then
+replays the same mix against the shared cache file. A last pass with
+every entry expired shows 304 revalidation.
+
+Usage:
+    python benchmarks/bench_http_cache.py [LOOKUPS]
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from config import Config
+from src.services.http_cache import HTTPResponseCache
+from src.services.openfoodfacts_service import OpenFoodFactsService
+
+LATENCY = 0.05
+PRODUCTS = 200
+INGREDIENTS = ['wheat flour', 'sugar', 'palm oil', 'salt', 'cocoa', 'glucose syrup', 'soy lecithin',
+               'whey powder', 'natural flavor', 'baking soda', 'corn starch', 'sunflower oil']
+
+
+def product(code: str):
+    rng = random.Random(code)
+    return {'_id': code, 'product_name': f"Product {code}", 'brands': 'Example',
+            'categories': 'Snacks,Biscuits', 'ingredients_text': ', '.join(rng.sample(INGREDIENTS, 8)),
+            'additives_tags': ['en:e322', 'en:e500'], 'nutriments': {'energy-kcal_100g': 480, 'sugars_100g': 31}}
+
+
+class FakeOpenFoodFacts(BaseHTTPRequestHandler):
+    """Product and search endpoints with ETags"""
+
+    def do_GET(self):
+        time.sleep(LATENCY)
+        if self.path.startswith('/product/'):
+            code = self.path.split('/')[-1].split('.')[0]
+            found = int(code) < PRODUCTS
+            body = {'status': 1, 'product': product(code)} if found else {'status': 0, 'status_verbose': 'product not found'}
+        else:
+            body = {'products': [product(str(i)) for i in range(20)]}
+        payload = json.dumps(body).encode()
+        etag = '"' + hashlib.md5(payload).hexdigest() + '"'
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def workload(lookups: int):
+    """Skewed mix: popular barcodes repeat, some barcodes do not exist"""
+    rng = random.Random(11)
+    calls = []
+    for _ in range(lookups):
+        if rng.random() < 0.2:
+            calls.append(('barcode', str(rng.randint(0, PRODUCTS + 50))))
+        elif rng.random() < 0.75:
+            calls.append(('barcode', str(int(rng.paretovariate(1.2)))))
+        else:
+            calls.append(('search', rng.choice(['cookies', 'crackers', 'chocolate', 'granola'])))
+    return calls
+
+
+def replay(base_url: str, db_path: str, lookups: int, label: str):
+    """Run the workload in this process and print its timing and cache statistics"""
+    service = OpenFoodFactsService(http_cache=HTTPResponseCache(db_path))
+    service.base_url = base_url
+    start = time.perf_counter()
+    for kind, argument in workload(lookups):
+        if kind == 'barcode':
+            service.get_product_by_barcode(argument)
+        else:
+            service.search_product_by_name(argument)
+    elapsed = (time.perf_counter() - start) / lookups * 1000
+    stats = service.cache_stats()
+    print(f"{label:>22}: {elapsed:6.1f} ms/lookup  hit rate {stats['hit_rate']:.0%}  "
+          f"revalidated {stats['revalidated']:3}  saved {stats['bytes_saved'] / 1024:7.0f} KiB")
+    return stats
+
+
+def main():
+    lookups = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeOpenFoodFacts)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.path.join(directory, 'openfoodfacts_cache.sqlite3')
+
+        # No cache: every lookup is a round-trip
+        Config.OPENFOODFACTS_CACHE = False
+        service = OpenFoodFactsService()
+        service.base_url = base_url
+        start = time.perf_counter()
+        for kind, argument in workload(lookups):
+            service.get_product_by_barcode(argument) if kind == 'barcode' else service.search_product_by_name(argument)
+        print(f"{'no cache':>22}: {(time.perf_counter() - start) / lookups * 1000:6.1f} ms/lookup")
+
+        replay(base_url, db_path, lookups, 'first process')
+        worker = multiprocessing.get_context('spawn').Process(
+            target=replay, args=(base_url, db_path, lookups, 'second process (warm)')
+        )
+        worker.start()
+        worker.join()
+
+        # Age every entry past its TTL (but not past the purge age): lookups revalidate
+        # with If-None-Match and get 304s
+        cache = HTTPResponseCache(db_path)
+        age = max(Config.OPENFOODFACTS_CACHE_TTLS.values()) + 3600
+        with cache._lock:
+            cache._connection.execute("UPDATE responses SET stored = stored - ?, expires = expires - ?", (age, age))
+            cache._connection.commit()
+        replay(base_url, db_path, lookups, 'all expired')
+
+        stats = cache.stats()
+        print(f"\n{stats['entries']} entries ({stats['not_found_entries']} not found), "
+              f"{stats['body_bytes'] / 1024:.0f} KiB of bodies stored in {stats['stored_bytes'] / 1024:.0f} KiB")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark: structured ingredient parser vs. the keyword/split extraction
+
+Generates synthetic label texts (English, French, German and Spanish
+headings, nested sub-ingredients, percentages, "contains 2% or less of"
+qualifiers, allergen and "may contain" statements, trailing nutrition
+text) and parses them on one core. The
+legacy path is the find/split extraction the Vision service used before,
+which returned a flat list capped at 20 items. The target is 10,000 label
+texts per second.
+
+Usage:
+    python benchmarks/bench_ingredient_parser.py [TEXTS]
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src.services.ingredient_parser import IngredientParser
+
+TARGET_PER_SECOND = 10_000
+
+HEADINGS = ['INGREDIENTS:', 'Ingredients', 'Ingrédients :', 'Zutaten:', 'Ingredientes:']
+MAY_CONTAIN = ['May contain traces of peanuts and tree nuts.', 'Peut contenir des traces de fruits à coque.',
+               'Kann Spuren von Sellerie enthalten.', 'Puede contener trazas de leche.']
+SIMPLE = ['water', 'sugar', 'wheat flour', 'palm oil', 'salt', 'cocoa butter', 'natural flavor',
+          'citric acid', 'sodium benzoate', 'rice starch', 'glucose syrup', 'yeast', 'tomatoes',
+          'sunflower oil', 'skimmed milk powder', 'emulsifier (soy lecithin)', '1,2-hexanediol']
+COMPOUND = ['chocolate', 'enriched flour', 'seasoning', 'cream filling', 'vegetable fat']
+QUALIFIERS = ['Contains 2% or less of:', 'contains less than 2% of', '2% or less of each of the following:']
+
+# Label text and the names it must parse to
+CHECKS = [
+    ("Ingredients: flour, sugar, contains 2% or less of: salt, soda", ['flour', 'sugar', 'salt', 'soda']),
+    ("Ingredients: flour, sugar, contains less than 2% of salt, soda.", ['flour', 'sugar', 'salt', 'soda']),
+    ("Ingredients: flour, sugar. Contains less than 2% of: salt. Contains: milk.",
+     ['flour', 'sugar', 'salt', 'milk']),
+    ("Ingredients: tomatoes 45% concentrate, milk (2,5 %)", ['tomatoes concentrate', 'milk']),
+]
+
+
+def label_text(rng: random.Random) -> str:
+    """One synthetic label with an ingredient statement"""
+    items = []
+    for _ in range(rng.randint(8, 30)):
+        if rng.random() < 0.15:
+            children = ', '.join(rng.sample(SIMPLE, rng.randint(2, 4)))
+            item = f"{rng.choice(COMPOUND)} ({children})"
+        else:
+            item = rng.choice(SIMPLE)
+        if rng.random() < 0.1:
+            item += rng.choice([f" {rng.randint(1, 60)}%", f" ({rng.randint(1, 9)},{rng.randint(1, 9)} %)"])
+        items.append(item)
+    if rng.random() < 0.3:
+        position = rng.randint(len(items) // 2, len(items) - 1)
+        items[position] = f"{rng.choice(QUALIFIERS)} {items[position]}"
+
+    parts = ['NUTRITION FACTS Serving size 30 g Calories 140', f"{rng.choice(HEADINGS)} {', '.join(items)}."]
+    if rng.random() < 0.5:
+        parts.append('CONTAINS: MILK, WHEAT, SOY.')
+    if rng.random() < 0.5:
+        parts.append(rng.choice(MAY_CONTAIN))
+    parts.append('Best before: see lid. Distributed by Example Foods Inc.')
+    return '\n'.join(parts)
+
+
+def legacy_extract(text: str):
+    """Keyword find and single-separator split, as the Vision service did before"""
+    ingredients = []
+    text_lower = text.lower()
+    for keyword in ['ingredients:', 'ingredients', 'contains:', 'contains',
+                    'ingrédients:', 'composition:', 'composition']:
+        if keyword in text_lower:
+            ingredient_text = text[text_lower.find(keyword) + len(keyword):].strip()
+            for separator in [',', ';', '\n', '•', '·']:
+                if separator in ingredient_text:
+                    ingredients = [ing.strip() for ing in ingredient_text.split(separator)]
+                    break
+            ingredients = [ing for ing in ingredients if ing and len(ing) > 1]
+            break
+    return ingredients[:20]
+
+
+def per_second(func, texts):
+    start = time.perf_counter()
+    for text in texts:
+        func(text)
+    return len(texts) / (time.perf_counter() - start)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    rng = random.Random(3)
+    texts = [label_text(rng) for _ in range(count)]
+    parser = IngredientParser()
+    for text, expected in CHECKS:
+        names = parser.ingredient_names(parser.parse(text))
+        assert names == expected, (text, names)
+
+    # Warm up, then take the best of three runs
+    per_second(parser.parse, texts[:1000])
+    parsed_rate = max(per_second(parser.parse, texts) for _ in range(3))
+    legacy_rate = max(per_second(legacy_extract, texts) for _ in range(3))
+
+    sample = parser.parse(texts[0])
+    nodes = [parser.parse(text) for text in texts[:1000]]
+    nested = sum(1 for result in nodes for node in result['ingredients'] if node['children'])
+    flat = sum(len(parser.ingredient_names(result)) for result in nodes) / len(nodes)
+
+    print(f"{count} label texts, {sum(map(len, texts)) / count:.0f} characters on average")
+    print(f"legacy extraction  {legacy_rate:10,.0f} texts/s (flat, at most 20 items)")
+    print(f"structured parser  {parsed_rate:10,.0f} texts/s "
+          f"({'meets' if parsed_rate >= TARGET_PER_SECOND else 'BELOW'} the {TARGET_PER_SECOND:,}/s target)")
+    print(f"\n{flat:.1f} names per label, {nested} nested ingredients in the first 1000 labels")
+    print(f"first label: {len(sample['ingredients'])} ingredients, "
+          f"contains {sample['contains']}, may contain {sample['may_contain']}")
+
+
+if __name__ == "__main__":
+    main()
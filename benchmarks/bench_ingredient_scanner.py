@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark: single-pass ingredient scan vs. the per-category substring passes
+
+The legacy path lowercases each ingredient and runs a separate any()/in scan
+per category (allergens, cross-contact, additives, the "preservative"
+keyword, banned substances, nutrition). Named preservatives and the additive
+risk tiers are matched by substance ID, not scanned. The scanner walks each ingredient once
+through one compiled automaton. Both are timed cold (no verdict cache).
+
+Usage:
+    python benchmarks/bench_ingredient_scanner.py
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src.services.hazard_knowledge_base import get_knowledge_base
+from src.services.risk_analyzer import RiskAnalyzer
+
+FILLER = ['water', 'wheat flour', 'may contain traces of nuts', 'natural flavor',
+          'sodium benzoate (preservative)', 'high fructose corn syrup', 'salt',
+          'partially hydrogenated soybean oil', 'artificial color', 'e330',
+          'cocoa butter', 'rice starch', 'milk powder', 'vitamin c']
+
+
+def legacy_scan(categories, ingredients):
+    """One substring pass per category, as the analyzers did before"""
+    results = []
+    for ingredient in ingredients:
+        ingredient_lower = ingredient.lower().strip()
+        hits = {}
+        for category, patterns in categories.items():
+            found = tuple(pattern for pattern in patterns if pattern in ingredient_lower)
+            if found:
+                hits[category] = found
+        results.append(hits)
+    return results
+
+
+def time_per_list(func, lists):
+    start = time.perf_counter()
+    for ingredients in lists:
+        func(ingredients)
+    return (time.perf_counter() - start) / len(lists) * 1e6
+
+
+def main():
+    rng = random.Random(7)
+    knowledge_base = get_knowledge_base()
+    analyzer = RiskAnalyzer()
+    scanner = analyzer._build_scanner()
+    categories = {
+        'allergen': knowledge_base.allergens(),
+        'cross_contact': RiskAnalyzer.CROSS_CONTACT_PATTERNS,
+        'additive': RiskAnalyzer.ADDITIVE_PATTERNS,
+        'preservative': ['preservative'],
+        'banned': knowledge_base.banned_substances(),
+        **RiskAnalyzer.NUTRITION_PATTERNS
+    }
+    pool = FILLER + list(knowledge_base.hazard_table())
+
+    def fused(ingredients):
+        return [scanner.scan(ingredient.lower().strip()) for ingredient in ingredients]
+
+    print(f"{'ingredients':>11} {'legacy us':>10} {'scanner us':>11} {'speedup':>8}")
+
+    for size in (10, 100, 1_000):
+        lists = [[rng.choice(pool).title() for _ in range(size)] for _ in range(max(1, 2_000 // size))]
+        assert all(legacy_scan(categories, ingredients) == fused(ingredients) for ingredients in lists)
+
+        legacy = time_per_list(lambda ingredients: legacy_scan(categories, ingredients), lists)
+        single = time_per_list(fused, lists)
+
+        print(f"{size:>11} {legacy:>10.1f} {single:>11.1f} {legacy / single:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-image latency of the local OCR backend
+
+Runs TesseractAnnotatorClient (through VisionAIService, so upload
+optimization and text-region cropping apply) on 12 MP phone-style photos
+and prints latency, recognized words, mean confidence and the ingredients
+found. Needs the tesseract executable; with Vision credentials configured
+the same images are also sent to Cloud Vision for comparison.
+
+Usage:
+    python benchmarks/bench_ocr_backends.py [IMAGE_DIR]
+"""
+
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from config import Config
+from src.services.ocr_backends import TesseractAnnotatorClient
+from src.services.vision_ai_service import VisionAIService
+from benchmarks.bench_upload_optimizer import synthetic_photo
+
+
+def run(name: str, service: VisionAIService, corpus):
+    """Print per-image results of one backend"""
+    latencies = []
+    for image_name, content in corpus:
+        start = time.perf_counter()
+        info = service.detect_product_info(content)
+        latencies.append((time.perf_counter() - start) * 1000)
+        text_info = info.get('text_info', {})
+        print(f"{name:>10} {image_name[-20:]:>20} {latencies[-1]:8.0f} ms {text_info.get('word_count', 0):6} words "
+              f"conf {text_info.get('confidence', 0):.2f}  {', '.join(info.get('ingredients', [])[:5])}")
+    print(f"{name:>10} median {statistics.median(latencies):.0f} ms/image\n")
+
+
+def main():
+    if len(sys.argv) > 1:
+        paths = sorted(p for p in Path(sys.argv[1]).iterdir() if p.suffix.lower() in Config.ALLOWED_EXTENSIONS)
+        corpus = [(p.name, p.read_bytes()) for p in paths]
+    else:
+        corpus = [(f"synthetic-{seed}.jpg", synthetic_photo(seed, noise=4.0, quality=90)) for seed in range(3)]
+
+    if TesseractAnnotatorClient.available():
+        run('tesseract', VisionAIService(client=TesseractAnnotatorClient()), corpus)
+    else:
+        print(f"'{Config.TESSERACT_COMMAND}' not found - install Tesseract to benchmark the local backend\n")
+
+    if Config.GOOGLE_CLOUD_CREDENTIALS_PATH:
+        service = VisionAIService()
+        service.annotation_cache = None
+        run('vision', service, corpus)
+
+
+if __name__ == "__main__":
+    main()
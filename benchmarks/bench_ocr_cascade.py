@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Benchmark: tiered OCR cascade vs. sending every image to Vision
+
+Simulates a local engine (fast, garbles a share of the labels) and a
+remote engine (slow, always clean) with fake annotator clients, so no
+Tesseract or credentials are needed. Reports the escalation rate, the
+per-tier latency distribution and the time per image of both setups.
+
+Usage:
+    python benchmarks/bench_ocr_cascade.py [GARBLED_SHARE]
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+from google.cloud import vision
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src.services.ocr_backends import OCRCascadeClient
+
+LOCAL_LATENCY = 0.02
+REMOTE_LATENCY = 0.15
+IMAGES = 100
+
+LABEL_TEXT = ("INGREDIENTS: WATER, SUGAR, WHEAT FLOUR, PALM OIL, COCOA, SALT, SOY LECITHIN, "
+              "NATURAL FLAVOR, CITRIC ACID, SODIUM BENZOATE (PRESERVATIVE)")
+
+
+class FakeEngine:
+    """Annotator client returning the image's text after a fixed delay"""
+
+    def __init__(self, latency: float, garble: bool):
+        self.latency = latency
+        self.garble = garble
+
+    def batch_annotate_images(self, requests):
+        time.sleep(self.latency * len(requests))
+        responses = []
+        for request in requests:
+            text = request.image.content.decode()
+            if self.garble and text.startswith('GARBLED'):
+                text, confidence = ''.join(random.choice('xq7zk ,') for _ in text), 0.35
+            else:
+                text, confidence = text.replace('GARBLED', ''), 0.9
+            responses.append(vision.AnnotateImageResponse(
+                text_annotations=[vision.EntityAnnotation(description=text, score=confidence)]
+            ))
+        return vision.BatchAnnotateImagesResponse(responses=responses)
+
+
+def main():
+    garbled_share = float(sys.argv[1]) if len(sys.argv) > 1 else 0.2
+    random.seed(0)
+    requests = [
+        vision.AnnotateImageRequest(
+            image=vision.Image(content=(('GARBLED' if random.random() < garbled_share else '') + LABEL_TEXT).encode()),
+            features=[vision.Feature(type_=vision.Feature.Type.TEXT_DETECTION)]
+        )
+        for _ in range(IMAGES)
+    ]
+
+    remote = FakeEngine(REMOTE_LATENCY, garble=False)
+    start = time.perf_counter()
+    for request in requests:
+        remote.batch_annotate_images([request])
+    remote_only = (time.perf_counter() - start) / IMAGES * 1000
+
+    cascade = OCRCascadeClient(FakeEngine(LOCAL_LATENCY, garble=True), remote)
+    start = time.perf_counter()
+    responses = [cascade.annotate_image(request) for request in requests]
+    cascaded = (time.perf_counter() - start) / IMAGES * 1000
+
+    assert all('WATER' in response.text_annotations[0].description for response in responses)
+    stats = cascade.stats()
+    print(f"{IMAGES} images, {garbled_share:.0%} garbled by the local engine")
+    print(f"escalation rate {stats['escalation_rate']:.0%} ({stats['escalated']} of {stats['requests']})")
+    for tier, latency in stats['tiers'].items():
+        print(f"{tier:>8}: {latency['images']:4} images  p50 {latency['p50_ms']:6.1f} ms  "
+              f"p90 {latency['p90_ms']:6.1f} ms  p99 {latency['p99_ms']:6.1f} ms")
+    print(f"\nremote only {remote_only:.1f} ms/image, cascade {cascaded:.1f} ms/image "
+          f"({remote_only / cascaded:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Benchmark: ingredient extraction from the block layout vs. the flat text
+
+Builds synthetic document_text_detection responses for a packaging
+photo: a brand block, marketing copy (which mentions "ingredients"), a
+tagline opening with "Ingredients", a nutrition panel and an ingredient
+list split over two blocks in one column. Times three ways of getting the ingredients of one image:
+
+    flat        parse the whole text blob (the default OCR mode)
+    proto-plus  assemble every block's text through the proto-plus
+                wrappers, then parse the block opening with the heading
+                (no continuation blocks)
+    layout      IngredientBlockLocator on the raw protobuf, then parse
+
+and the peak memory allocated while doing it.
+
+Usage:
+    python benchmarks/bench_ocr_layout.py [IMAGES]
+"""
+
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from google.cloud import vision
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src.services.ingredient_parser import IngredientParser
+from src.services.ocr_layout import IngredientBlockLocator
+
+Break = vision.TextAnnotation.DetectedBreak.BreakType
+LINE_HEIGHT = 24
+CHAR_WIDTH = 11
+
+MARKETING = ('New improved recipe made with simple ingredients your family loves now with more crunch '
+             'and the same great taste baked fresh every day since 1952 ').split()
+NUTRITION = ('Nutrition Facts Serving size 30 g Servings per container about 12 Calories 140 Total Fat 7 g '
+             'Saturated Fat 3 g Trans Fat 0 g Cholesterol 0 mg Sodium 95 mg Total Carbohydrate 19 g '
+             'Dietary Fiber 1 g Total Sugars 9 g Protein 2 g Vitamin D 0 mcg Calcium 10 mg Iron 1 mg').split()
+INGREDIENTS = ['wheat flour', 'sugar', 'palm oil', 'cocoa', 'glucose syrup', 'salt', 'soy lecithin',
+               'natural flavor', 'baking soda', 'skimmed milk powder', 'whey', 'corn starch']
+
+
+def block(words, left, top, width):
+    """A text block of words wrapped at width, with Vision-style breaks"""
+    lines, line = [], []
+    for word in words:
+        if line and (len(' '.join(line)) + len(word) + 1) * CHAR_WIDTH > width:
+            lines.append(line)
+            line = []
+        line.append(word)
+    lines.append(line)
+
+    word_messages = []
+    for row, line in enumerate(lines):
+        x = left
+        for column, word in enumerate(line):
+            last = column == len(line) - 1
+            symbols = [vision.Symbol(text=character) for character in word]
+            symbols[-1].property = vision.TextAnnotation.TextProperty(
+                detected_break=vision.TextAnnotation.DetectedBreak(type_=Break.EOL_SURE_SPACE if last else Break.SPACE)
+            )
+            y = top + row * LINE_HEIGHT
+            word_messages.append(vision.Word(
+                symbols=symbols,
+                bounding_box=vision.BoundingPoly(vertices=[
+                    vision.Vertex(x=x, y=y), vision.Vertex(x=x + len(word) * CHAR_WIDTH, y=y),
+                    vision.Vertex(x=x + len(word) * CHAR_WIDTH, y=y + LINE_HEIGHT - 4),
+                    vision.Vertex(x=x, y=y + LINE_HEIGHT - 4)
+                ])
+            ))
+            x += (len(word) + 1) * CHAR_WIDTH
+
+    bottom = top + len(lines) * LINE_HEIGHT
+    vertices = [vision.Vertex(x=left, y=top), vision.Vertex(x=left + width, y=top),
+                vision.Vertex(x=left + width, y=bottom), vision.Vertex(x=left, y=bottom)]
+    return vision.Block(
+        paragraphs=[vision.Paragraph(words=word_messages)],
+        bounding_box=vision.BoundingPoly(vertices=vertices),
+        block_type=vision.Block.BlockType.TEXT
+    ), bottom
+
+
+def document_response(rng: random.Random) -> vision.AnnotateImageResponse:
+    """Synthetic document text detection response of one package"""
+    items = ', '.join(rng.sample(INGREDIENTS, rng.randint(6, len(INGREDIENTS)))).split()
+    half = len(items) // 2
+    blocks, texts = [], []
+
+    def add(words, left, top, width):
+        message, bottom = block(words, left, top, width)
+        blocks.append(message)
+        texts.append(' '.join(words))
+        return bottom
+
+    add(['CRUNCHY', 'COOKIES'], 40, 20, 600)
+    bottom = add(MARKETING * rng.randint(2, 4), 40, 80, 520)
+    add(['Ingredients', 'you', 'can', 'trust'], 40, bottom + 3 * LINE_HEIGHT, 520)
+    add(NUTRITION * 2, 620, 80, 400)
+    bottom = add(['INGREDIENTS:'] + items[:half], 40, 600, 520)
+    bottom = add(items[half:] + ['Contains:', 'milk,', 'wheat,', 'soy.'], 40, bottom + LINE_HEIGHT // 2, 520)
+    add(['Distributed', 'by', 'Example', 'Foods', 'Inc.'], 40, bottom + 4 * LINE_HEIGHT, 520)
+
+    full_text = '\n'.join(texts)
+    return vision.AnnotateImageResponse(
+        text_annotations=[vision.EntityAnnotation(description=full_text)],
+        full_text_annotation=vision.TextAnnotation(text=full_text, pages=[vision.Page(blocks=blocks)])
+    )
+
+
+def proto_plus_blocks(response: vision.AnnotateImageResponse):
+    """Every block's text through the proto-plus wrappers"""
+    texts = []
+    for page in response.full_text_annotation.pages:
+        for message in page.blocks:
+            words = [''.join(symbol.text for symbol in word.symbols)
+                     for paragraph in message.paragraphs for word in paragraph.words]
+            texts.append(' '.join(words))
+    return texts
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    rng = random.Random(5)
+    responses = [document_response(rng) for _ in range(count)]
+    parser = IngredientParser()
+    locator = IngredientBlockLocator()
+
+    def flat(response):
+        return parser.parse(response.text_annotations[0].description)
+
+    def proto_plus(response):
+        text = next(text for text in proto_plus_blocks(response)
+                    if parser.opens_with_heading(' '.join(text.split()[:locator.heading_words])))
+        return parser.parse(text)
+
+    def layout(response):
+        return parser.parse(locator.locate(response)['text'])
+
+    results = {}
+    for name, extract in (('flat', flat), ('proto-plus', proto_plus), ('layout', layout)):
+        start = time.perf_counter()
+        parsed = [extract(response) for response in responses]
+        elapsed = (time.perf_counter() - start) / count * 1000
+
+        tracemalloc.start()
+        extract(responses[0])
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[name] = parsed
+        print(f"{name:>10}: {elapsed:6.3f} ms/image  peak {peak / 1024:7.1f} KiB  "
+              f"{sum(len(result['ingredients']) for result in parsed) / count:.1f} ingredients/image")
+
+    # Marketing copy mentions "ingredients" before the list; only the layout skips it
+    layout_names = parser.ingredient_names(results['layout'][0])
+    expected = {word for name in INGREDIENTS for word in name.split()} | {'milk', 'wheat', 'soy'}
+    assert all(set(name.split()) <= expected for name in layout_names), layout_names
+    flat_names = parser.ingredient_names(results['flat'][0])
+    print(f"\nfirst image, layout: {layout_names}")
+    print(f"first image, flat:   {flat_names}")
+
+
+if __name__ == "__main__":
+    main()
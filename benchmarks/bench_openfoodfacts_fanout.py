@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark: concurrent search_ingredients fan-out vs. serial lookups
+
+Starts a local stand-in for the OpenFoodFacts search endpoint with a
+fixed latency and looks up the ingredients of one product (30 names,
+some repeated in another spelling) with the HTTP cache off. A
+concurrency of 1 is the serial loop; wall time should fall roughly in
+proportion to the concurrency limit.
+
+Usage:
+    python benchmarks/bench_openfoodfacts_fanout.py [LATENCY_MS]
+"""
+
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from config import Config
+from src.services.openfoodfacts_service import OpenFoodFactsService
+
+INGREDIENTS = ['wheat flour', 'sugar', 'palm oil', 'cocoa butter', 'glucose syrup', 'salt', 'soy lecithin',
+               'natural flavor', 'baking soda', 'skimmed milk powder', 'whey', 'corn starch', 'sunflower oil',
+               'citric acid', 'sodium benzoate', 'potassium sorbate', 'yeast', 'rice flour', 'oats', 'honey',
+               'vanilla extract', 'butter', 'egg', 'hazelnuts', 'almonds', 'Sugar', 'SALT', ' whey ',
+               'cocoa butter', 'Palm Oil']
+
+
+class FakeSearch(BaseHTTPRequestHandler):
+    """Search endpoint answering after a fixed delay"""
+    latency = 0.05
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        payload = json.dumps({'products': [
+            {'_id': str(i), 'product_name': f"Product {i}", 'categories': 'Snacks,Biscuits'} for i in range(5)
+        ]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def main():
+    FakeSearch.latency = (float(sys.argv[1]) if len(sys.argv) > 1 else 50) / 1000
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeSearch)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    Config.OPENFOODFACTS_CACHE = False
+    service = OpenFoodFactsService()
+    service.base_url = f"http://127.0.0.1:{server.server_port}"
+    distinct = len({ingredient.strip().lower() for ingredient in INGREDIENTS})
+    print(f"{len(INGREDIENTS)} ingredients ({distinct} distinct), {FakeSearch.latency * 1000:.0f} ms per request")
+
+    serial = None
+    for concurrency in (1, 2, 4, 8):
+        start = time.perf_counter()
+        info = service.search_ingredients(INGREDIENTS, max_concurrency=concurrency)
+        elapsed = time.perf_counter() - start
+        serial = serial or elapsed
+        assert list(info) == list(dict.fromkeys(INGREDIENTS))
+        assert all(entry['found_in_products'] == 5 for entry in info.values())
+        print(f"concurrency {concurrency}: {elapsed * 1000:6.0f} ms  ({serial / elapsed:.1f}x)")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark: partial hazard-name lookup latency vs. table size
+
+Compares the compiled PatternMatcher used by EWGService with the linear
+substring scan it replaced, for hazard tables growing from 20 to 100k
+entries. Compiled lookup latency should stay flat while the linear scan
+grows with the table.
+
+Usage:
+    python benchmarks/bench_pattern_matcher.py
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from src.services.pattern_matcher import PatternMatcher
+
+SYLLABLES = ['so', 'di', 'um', 'ben', 'zo', 'ate', 'me', 'thyl', 'pa', 'ra', 'ben',
+             'gly', 'col', 'chlo', 'ride', 'sul', 'fate', 'pro', 'pyl', 'eth', 'oxy',
+             'ly', 'cer', 'in', 'hy', 'dro', 'qui', 'none', 'tri', 'clo', 'san']
+
+QUERIES = [
+    'water', 'sugar', 'citric acid', 'natural flavors', 'modified corn starch',
+    'sodium benzoate (preservative)', 'methylparaben', 'aqua/water/eau',
+    'cetearyl alcohol', 'high fructose corn syrup', 'vitamin c (ascorbic acid)',
+    'fragrance (parfum)', 'tocopheryl acetate', 'glycerin', 'sodium chloride'
+]
+
+
+def make_table(size: int, rng: random.Random) -> list:
+    """Build a synthetic hazard table of distinct chemical-like names"""
+    names = {}
+    while len(names) < size:
+        words = [''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+                 for _ in range(rng.randint(1, 3))]
+        names[' '.join(words)] = None
+    return list(names)
+
+
+def linear_lookup(table: list, text: str):
+    for name in table:
+        if name in text or text in name:
+            return name
+    return None
+
+
+def time_per_lookup(func, queries, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            func(query)
+    return (time.perf_counter() - start) / (repeat * len(queries)) * 1e6
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'entries':>8} {'build s':>8} {'compiled us':>12} {'linear us':>10}")
+
+    for size in (20, 100, 1_000, 10_000, 100_000):
+        table = make_table(size, rng)
+
+        start = time.perf_counter()
+        matcher = PatternMatcher(table)
+        build = time.perf_counter() - start
+
+        compiled = time_per_lookup(matcher.find_first, QUERIES, 200)
+        linear = time_per_lookup(lambda q: linear_lookup(table, q), QUERIES, max(1, 20_000 // size))
+
+        for query in QUERIES:
+            assert matcher.find_first(query) == linear_lookup(table, query), query
+
+        print(f"{size:>8} {build:>8.2f} {compiled:>12.2f} {linear:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-stage latency of the OCR preprocessing presets
+
+Runs every preset of PREPROCESSING_PRESETS on 12 MP phone-style JPEGs
+(see bench_upload_optimizer.synthetic_photo) on a single core and prints
+the median milliseconds spent in each stage, next to the previous
+full-resolution fastNlMeansDenoising + equalizeHist preprocessing.
+
+Usage:
+    python benchmarks/bench_preprocessing.py [IMAGE_DIR]
+"""
+
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from config import Config
+from src.services.image_preprocessing import PREPROCESSING_PRESETS, PreprocessingPipeline
+from benchmarks.bench_upload_optimizer import synthetic_photo
+
+REPEATS = 7
+
+
+def legacy_preprocess(content: bytes) -> float:
+    """Milliseconds taken by the previous preprocessing on one image"""
+    start = time.perf_counter()
+    image = cv2.imdecode(np.frombuffer(content, dtype=np.uint8), cv2.IMREAD_COLOR)
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    cv2.equalizeHist(cv2.fastNlMeansDenoising(gray))
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    cv2.setNumThreads(1)
+
+    if len(sys.argv) > 1:
+        paths = sorted(p for p in Path(sys.argv[1]).iterdir() if p.suffix.lower() in Config.ALLOWED_EXTENSIONS)
+        corpus = [p.read_bytes() for p in paths]
+    else:
+        # Typical phone JPEGs (~1.7 MB); quality-92 sigma-6 noise (~3 MB) is a worst case for Huffman decoding
+        corpus = [synthetic_photo(seed, noise=4.0, quality=90) for seed in range(3)]
+    print(f"{len(corpus)} images, {statistics.mean(len(c) for c in corpus) / 1e6:.2f} MB average, 1 thread\n")
+
+    for preset in PREPROCESSING_PRESETS:
+        pipeline = PreprocessingPipeline(preset)
+        runs = [pipeline.run(content) for content in corpus for _ in range(REPEATS)]
+        shape = runs[0][0].shape
+        stages = list(runs[0][1])
+        medians = {stage: statistics.median(timings[stage] for _, timings in runs) for stage in stages}
+
+        breakdown = ', '.join(f"{stage} {ms:.1f}" for stage, ms in medians.items() if stage != 'total')
+        print(f"{preset:>10}: {medians['total']:6.1f} ms  output {shape[1]}x{shape[0]}  ({breakdown})")
+
+    legacy_ms = legacy_preprocess(corpus[0])
+    print(f"{'legacy':>10}: {legacy_ms:6.1f} ms  (full-resolution fastNlMeansDenoising + equalizeHist)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Benchmark: payload size and latency saved by pre-upload image optimization
+
+Without arguments, synthesizes 12 MP phone-style photos of ingredient
+panels (gradient background, sensor noise, rendered text, quality-92
+JPEG). Pass a directory to use a reference corpus of real photos instead;
+with Vision credentials configured, the ingredient lists extracted from
+the original and the optimized uploads are compared as well.
+
+Usage:
+    python benchmarks/bench_upload_optimizer.py [IMAGE_DIR]
+"""
+
+import io
+import sys
+from pathlib import Path
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from config import Config
+from src.services.image_optimizer import UploadOptimizer
+from src.services.vision_ai_service import VisionAIService
+
+PANEL_TEXT = [
+    "INGREDIENTS: WATER, SUGAR, MODIFIED CORN STARCH, CITRIC ACID,",
+    "NATURAL FLAVORS, SODIUM BENZOATE (PRESERVATIVE), RED 40, BLUE 1,",
+    "VITAMIN C (ASCORBIC ACID), HIGH FRUCTOSE CORN SYRUP, POTASSIUM SORBATE.",
+    "CONTAINS: MILK, WHEAT. MAY CONTAIN TRACES OF PEANUTS."
+]
+
+
+def synthetic_photo(seed: int, noise: float = 6.0, quality: int = 92) -> bytes:
+    """A 4000x3000 photo of an ingredient panel"""
+    rng = np.random.default_rng(seed)
+    height, width = 3000, 4000
+    gradient = np.linspace(0, 1, width, dtype=np.float32)[None, :, None]
+    base = np.array(rng.uniform(120, 230, 3), dtype=np.float32)
+    pixels = base * (0.75 + 0.25 * gradient) + rng.normal(0, noise, (height, width, 3)).astype(np.float32)
+    image = Image.fromarray(np.clip(pixels, 0, 255).astype(np.uint8))
+
+    draw = ImageDraw.Draw(image)
+    font = ImageFont.load_default(size=64)
+    for line, text in enumerate(PANEL_TEXT):
+        draw.text((300, 1100 + line * 110), text, fill=(20, 20, 20), font=font)
+
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=quality)
+    return buffer.getvalue()
+
+
+def main():
+    if len(sys.argv) > 1:
+        paths = sorted(p for p in Path(sys.argv[1]).iterdir() if p.suffix.lower() in Config.ALLOWED_EXTENSIONS)
+        corpus = [(p.name, p.read_bytes()) for p in paths]
+    else:
+        corpus = [(f"synthetic-{seed}.jpg", synthetic_photo(seed)) for seed in range(5)]
+
+    optimizer = UploadOptimizer()
+    service = VisionAIService()
+
+    print(f"{'image':>20} {'original KB':>12} {'upload KB':>10} {'ratio':>6} {'ms':>6} {'saved ms':>9} {'ingredients':>12}")
+    for name, content in corpus:
+        optimized, stats = optimizer.optimize(content, labels=True)
+
+        same = 'n/a'
+        if not service.demo_mode:
+            service.upload_optimizer = None
+            original_info = service._text_info_from_response(service.annotate_image(content))
+            optimized_info = service._text_info_from_response(service.annotate_image(optimized))
+            same = 'same' if original_info['ingredients'] == optimized_info['ingredients'] else 'DIFFERENT'
+
+        print(f"{name[-20:]:>20} {stats['original_bytes'] / 1024:>12.0f} {stats['optimized_bytes'] / 1024:>10.0f} "
+              f"{stats['compression_ratio']:>6.1f} {stats['processing_ms']:>6.0f} {stats['latency_saved_ms']:>9.0f} {same:>12}")
+
+    totals = optimizer.stats()
+    print(f"\ntotal: {totals['original_bytes'] / 1e6:.1f} MB -> {totals['optimized_bytes'] / 1e6:.2f} MB "
+          f"({totals['compression_ratio']}x), ~{totals['latency_saved_ms'] / 1000:.1f} s upload time saved "
+          f"at {Config.UPLOAD_BANDWIDTH * 8 / 1e6:.0f} Mbit/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -10,13 +10,93 @@ class Config:
     # OpenFoodFacts API
     OPENFOODFACTS_BASE_URL = "https://world.openfoodfacts.org/api/v0"
     
+    # On-disk HTTP cache for OpenFoodFacts, shared by every process on the host. Responses
+    # stay fresh for their endpoint's TTL (seconds), then are revalidated with ETag/Last-Modified;
+    # "product not found" answers are cached for OPENFOODFACTS_NOT_FOUND_TTL
+    OPENFOODFACTS_CACHE = os.getenv('OPENFOODFACTS_CACHE', 'true').lower() == 'true'
+    OPENFOODFACTS_CACHE_PATH = os.getenv(
+        'OPENFOODFACTS_CACHE_PATH', os.path.join(os.path.dirname(__file__), 'data', 'openfoodfacts_cache.sqlite3')
+    )
+    OPENFOODFACTS_CACHE_TTLS = {'search': 6 * 3600, 'product': 7 * 24 * 3600, 'default': 3600}
+    OPENFOODFACTS_NOT_FOUND_TTL = 6 * 3600
+    # Seconds past expiry an entry is kept (for revalidation and offline use) before it is purged
+    OPENFOODFACTS_CACHE_MAX_AGE = int(os.getenv('OPENFOODFACTS_CACHE_MAX_AGE', str(7 * 24 * 3600)))
+    
+    # Most OpenFoodFacts requests in flight at once (per host); search_ingredients fans out up to this
+    OPENFOODFACTS_MAX_CONCURRENCY = int(os.getenv('OPENFOODFACTS_MAX_CONCURRENCY', '8'))
+    
+    # Seconds an OpenFoodFacts request may wait to connect or between bytes of the answer,
+    # so a hung connection frees its analysis worker and its slot in the connection pool
+    OPENFOODFACTS_REQUEST_TIMEOUT = float(os.getenv('OPENFOODFACTS_REQUEST_TIMEOUT', '10'))
+    
     # EWG Database settings
     EWG_BASE_URL = "https://www.ewg.org"
     
+    # OCR backend: 'vision' (Google Cloud Vision), 'tesseract' (local, offline) or
+    # 'cascade' (Tesseract first, Vision only for results scoring below the threshold)
+    OCR_BACKEND = os.getenv('OCR_BACKEND', 'vision').lower()
+    OCR_CASCADE_THRESHOLD = float(os.getenv('OCR_CASCADE_THRESHOLD', '0.6'))
+    OCR_CASCADE_REMOTE_LABELS = os.getenv('OCR_CASCADE_REMOTE_LABELS', 'false').lower() == 'true'
+    OCR_LEXICON_PATH = os.path.join(os.path.dirname(__file__), 'data', 'ingredient_lexicon.txt')
+    TESSERACT_COMMAND = os.getenv('TESSERACT_COMMAND', 'tesseract')
+    TESSERACT_LANGUAGES = os.getenv('TESSERACT_LANGUAGES', 'eng')
+    TESSERACT_TIMEOUT = 30
+    TESSERACT_MAX_WORKERS = os.cpu_count() or 1
+    
+    # Images per batch_annotate_images request (API limit 16) and requests kept in flight
+    VISION_BATCH_SIZE = 16
+    VISION_MAX_IN_FLIGHT = int(os.getenv('VISION_MAX_IN_FLIGHT', '4'))
+    
+    # Pre-upload image optimization: long-side target (px), color, encoding, and the
+    # uplink bandwidth (bytes/s) assumed when estimating the latency saved. Grayscale
+    # only applies to text-only uploads (the text region crop); anything sent to
+    # label detection keeps its color
+    UPLOAD_OPTIMIZATION = os.getenv('UPLOAD_OPTIMIZATION', 'true').lower() == 'true'
+    UPLOAD_MAX_DIMENSION = 1600
+    UPLOAD_GRAYSCALE = True
+    UPLOAD_FORMAT = 'JPEG'
+    UPLOAD_QUALITY = 80
+    UPLOAD_BANDWIDTH = 1.25e6
+    
+    # Crop OCR uploads to the densest text block; the whole frame is still sent,
+    # as a thumbnail of this long side (px), for label detection
+    TEXT_REGION_CROP = os.getenv('TEXT_REGION_CROP', 'true').lower() == 'true'
+    TEXT_REGION_CONTEXT_DIMENSION = 640
+    # Also run text detection on the thumbnail, so the brand is read from the whole frame
+    # instead of the crop. Off by default: it bills a third Vision feature per image
+    TEXT_REGION_FRAME_TEXT = os.getenv('TEXT_REGION_FRAME_TEXT', 'false').lower() == 'true'
+    
+    # Request document text detection and read the ingredient list from the text
+    # block that starts with its heading (and the blocks continuing it below)
+    OCR_LAYOUT = os.getenv('OCR_LAYOUT', 'false').lower() == 'true'
+    
+    # Persistent cache of Vision responses, keyed by content digest and perceptual hash;
+    # images within this many bits (pHash and dHash) of a cached one reuse its response
+    VISION_CACHE = os.getenv('VISION_CACHE', 'true').lower() == 'true'
+    VISION_CACHE_PATH = os.getenv(
+        'VISION_CACHE_PATH', os.path.join(os.path.dirname(__file__), 'data', 'vision_cache.sqlite3')
+    )
+    VISION_CACHE_MAX_DISTANCE = int(os.getenv('VISION_CACHE_MAX_DISTANCE', '4'))
+    
+    # OCR preprocessing preset: 'fast', 'balanced' or 'quality'
+    PREPROCESSING_PRESET = os.getenv('PREPROCESSING_PRESET', 'balanced')
+    
+    # Pre-flight quality gate: images failing these checks are rejected before any Vision call.
+    # Sharpness is the Laplacian variance of the sharpest tile; text height is in original pixels
+    QUALITY_GATE = os.getenv('QUALITY_GATE', 'true').lower() == 'true'
+    QUALITY_MIN_DIMENSION = 480
+    QUALITY_MIN_SHARPNESS = 100.0
+    QUALITY_BRIGHTNESS_RANGE = (40, 225)
+    QUALITY_MAX_CLIPPED = 0.5
+    QUALITY_MIN_TEXT_HEIGHT = 8
+    
     # Application settings
     MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
     ALLOWED_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.tiff'}
     
+    # Max number of ingredients kept in the shared verdict cache
+    INGREDIENT_CACHE_SIZE = int(os.getenv('INGREDIENT_CACHE_SIZE', '10000'))
+    
     # Risk levels
     RISK_LEVELS = {
         'LOW': 1,
@@ -25,14 +105,21 @@ class Config:
         'SEVERE': 4
     }
     
-    # Common allergens
-    COMMON_ALLERGENS = [
-        'milk', 'eggs', 'fish', 'shellfish', 'tree nuts', 'peanuts', 
-        'wheat', 'soybeans', 'sesame', 'gluten', 'lactose'
-    ]
-    
-    # Banned/restricted chemicals (sample list)
-    BANNED_CHEMICALS = [
-        'bisphenol a', 'bpa', 'phthalates', 'parabens', 'formaldehyde',
-        'triclosan', 'triclocarban', 'hydroquinone', 'mercury', 'lead'
-    ] 
\ No newline at end of file
+    # Hazard knowledge base (substances, aliases, allergens, banned list)
+    HAZARD_DB_PATH = os.getenv(
+        'HAZARD_DB_PATH', os.path.join(os.path.dirname(__file__), 'data', 'hazard_kb.sqlite3')
+    )
+    HAZARD_SEED_PATH = os.path.join(os.path.dirname(__file__), 'data', 'hazard_seed.jsonl')
+    
+    # Largest edit distance tolerated when matching OCR'd names to the hazard table
+    # (per word that is not a known word: one edit at six or seven letters, two from eight)
+    FUZZY_MAX_DISTANCE = 2
+    
+    # Analysis pipeline: worker threads and per-stage timeouts (seconds, counted
+    # from when a stage starts). Only the network stages have timeouts; local
+    # CPU-bound stages would keep their worker busy after timing out anyway
+    ANALYSIS_MAX_WORKERS = int(os.getenv('ANALYSIS_MAX_WORKERS', '4'))
+    ANALYSIS_STAGE_TIMEOUTS = {
+        'product_info': 30,
+        'openfoodfacts': 15
+    }
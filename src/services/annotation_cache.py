@@ -0,0 +1,304 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+from google.cloud import vision
+
+# Add parent directory to path for config import
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+HASH_BITS = 64
+
+
+class ImageKey(NamedTuple):
+    """Cache key of one image: exact content digest plus perceptual hashes"""
+    content_hash: str
+    phash: Optional[int]
+    dhash: Optional[int]
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    """Pack a 64-element boolean array into an unsigned integer"""
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), 'big')
+
+
+def _to_signed(value: int) -> int:
+    """Store an unsigned 64-bit hash in an SQLite INTEGER"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def _to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+def perceptual_hashes(content: Union[bytes, memoryview]) -> Optional[Tuple[int, int]]:
+    """
+    Compute the pHash and dHash of an encoded image
+
+    Args:
+        content: Encoded image bytes
+
+    Returns:
+        Tuple of (pHash, dHash) as unsigned 64-bit integers, or None if the
+        image cannot be decoded
+    """
+    gray = cv2.imdecode(np.frombuffer(content, dtype=np.uint8), cv2.IMREAD_REDUCED_GRAYSCALE_8)
+    if gray is None:
+        return None
+
+    # pHash: signs of the lowest 8x8 DCT frequencies against their median
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8]
+    phash = _bits_to_int(low > np.median(low.ravel()[1:]))
+
+    # dHash: whether each pixel is brighter than its right neighbour
+    tiny = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    dhash = _bits_to_int(tiny[:, 1:] > tiny[:, :-1])
+    return phash, dhash
+
+
+class MultiIndexHashTable:
+    """Near-duplicate search over 64-bit hashes (multi-index hashing)
+
+    Each hash is split into max_distance + 1 disjoint bit ranges with one
+    hash table per range. Two hashes within max_distance bits of each other
+    must agree exactly on at least one range (pigeonhole), so a query only
+    verifies the entries sharing a range with it instead of scanning all.
+    """
+
+    def __init__(self, max_distance: int):
+        """
+        Initialize the index
+
+        Args:
+            max_distance: Largest Hamming distance lookups must find
+        """
+        self.max_distance = max_distance
+        parts = max_distance + 1
+        bounds = [round(i * HASH_BITS / parts) for i in range(parts + 1)]
+        self._ranges = [(start, end - start) for start, end in zip(bounds, bounds[1:])]
+        self._tables: List[Dict[int, List[int]]] = [{} for _ in self._ranges]
+        self._hashes: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def _substrings(self, value: int) -> Iterator[int]:
+        for start, width in self._ranges:
+            yield (value >> start) & ((1 << width) - 1)
+
+    def add(self, entry_id: int, value: int):
+        """Index one hash under an entry ID"""
+        self._hashes[entry_id] = value
+        for table, substring in zip(self._tables, self._substrings(value)):
+            table.setdefault(substring, []).append(entry_id)
+
+    def search(self, value: int) -> List[Tuple[int, int]]:
+        """
+        Find the entries within max_distance of a hash
+
+        Args:
+            value: Query hash
+
+        Returns:
+            List of (distance, entry ID), nearest first
+        """
+        candidates = set()
+        for table, substring in zip(self._tables, self._substrings(value)):
+            candidates.update(table.get(substring, ()))
+
+        matches = []
+        for entry_id in candidates:
+            distance = bin(self._hashes[entry_id] ^ value).count('1')
+            if distance <= self.max_distance:
+                matches.append((distance, entry_id))
+        return sorted(matches)
+
+
+class AnnotationCache:
+    """Persistent cache of Vision annotation responses
+
+    Responses are stored zlib-compressed in SQLite, keyed by the BLAKE2
+    digest of the image bytes. Each entry also records the image's pHash
+    and dHash; an image whose bytes were never seen but whose hashes are
+    both within max_distance bits of a stored image (a re-scan of the same
+    product, a near-duplicate in a batch) reuses that image's response.
+    The perceptual hashes are indexed in memory with a multi-index hash
+    table, so a lookup does not scan the cache; entries stored by other
+    processes are added to it before each near-duplicate search.
+
+    Entries belong to a namespace, a fingerprint of the settings that shape
+    a response (requested features, cropping, upload optimization). Only
+    entries of the cache's own namespace are ever served, so changing one of
+    those settings never returns responses of the old shape.
+    """
+
+    def __init__(self, db_path: str = Config.VISION_CACHE_PATH,
+                 max_distance: int = Config.VISION_CACHE_MAX_DISTANCE,
+                 namespace: str = ''):
+        """
+        Open (or create) the cache
+
+        Args:
+            db_path: Path to the SQLite cache file
+            max_distance: Largest pHash and dHash Hamming distance treated
+                as the same image (0 only matches identical hashes; negative
+                disables near-duplicate matching, leaving exact matches only)
+            namespace: Fingerprint of the settings responses depend on
+        """
+        self.db_path = db_path
+        self.max_distance = max_distance
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._index = MultiIndexHashTable(max(0, max_distance))
+        self._dhashes: Dict[int, int] = {}
+        self._last_indexed_id = 0
+        self._stats = {'exact_hits': 0, 'similar_hits': 0, 'misses': 0, 'stores': 0, 'lookup_ms': 0.0}
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS annotations (
+                id INTEGER PRIMARY KEY,
+                content_hash TEXT UNIQUE NOT NULL,
+                phash INTEGER,
+                dhash INTEGER,
+                response BLOB NOT NULL,
+                text_region TEXT,
+                created REAL NOT NULL,
+                namespace TEXT NOT NULL DEFAULT ''
+            )
+        """)
+        columns = {row[1] for row in self._connection.execute("PRAGMA table_info(annotations)")}
+        if 'namespace' not in columns:
+            self._connection.execute("ALTER TABLE annotations ADD COLUMN namespace TEXT NOT NULL DEFAULT ''")
+        self._connection.commit()
+
+        with self._lock:
+            self._sync_index()
+        logger.info(f"Vision annotation cache opened with {len(self._index)} entries")
+
+    def _index_entry(self, entry_id: int, phash: int, dhash: int):
+        self._index.add(entry_id, phash)
+        self._dhashes[entry_id] = dhash
+        self._last_indexed_id = entry_id
+
+    def _sync_index(self):
+        """Index the entries stored since the last call, by this or any other process (caller holds the lock)"""
+        for entry_id, phash, dhash in self._connection.execute(
+            "SELECT id, phash, dhash FROM annotations "
+            "WHERE id > ? AND namespace = ? AND phash IS NOT NULL ORDER BY id",
+            (self._last_indexed_id, self.namespace)
+        ):
+            self._index_entry(entry_id, _to_unsigned(phash), _to_unsigned(dhash))
+
+    def get(self, content: Union[bytes, memoryview]) -> Tuple[Optional[Tuple[vision.AnnotateImageResponse, Optional[Dict]]],
+                                                              ImageKey]:
+        """
+        Look an image up
+
+        The exact digest is tried first; the image is only decoded (at 1/8
+        scale) for its perceptual hashes when that misses.
+
+        Args:
+            content: Encoded image bytes
+
+        Returns:
+            Tuple of (cached (response, text region) or None, the image's
+            key for put())
+        """
+        start = time.perf_counter()
+        # The namespace is part of the digest, so exact lookups never cross namespaces
+        digest = hashlib.blake2b(self.namespace.encode(), digest_size=16)
+        digest.update(content)
+        content_hash = digest.hexdigest()
+        row = self._fetch("content_hash = ?", (content_hash,))
+        kind = 'exact_hits'
+        key = ImageKey(content_hash, None, None)
+
+        if row is None:
+            hashes = perceptual_hashes(content) if self.max_distance >= 0 else None
+            key = ImageKey(content_hash, *(hashes or (None, None)))
+            row = self._find_similar(key) if hashes is not None else None
+            kind = 'similar_hits' if row is not None else 'misses'
+
+        with self._lock:
+            self._stats[kind] += 1
+            self._stats['lookup_ms'] += (time.perf_counter() - start) * 1000
+
+        if row is None:
+            return None, key
+        response = vision.AnnotateImageResponse.deserialize(zlib.decompress(row[0]))
+        return (response, json.loads(row[1]) if row[1] else None), key
+
+    def _find_similar(self, key: ImageKey) -> Optional[Tuple[bytes, Optional[str]]]:
+        """Stored response of the nearest image whose pHash and dHash are both close"""
+        with self._lock:
+            self._sync_index()
+            matches = [
+                entry_id for _, entry_id in self._index.search(key.phash)
+                if bin(self._dhashes[entry_id] ^ key.dhash).count('1') <= self.max_distance
+            ]
+        return self._fetch("id = ?", (matches[0],)) if matches else None
+
+    def _fetch(self, condition: str, parameters: tuple) -> Optional[Tuple[bytes, Optional[str]]]:
+        with self._lock:
+            return self._connection.execute(
+                f"SELECT response, text_region FROM annotations WHERE {condition}", parameters
+            ).fetchone()
+
+    def put(self, key: ImageKey, response: vision.AnnotateImageResponse, text_region: Optional[Dict] = None):
+        """
+        Store the response of an image
+
+        Args:
+            key: Key returned by get()
+            response: Annotation response (responses with an error are not stored)
+            text_region: Text region OCR was cropped to, if any
+        """
+        if response.error.message:
+            return
+
+        blob = zlib.compress(vision.AnnotateImageResponse.serialize(response), 6)
+        with self._lock:
+            cursor = self._connection.execute(
+                "INSERT OR IGNORE INTO annotations (content_hash, phash, dhash, response, text_region, created, "
+                "namespace) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key.content_hash,
+                 _to_signed(key.phash) if key.phash is not None else None,
+                 _to_signed(key.dhash) if key.dhash is not None else None,
+                 blob, json.dumps(text_region) if text_region else None, time.time(), self.namespace)
+            )
+            self._connection.commit()
+            self._stats['stores'] += cursor.rowcount
+
+    def stats(self) -> Dict:
+        """
+        Get cumulative statistics
+
+        Returns:
+            Dictionary with entries, exact and near-duplicate hits, misses,
+            stores, hit rate and average lookup time
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = self._connection.execute("SELECT COUNT(*) FROM annotations").fetchone()[0]
+
+        lookups = stats['exact_hits'] + stats['similar_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['exact_hits'] + stats['similar_hits']) / max(1, lookups), 3)
+        stats['average_lookup_ms'] = round(stats['lookup_ms'] / max(1, lookups), 2)
+        stats['lookup_ms'] = round(stats['lookup_ms'], 2)
+        return stats
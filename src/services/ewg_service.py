@@ -4,11 +4,15 @@ import os
 import sys
 from typing import Dict, List, Optional
 from bs4 import BeautifulSoup
-import time
 
 # Add parent directory to path for config import
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
 from config import Config
+from .pattern_matcher import PatternMatcher
+from .fuzzy_index import FuzzyIndex, load_lexicon
+from .ingredient_cache import get_verdict_cache
+from .hazard_knowledge_base import get_knowledge_base
+from .substance_index import cached_substance_ids, get_substance_index
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -38,29 +42,16 @@ class EWGService:
             10: 'SEVERE'
         }
         
-        # Known toxic chemicals database (simplified)
-        self.toxic_chemicals = {
-            'formaldehyde': {'hazard': 8, 'concerns': ['cancer', 'allergies', 'respiratory']},
-            'parabens': {'hazard': 5, 'concerns': ['endocrine disruption', 'skin irritation']},
-            'phthalates': {'hazard': 7, 'concerns': ['endocrine disruption', 'reproductive']},
-            'triclosan': {'hazard': 6, 'concerns': ['endocrine disruption', 'antibiotic resistance']},
-            'sodium lauryl sulfate': {'hazard': 4, 'concerns': ['skin irritation', 'eye irritation']},
-            'bisphenol a': {'hazard': 8, 'concerns': ['endocrine disruption', 'developmental']},
-            'mercury': {'hazard': 10, 'concerns': ['neurotoxicity', 'developmental']},
-            'lead': {'hazard': 9, 'concerns': ['neurotoxicity', 'developmental']},
-            'hydroquinone': {'hazard': 7, 'concerns': ['skin sensitization', 'cancer']},
-            'coal tar': {'hazard': 8, 'concerns': ['cancer', 'skin irritation']},
-            'sodium nitrite': {'hazard': 5, 'concerns': ['cancer', 'cardiovascular']},
-            'monosodium glutamate': {'hazard': 3, 'concerns': ['headaches', 'allergic reactions']},
-            'artificial colors': {'hazard': 4, 'concerns': ['hyperactivity', 'allergies']},
-            'sodium benzoate': {'hazard': 4, 'concerns': ['allergies', 'hyperactivity']},
-            'potassium bromate': {'hazard': 8, 'concerns': ['cancer', 'kidney damage']},
-            'butylated hydroxytoluene': {'hazard': 5, 'concerns': ['allergies', 'endocrine disruption']},
-            'tertiary butylhydroquinone': {'hazard': 5, 'concerns': ['nausea', 'skin irritation']},
-            'carrageenan': {'hazard': 4, 'concerns': ['digestive issues', 'inflammation']},
-            'high fructose corn syrup': {'hazard': 3, 'concerns': ['obesity', 'diabetes']},
-            'trans fats': {'hazard': 6, 'concerns': ['cardiovascular', 'cholesterol']}
-        }
+        # Hazard knowledge base shared by all services
+        self.knowledge_base = get_knowledge_base()
+        
+        # Lookup structures are built in the background, at startup and after every import
+        self.knowledge_base.prebuild('hazard_table', self.knowledge_base.hazard_table)
+        self.knowledge_base.prebuild('hazard_matcher', self._build_partial_matcher)
+        self.knowledge_base.prebuild('hazard_fuzzy_index', self._build_fuzzy_index)
+        
+        # Verdicts shared with the other analyzers
+        self.verdict_cache = get_verdict_cache()
     
     def analyze_ingredient_safety(self, ingredient: str) -> Dict:
         """
@@ -74,78 +65,42 @@ class EWGService:
         """
         try:
             ingredient_lower = ingredient.lower().strip()
-            
-            # Direct lookup in our database
-            if ingredient_lower in self.toxic_chemicals:
-                chem_data = self.toxic_chemicals[ingredient_lower]
-                return {
-                    'ingredient': ingredient,
-                    'found': True,
-                    'hazard_score': chem_data['hazard'],
-                    'hazard_level': self.hazard_levels.get(chem_data['hazard'], 'UNKNOWN'),
-                    'concerns': chem_data['concerns'],
-                    'source': 'EWG Database',
-                    'recommendation': self._get_recommendation(chem_data['hazard'])
-                }
-            
-            # Check for partial matches (contains toxic compounds)
-            for toxic_chem, data in self.toxic_chemicals.items():
-                if toxic_chem in ingredient_lower or ingredient_lower in toxic_chem:
-                    return {
-                        'ingredient': ingredient,
-                        'found': True,
-                        'hazard_score': data['hazard'],
-                        'hazard_level': self.hazard_levels.get(data['hazard'], 'UNKNOWN'),
-                        'concerns': data['concerns'],
-                        'source': 'EWG Database (partial match)',
-                        'matched_chemical': toxic_chem,
-                        'recommendation': self._get_recommendation(data['hazard'])
-                    }
-            
-            # If not found in database, return low risk
-            return {
-                'ingredient': ingredient,
-                'found': False,
-                'hazard_score': 1,
-                'hazard_level': 'LOW',
-                'concerns': [],
-                'source': 'Not found in EWG database',
-                'recommendation': 'Generally considered safe'
-            }
+            return {'ingredient': ingredient, **self._cached_lookup(ingredient_lower)}
             
         except Exception as e:
             logger.error(f"Error analyzing ingredient safety: {str(e)}")
-            return {
-                'ingredient': ingredient,
-                'found': False,
-                'hazard_score': 1,
-                'hazard_level': 'UNKNOWN',
-                'concerns': [],
-                'source': 'Error during analysis',
-                'recommendation': 'Unable to analyze - consult healthcare provider'
-            }
+            return {'ingredient': ingredient, **self._error_verdict()}
     
     def analyze_ingredients_batch(self, ingredients: List[str]) -> List[Dict]:
         """
-        Analyze multiple ingredients for safety
+        Analyze multiple ingredients for safety in a single pass
+        
+        All ingredients are normalized up front and each distinct name is
+        resolved against the hazard table once; repeated ingredients reuse
+        the same verdict.
         
         Args:
             ingredients: List of ingredient names
             
         Returns:
-            List of safety analyses
+            List of safety analyses, one per non-blank ingredient
         """
-        results = []
+        normalized = [ingredient.lower().strip() for ingredient in ingredients]
         
-        for ingredient in ingredients:
-            if ingredient.strip():
-                analysis = self.analyze_ingredient_safety(ingredient)
-                results.append(analysis)
-                
-                # Rate limiting - be respectful
-                time.sleep(0.1)
+        verdicts = {}
+        for ingredient_lower in normalized:
+            if ingredient_lower and ingredient_lower not in verdicts:
+                try:
+                    verdicts[ingredient_lower] = self._cached_lookup(ingredient_lower)
+                except Exception as e:
+                    logger.error(f"Error analyzing ingredient safety: {str(e)}")
+                    verdicts[ingredient_lower] = self._error_verdict()
         
-        return results
+        return [
+            {'ingredient': ingredient, **verdicts[ingredient_lower]}
+            for ingredient, ingredient_lower in zip(ingredients, normalized)
+            if ingredient_lower
+        ]
     
     def get_product_safety_score(self, ingredients: List[str]) -> Dict:
         """
@@ -231,17 +186,141 @@ class EWGService:
             ingredient_lower = ingredient.lower().strip()
             
             # Check against our banned chemicals list
-            for banned_chem in Config.BANNED_CHEMICALS:
-                if banned_chem in ingredient_lower:
-                    banned_found.append({
-                        'ingredient': ingredient,
-                        'banned_substance': banned_chem,
-                        'reason': 'Potentially harmful chemical',
-                        'severity': 'HIGH'
-                    })
+            matches = self.verdict_cache.get_field(
+                ingredient_lower, 'banned',
+                lambda: tuple(chem for chem in self.knowledge_base.banned_substances() if chem in ingredient_lower)
+            )
+            for banned_chem in matches:
+                banned_found.append({
+                    'ingredient': ingredient,
+                    'banned_substance': banned_chem,
+                    'reason': 'Potentially harmful chemical',
+                    'severity': 'HIGH'
+                })
         
         return banned_found
     
+    @property
+    def toxic_chemicals(self) -> Dict[str, Dict]:
+        """Hazard table (name -> hazard data) from the knowledge base"""
+        return self.knowledge_base.hazard_table()
+    
+    @property
+    def partial_matcher(self) -> PatternMatcher:
+        """Partial-match automaton over the hazard table, compiled in the background"""
+        return self.knowledge_base.derived('hazard_matcher', self._build_partial_matcher)
+    
+    @property
+    def fuzzy_index(self) -> FuzzyIndex:
+        """OCR-tolerant index over the hazard table, built in the background"""
+        return self.knowledge_base.derived('hazard_fuzzy_index', self._build_fuzzy_index)
+    
+    def _build_partial_matcher(self) -> PatternMatcher:
+        return PatternMatcher(self.toxic_chemicals)
+    
+    def _build_fuzzy_index(self) -> FuzzyIndex:
+        return FuzzyIndex(self.toxic_chemicals, known_words=self._known_words())
+    
+    def _known_words(self) -> set:
+        """Correctly spelled words: the ingredient lexicon and every word of every substance name or alias"""
+        words = load_lexicon()
+        for key, _ in self.knowledge_base.name_keys():
+            words.update(key.split())
+        return words
+    
+    def _cached_lookup(self, ingredient_lower: str) -> Dict:
+        """Hazard verdict for a normalized name, served from the shared cache"""
+        return self.verdict_cache.get_field(
+            ingredient_lower, 'hazard', lambda: self._lookup_normalized(ingredient_lower)
+        )
+    
+    def _lookup_normalized(self, ingredient_lower: str) -> Dict:
+        """Resolve a normalized ingredient name against the hazard table"""
+        substance_index = get_substance_index(self.knowledge_base)
+        
+        # Direct lookup in our database (name, alias, E-number or CAS number)
+        substance_id = substance_index.canonicalize(ingredient_lower)
+        chem_name = substance_index.name_of(substance_id) if substance_id is not None else None
+        if chem_name in self.toxic_chemicals:
+            chem_data = self.toxic_chemicals[chem_name]
+            analysis = {
+                'found': True,
+                'hazard_score': chem_data['hazard'],
+                'hazard_level': self.hazard_levels.get(chem_data['hazard'], 'UNKNOWN'),
+                'concerns': chem_data['concerns'],
+                'source': 'EWG Database',
+                'recommendation': self._get_recommendation(chem_data['hazard'])
+            }
+            if chem_name != ingredient_lower:
+                analysis['matched_chemical'] = chem_name
+            return analysis
+        
+        # Check for partial matches (contains toxic compounds)
+        toxic_chem = self.partial_matcher.find_first(ingredient_lower)
+        if toxic_chem is not None:
+            data = self.toxic_chemicals[toxic_chem]
+            return {
+                'found': True,
+                'hazard_score': data['hazard'],
+                'hazard_level': self.hazard_levels.get(data['hazard'], 'UNKNOWN'),
+                'concerns': data['concerns'],
+                'source': 'EWG Database (partial match)',
+                'matched_chemical': toxic_chem,
+                'recommendation': self._get_recommendation(data['hazard'])
+            }
+        
+        # Aliases in qualifiers, e.g. "preservative (e211)"
+        for substance_id in cached_substance_ids(ingredient_lower):
+            toxic_chem = substance_index.name_of(substance_id)
+            if toxic_chem in self.toxic_chemicals:
+                data = self.toxic_chemicals[toxic_chem]
+                return {
+                    'found': True,
+                    'hazard_score': data['hazard'],
+                    'hazard_level': self.hazard_levels.get(data['hazard'], 'UNKNOWN'),
+                    'concerns': data['concerns'],
+                    'source': 'EWG Database (partial match)',
+                    'matched_chemical': toxic_chem,
+                    'recommendation': self._get_recommendation(data['hazard'])
+                }
+        
+        # Tolerate OCR misreads such as "sodlum benzoate"
+        fuzzy_match = self.fuzzy_index.find_best(ingredient_lower)
+        if fuzzy_match is not None:
+            toxic_chem, distance = fuzzy_match
+            data = self.toxic_chemicals[toxic_chem]
+            return {
+                'found': True,
+                'hazard_score': data['hazard'],
+                'hazard_level': self.hazard_levels.get(data['hazard'], 'UNKNOWN'),
+                'concerns': data['concerns'],
+                'source': 'EWG Database (fuzzy match)',
+                'matched_chemical': toxic_chem,
+                'match_distance': distance,
+                'recommendation': self._get_recommendation(data['hazard'])
+            }
+        
+        # If not found in database, return low risk
+        return {
+            'found': False,
+            'hazard_score': 1,
+            'hazard_level': 'LOW',
+            'concerns': [],
+            'source': 'Not found in EWG database',
+            'recommendation': 'Generally considered safe'
+        }
+    
+    def _error_verdict(self) -> Dict:
+        """Verdict used when an ingredient could not be analyzed"""
+        return {
+            'found': False,
+            'hazard_score': 1,
+            'hazard_level': 'UNKNOWN',
+            'concerns': [],
+            'source': 'Error during analysis',
+            'recommendation': 'Unable to analyze - consult healthcare provider'
+        }
+    
     def _get_recommendation(self, hazard_score: int) -> str:
         """Get recommendation based on hazard score"""
         if hazard_score >= 8:
@@ -294,21 +373,12 @@ class EWGService:
         Returns:
             List of safer alternatives
         """
-        alternatives = {
-            'parabens': ['phenoxyethanol', 'benzyl alcohol', 'potassium sorbate'],
-            'sodium lauryl sulfate': ['sodium laureth sulfate', 'coco glucoside', 'decyl glucoside'],
-            'formaldehyde': ['phenoxyethanol', 'ethylhexylglycerin', 'caprylyl glycol'],
-            'phthalates': ['plant-based plasticizers', 'citric acid esters'],
-            'triclosan': ['tea tree oil', 'thymol', 'benzalkonium chloride'],
-            'artificial colors': ['natural colorants', 'plant-based dyes', 'mineral pigments'],
-            'high fructose corn syrup': ['honey', 'maple syrup', 'coconut sugar'],
-            'trans fats': ['olive oil', 'coconut oil', 'avocado oil']
-        }
-        
-        ingredient_lower = ingredient.lower()
+        matcher = self.knowledge_base.derived(
+            'alternatives_matcher', lambda: PatternMatcher(self.knowledge_base.alternatives())
+        )
         
-        for key, alts in alternatives.items():
-            if key in ingredient_lower:
-                return alts
+        matches = matcher.find_all_in(ingredient.lower())
+        if matches:
+            return self.knowledge_base.alternatives().get(matcher.patterns[matches[0]], [])
         
         return [] 
\ No newline at end of file
@@ -0,0 +1,289 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Hazard level codes stored per ingredient row
+HAZARD_LEVEL_CODES = {'LOW': 0, 'MODERATE': 1, 'HIGH': 2, 'SEVERE': 3}
+UNKNOWN_LEVEL_CODE = 4
+
+# Additive and nutrition feature bits
+FLAG_ADDITIVE = 1 << 0
+FLAG_PRESERVATIVE = 1 << 1
+FLAG_HIGH_RISK_ADDITIVE = 1 << 2
+FLAG_MODERATE_RISK_ADDITIVE = 1 << 3
+NUTRITION_FLAGS = {
+    'high_sugar': 1 << 4,
+    'high_sodium': 1 << 5,
+    'artificial_ingredients': 1 << 6,
+    'trans_fats': 1 << 7
+}
+
+# Set bits per byte value, used to popcount uint64 words on any NumPy version
+_POPCOUNT_TABLE = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+
+def popcount(words: np.ndarray) -> np.ndarray:
+    """
+    Count set bits across the last axis of a uint64 bitset array
+
+    Args:
+        words: Array of shape (..., n_words) with dtype uint64
+
+    Returns:
+        Integer array of shape (...) with the number of set bits
+    """
+    as_bytes = np.ascontiguousarray(words).view(np.uint8)
+    return _POPCOUNT_TABLE[as_bytes].sum(axis=-1, dtype=np.int64)
+
+
+class IngredientFeatureMatrix:
+    """Fixed-width feature rows for canonical ingredients, held in NumPy arrays
+
+    Every normalized ingredient name maps to one row holding its hazard
+    score and level, an allergen bitset (one bit per knowledge base
+    allergen), the number of banned substances it matches and additive /
+    nutrition bits. Rows are built once, on first sight of an ingredient,
+    from the same per-ingredient verdicts the analyzers use; scoring a batch
+    of products is then a gather plus segmented reductions.
+    """
+
+    def __init__(self, allergens: Sequence[str],
+                 row_source: Callable[[List[str]], List[Dict]],
+                 initial_capacity: int = 1024):
+        """
+        Initialize the matrix
+
+        Args:
+            allergens: Allergen names, one bit each in table order
+            row_source: Callable returning the feature dict of each given
+                normalized ingredient (see RiskAnalyzer._ingredient_features)
+            initial_capacity: Rows allocated up front; grows by doubling
+        """
+        self.allergens = list(allergens)
+        self._allergen_bits = {allergen: bit for bit, allergen in enumerate(self.allergens)}
+        self.allergen_words = max(1, (len(self.allergens) + 63) // 64)
+        self._row_source = row_source
+        self._rows: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+        self.hazard_score = np.zeros(initial_capacity, dtype=np.float64)
+        self.hazard_level = np.zeros(initial_capacity, dtype=np.uint8)
+        self.allergen_bitset = np.zeros((initial_capacity, self.allergen_words), dtype=np.uint64)
+        self.banned_count = np.zeros(initial_capacity, dtype=np.uint16)
+        self.flags = np.zeros(initial_capacity, dtype=np.uint16)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def allergen_mask(self, allergens: Iterable[str]) -> np.ndarray:
+        """
+        Build the bitset of a list of allergen names
+
+        Args:
+            allergens: Allergen names; names not in the knowledge base are ignored
+
+        Returns:
+            uint64 array of shape (allergen_words,)
+        """
+        mask = np.zeros(self.allergen_words, dtype=np.uint64)
+        for allergen in allergens:
+            bit = self._allergen_bits.get(allergen)
+            if bit is not None:
+                mask[bit // 64] |= np.uint64(1 << (bit % 64))
+        return mask
+
+    def rows_for(self, ingredient_keys: List[str]) -> np.ndarray:
+        """
+        Map normalized ingredient names to row indexes, building missing rows
+
+        Args:
+            ingredient_keys: Lowercased, stripped ingredient names
+
+        Returns:
+            int64 array of row indexes, one per key
+        """
+        rows = self._rows
+        missing = list(dict.fromkeys(key for key in ingredient_keys if key not in rows))
+        if missing:
+            features = self._row_source(missing)
+            with self._lock:
+                for key, feature in zip(missing, features):
+                    if key not in rows:
+                        self._append_row(key, feature)
+
+        return np.fromiter((rows[key] for key in ingredient_keys), dtype=np.int64, count=len(ingredient_keys))
+
+    def _append_row(self, key: str, feature: Dict):
+        """Pack one feature dict into the next free row"""
+        row = len(self._rows)
+        if row == len(self.hazard_score):
+            self._grow()
+
+        flags = 0
+        if feature['additive']:
+            flags |= FLAG_ADDITIVE
+        if feature['preservative']:
+            flags |= FLAG_PRESERVATIVE
+        if feature['additive_risk'] == 'HIGH':
+            flags |= FLAG_HIGH_RISK_ADDITIVE
+        elif feature['additive_risk'] == 'MODERATE':
+            flags |= FLAG_MODERATE_RISK_ADDITIVE
+        for concern in feature['nutrition']:
+            flags |= NUTRITION_FLAGS[concern]
+
+        self.hazard_score[row] = feature['hazard_score']
+        self.hazard_level[row] = HAZARD_LEVEL_CODES.get(feature['hazard_level'], UNKNOWN_LEVEL_CODE)
+        self.allergen_bitset[row] = self.allergen_mask(feature['allergens'])
+        self.banned_count[row] = feature['banned']
+        self.flags[row] = flags
+        self._rows[key] = row
+
+    def _grow(self):
+        """Double the capacity of every feature array"""
+        for name in ('hazard_score', 'hazard_level', 'allergen_bitset', 'banned_count', 'flags'):
+            array = getattr(self, name)
+            grown = np.zeros((len(array) * 2,) + array.shape[1:], dtype=array.dtype)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+
+    def aggregate(self, products: List[List[str]], user_allergens: Iterable[str] = ()) -> Dict[str, np.ndarray]:
+        """
+        Reduce the feature rows of many products in one pass
+
+        Blank ingredients are skipped, as in EWGService.analyze_ingredients_batch.
+
+        Args:
+            products: Ingredient lists, one per product
+            user_allergens: Allergen profile used to count allergen matches
+
+        Returns:
+            Dictionary of per-product arrays: ingredients, hazard_sum,
+            high_risk, moderate_risk, low_risk, banned, high_risk_additives,
+            allergen_matches and nutrition (OR of nutrition bits)
+        """
+        keys = []
+        lengths = np.zeros(len(products), dtype=np.int64)
+        for position, ingredients in enumerate(products):
+            normalized = [key for key in (ingredient.lower().strip() for ingredient in ingredients) if key]
+            lengths[position] = len(normalized)
+            keys.extend(normalized)
+
+        rows = self.rows_for(keys)
+        segments = np.repeat(np.arange(len(products)), lengths)
+        mask = self.allergen_mask(user_allergens)
+
+        with self._lock:
+            hazard_score = self.hazard_score[rows]
+            hazard_level = self.hazard_level[rows]
+            allergen_bitset = self.allergen_bitset[rows]
+            banned_count = self.banned_count[rows]
+            flags = self.flags[rows]
+
+        def per_product(weights: np.ndarray) -> np.ndarray:
+            return np.bincount(segments, weights=weights, minlength=len(products))
+
+        additive_kinds = ((flags & FLAG_ADDITIVE) > 0).astype(np.int64) + ((flags & FLAG_PRESERVATIVE) > 0)
+        high_risk_additives = np.where(flags & FLAG_HIGH_RISK_ADDITIVE, additive_kinds, 0)
+
+        nutrition = np.zeros(len(products), dtype=np.uint16)
+        np.bitwise_or.at(nutrition, segments, flags & sum(NUTRITION_FLAGS.values()))
+
+        return {
+            'ingredients': lengths,
+            'hazard_sum': per_product(hazard_score),
+            'high_risk': per_product((hazard_level == HAZARD_LEVEL_CODES['HIGH']) |
+                                     (hazard_level == HAZARD_LEVEL_CODES['SEVERE'])),
+            'moderate_risk': per_product(hazard_level == HAZARD_LEVEL_CODES['MODERATE']),
+            'low_risk': per_product(hazard_level == HAZARD_LEVEL_CODES['LOW']),
+            'banned': per_product(banned_count),
+            'high_risk_additives': per_product(high_risk_additives),
+            'allergen_matches': per_product(popcount(allergen_bitset & mask)),
+            'nutrition': nutrition
+        }
+
+
+class AllergenProfileMatrix:
+    """User allergen profiles compiled into a bitset matrix
+
+    Row i holds the allergen bitset of user_ids[i], using the bit order of
+    the knowledge base allergen list (the same layout as
+    IngredientFeatureMatrix), so checking a product against every profile
+    is one AND over the matrix.
+    """
+
+    def __init__(self, allergens: Sequence[str], user_ids: Sequence, bitsets: np.ndarray):
+        """
+        Wrap precompiled profile bitsets
+
+        Args:
+            allergens: Allergen names, one bit each in table order
+            user_ids: User ID of each row
+            bitsets: uint64 array of shape (users, allergen_words)
+        """
+        self.allergens = list(allergens)
+        self._allergen_bits = {allergen: bit for bit, allergen in enumerate(self.allergens)}
+        self.allergen_words = max(1, (len(self.allergens) + 63) // 64)
+        self.user_ids = np.asarray(user_ids)
+        self.bitsets = np.ascontiguousarray(bitsets, dtype=np.uint64).reshape(len(self.user_ids), self.allergen_words)
+
+    @classmethod
+    def from_profiles(cls, allergens: Sequence[str], profiles: Dict[Any, Iterable[str]]) -> 'AllergenProfileMatrix':
+        """
+        Compile user profiles
+
+        Args:
+            allergens: Allergen names, one bit each in table order
+            profiles: Mapping of user ID to that user's allergen names;
+                names not in the allergen list are ignored
+
+        Returns:
+            Compiled AllergenProfileMatrix
+        """
+        matrix = cls(allergens, list(profiles), np.zeros((len(profiles), max(1, (len(allergens) + 63) // 64))))
+        for row, user_allergens in enumerate(profiles.values()):
+            for allergen in user_allergens:
+                bit = matrix._allergen_bits.get(allergen)
+                if bit is not None:
+                    matrix.bitsets[row, bit // 64] |= np.uint64(1 << (bit % 64))
+        return matrix
+
+    def __len__(self) -> int:
+        return len(self.user_ids)
+
+    def match(self, allergen_counts: Dict[str, int]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the users whose profile shares an allergen with a product
+
+        Args:
+            allergen_counts: Allergen name -> number of detections in the
+                product (ingredient/allergen pairs)
+
+        Returns:
+            Tuple of (row indexes of matching users, their match counts),
+            where a match count is the number of detections the user is
+            sensitive to
+        """
+        product_bits = [(self._allergen_bits[allergen], count)
+                        for allergen, count in allergen_counts.items()
+                        if allergen in self._allergen_bits and count]
+        if not product_bits:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+
+        product_mask = np.zeros(self.allergen_words, dtype=np.uint64)
+        for bit, _ in product_bits:
+            product_mask[bit // 64] |= np.uint64(1 << (bit % 64))
+
+        shared = self.bitsets & product_mask
+        rows = np.flatnonzero(shared.any(axis=1))
+        shared = shared[rows]
+
+        match_counts = np.zeros(len(rows), dtype=np.int64)
+        for bit, count in product_bits:
+            column = shared[:, bit // 64] >> np.uint64(bit % 64)
+            match_counts += (column & np.uint64(1)).astype(np.int64) * count
+
+        return rows, match_counts
@@ -0,0 +1,215 @@
+import logging
+import os
+import sys
+from collections import Counter
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# Add parent directory to path for config import
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Each edit operation can destroy at most this many trigrams
+_GRAM = 3
+
+# Extra trigram postings read beyond the minimum; candidates must appear in
+# at least this many of them, which prunes most verifications
+_FILTER_DEPTH = 4
+
+# Tokens shorter than this are never corrected: one edit turns them into
+# other real words too easily
+_MIN_EDIT_LENGTH = 6
+# Tokens at least this long may take two edits ("benz0ote" for "benzoate")
+_TWO_EDIT_LENGTH = 8
+
+# Chemical name endings that name different compounds ("nitrate" vs
+# "nitrite", "bromide" vs "bromate"); a correction never swaps one for another
+_SUFFIXES = ('ate', 'ite', 'ide', 'ine', 'ous', 'ic')
+
+
+def trigrams(text: str) -> set:
+    """Distinct padded trigrams of a normalized string"""
+    padded = f"  {text} "
+    return {padded[i:i + _GRAM] for i in range(len(padded) - _GRAM + 1)}
+
+
+def bounded_levenshtein(a: str, b: str, max_distance: int) -> int:
+    """
+    Levenshtein distance restricted to a diagonal band
+
+    Args:
+        a: First string
+        b: Second string
+        max_distance: Largest distance of interest
+
+    Returns:
+        The edit distance, or max_distance + 1 if it exceeds max_distance
+    """
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    if a == b:
+        return 0
+
+    over = max_distance + 1
+    previous = list(range(len(b) + 1))
+
+    for i in range(1, len(a) + 1):
+        low = max(1, i - max_distance)
+        high = min(len(b), i + max_distance)
+        current = [over] * (len(b) + 1)
+        current[0] = i if i <= max_distance else over
+        char = a[i - 1]
+        row_min = current[0]
+
+        for j in range(low, high + 1):
+            cost = previous[j - 1] + (char != b[j - 1])
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            current[j] = cost if cost < over else over
+            if cost < row_min:
+                row_min = cost
+
+        if row_min > max_distance:
+            return over
+        previous = current
+
+    return previous[len(b)] if previous[len(b)] <= max_distance else over
+
+
+def load_lexicon(path: str = Config.OCR_LEXICON_PATH) -> Set[str]:
+    """Words of a lexicon file, one lowercase word per line ('#' starts a comment line)"""
+    with open(path, encoding='utf-8') as lexicon_file:
+        return {line.strip() for line in lexicon_file if line.strip() and not line.startswith('#')}
+
+
+def _suffix(token: str) -> str:
+    return next((suffix for suffix in _SUFFIXES if token.endswith(suffix)), '')
+
+
+class FuzzyIndex:
+    """OCR-tolerant nearest-name index over the hazard table
+
+    Candidates come from an inverted trigram index partitioned by name
+    length. A string within k edits of the query has a length within k of
+    it and misses at most 3k of the query's distinct trigrams, so out of
+    the query's 3k + m rarest trigrams it must share at least m. Only
+    those postings, restricted to the length window, are read; the few
+    surviving candidates are verified with a banded Levenshtein distance.
+
+    Corrections are kept to plausible misreads of each word: a query token
+    that is not itself a known word may differ from the name's token by
+    one edit when it has six or seven characters and by two when it is
+    longer, and the edits may not swap a chemical suffix. "sodium citrate" is a real ingredient, not a
+    misread of "sodium nitrite".
+    """
+
+    def __init__(self, names: Iterable[str], max_distance: int = Config.FUZZY_MAX_DISTANCE,
+                 known_words: Iterable[str] = ()):
+        """
+        Build the index
+
+        Args:
+            names: Normalized names in priority order (earlier wins ties)
+            max_distance: Upper bound on the edit distance accepted
+            known_words: Correctly spelled words (ingredient lexicon, other
+                substance names); query tokens found here are never corrected
+        """
+        self.names: List[str] = list(names)
+        self.max_distance = max_distance
+        self.known_words = frozenset(known_words)
+        self._postings: Dict[Tuple[str, int], List[int]] = {}
+
+        for index, name in enumerate(self.names):
+            length = len(name)
+            for gram in trigrams(name):
+                self._postings.setdefault((gram, length), []).append(index)
+
+        logger.info(f"Built fuzzy index for {len(self.names)} names ({len(self._postings)} postings)")
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def _token_budget(self, token: str) -> int:
+        """Edits tolerated in one query token: none for short or known words, two for long ones"""
+        if len(token) < _MIN_EDIT_LENGTH or token in self.known_words:
+            return 0
+        return 2 if len(token) >= _TWO_EDIT_LENGTH else 1
+
+    def distance_budget(self, text: str) -> int:
+        """Edits tolerated for a query: the sum over its tokens, capped at max_distance"""
+        return min(self.max_distance, sum(map(self._token_budget, text.split())))
+
+    def accepts(self, text: str, name: str) -> bool:
+        """
+        Whether a name within the distance budget is a plausible reading of the query
+
+        Args:
+            text: Normalized query text
+            name: Candidate name
+
+        Returns:
+            True if the query and name have the same tokens except for
+            misreads of correctable tokens, within their budget, that keep
+            the suffix
+        """
+        tokens, name_tokens = text.split(), name.split()
+        if len(tokens) != len(name_tokens):
+            return False
+        for token, name_token in zip(tokens, name_tokens):
+            if token == name_token:
+                continue
+            budget = self._token_budget(token)
+            if budget == 0 or bounded_levenshtein(token, name_token, budget) > budget:
+                return False
+            if _suffix(token) and _suffix(name_token) and _suffix(token) != _suffix(name_token):
+                return False
+        return True
+
+    def find_best(self, text: str, max_distance: Optional[int] = None) -> Optional[Tuple[str, int]]:
+        """
+        Find the closest name within a bounded edit distance
+
+        Args:
+            text: Normalized query text
+            max_distance: Override for the distance budget of this query
+
+        Returns:
+            Tuple of (matched name, distance) or None if nothing is close enough
+        """
+        budget = self.distance_budget(text) if max_distance is None else max_distance
+        if budget <= 0 or not self.names:
+            return None
+
+        grams = trigrams(text)
+        tolerated = _GRAM * budget
+        if len(grams) <= tolerated:
+            return None
+
+        # Postings per query gram, restricted to names of compatible length
+        lengths = range(len(text) - budget, len(text) + budget + 1)
+        empty = ()
+        postings = sorted(
+            ([self._postings.get((gram, length), empty) for length in lengths] for gram in grams),
+            key=lambda parts: sum(map(len, parts))
+        )
+
+        selected = postings[:tolerated + _FILTER_DEPTH]
+        required = len(selected) - tolerated
+        counts = Counter(chain.from_iterable(chain.from_iterable(selected)))
+        candidates = sorted(index for index, count in counts.items() if count >= required)
+
+        best: Optional[Tuple[str, int]] = None
+        for index in candidates:
+            limit = best[1] - 1 if best else budget
+            if limit < 0:
+                break
+            name = self.names[index]
+            distance = bounded_levenshtein(text, name, limit)
+            if distance <= limit and self.accepts(text, name):
+                best = (name, distance)
+
+        return best
@@ -0,0 +1,579 @@
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Add parent directory to path for config import
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+from config import Config
+from .ingredient_cache import get_verdict_cache
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS substances (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    normalized_name TEXT NOT NULL,
+    cas_number TEXT,
+    hazard INTEGER,
+    concerns TEXT NOT NULL DEFAULT '[]',
+    banned INTEGER NOT NULL DEFAULT 0,
+    allergen INTEGER NOT NULL DEFAULT 0
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_substances_normalized_name ON substances(normalized_name);
+CREATE INDEX IF NOT EXISTS idx_substances_cas_number ON substances(cas_number);
+
+CREATE TABLE IF NOT EXISTS aliases (
+    alias TEXT NOT NULL,
+    substance_id INTEGER NOT NULL REFERENCES substances(id),
+    PRIMARY KEY (alias, substance_id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS alternatives (
+    substance_id INTEGER NOT NULL REFERENCES substances(id),
+    position INTEGER NOT NULL,
+    alternative TEXT NOT NULL,
+    PRIMARY KEY (substance_id, position)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS metadata (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+def normalize_name(name: str) -> str:
+    """Normalize a substance name or alias for indexed lookups"""
+    return name.lower().strip()
+
+
+class HazardKnowledgeBase:
+    """Read-only view of the on-disk hazard knowledge base
+
+    Substances, aliases, CAS numbers, safer alternatives and the banned /
+    allergen flags live in a SQLite file with indexes on normalized name,
+    alias and CAS number. Opening it only opens the file, so startup cost
+    does not depend on the size of the database. Larger in-memory
+    structures derived from the tables (pattern matchers and similar) are
+    built lazily via derived() and shared by every service in the process.
+    The expensive ones are registered with prebuild() and built on a
+    background thread instead, so no request ever pays for them.
+    """
+
+    def __init__(self, db_path: str = Config.HAZARD_DB_PATH):
+        """
+        Open the knowledge base
+
+        Args:
+            db_path: Path to the SQLite database file. If it does not exist
+                it is created from Config.HAZARD_SEED_PATH first.
+        """
+        self.db_path = db_path
+        seed_digest = _file_digest(Config.HAZARD_SEED_PATH)
+        if not os.path.exists(db_path):
+            logger.info(f"Hazard knowledge base not found at {db_path} - building it from seed data")
+            bulk_import(db_path, [Config.HAZARD_SEED_PATH], metadata={'seed_digest': seed_digest})
+
+        self._local = threading.local()
+        self._derived: Dict[str, Any] = {}
+        self._derived_lock = threading.RLock()
+        self._prebuilders: Dict[str, Callable[[], Any]] = {}
+        self._prebuild_thread: Optional[threading.Thread] = None
+        self._prebuild_version: Optional[str] = None
+        self._prebuilt = threading.Condition(self._derived_lock)
+
+        # Seed changes are merged by an explicit migration (see migrate_seed), never on open
+        stored_digest = self._read_metadata('seed_digest')
+        if stored_digest is not None and stored_digest != seed_digest:
+            logger.warning(
+                "Seed data has changed since the hazard knowledge base was built - merge it with "
+                "'python -m src.services.hazard_knowledge_base --migrate-seed'"
+            )
+
+        self.version = self._read_version()
+
+    def _connection(self) -> sqlite3.Connection:
+        """Per-thread read-only connection"""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+            connection.row_factory = sqlite3.Row
+            self._local.connection = connection
+        return connection
+
+    def _read_metadata(self, key: str) -> Optional[str]:
+        row = self._connection().execute(
+            "SELECT value FROM metadata WHERE key = ?", (key,)
+        ).fetchone()
+        return row['value'] if row else None
+
+    def _read_version(self) -> str:
+        return self._read_metadata('version') or ''
+
+    def refresh(self) -> bool:
+        """
+        Pick up changes written by the loader since the last check
+
+        Derived structures and the shared verdict cache are dropped when
+        the database version has changed. If structures are registered with
+        prebuild(), the new version is built in the background instead and
+        the current one keeps serving until it is swapped in.
+
+        Returns:
+            True if the knowledge base changed
+        """
+        version = self._read_version()
+        if version == self.version or version == self._prebuild_version:
+            return False
+
+        logger.info(f"Hazard knowledge base changed (version {version})")
+        with self._derived_lock:
+            if self._prebuilders:
+                self._prebuild_version = version
+                self._start_prebuild()
+                return True
+            self._derived.clear()
+            self.version = version
+        get_verdict_cache().invalidate()
+        return True
+
+    def derived(self, key: str, builder: Callable[[], Any]) -> Any:
+        """
+        Get a structure derived from the knowledge base, building it once
+
+        Args:
+            key: Name of the derived structure
+            builder: Callable building the structure on first use
+
+        Returns:
+            The shared derived structure
+        """
+        staging = getattr(self._local, 'staging', None)
+        if staging is not None:
+            # On the prebuild thread: build against the version being staged
+            if key not in staging:
+                staging[key] = builder()
+            return staging[key]
+
+        value = self._derived.get(key)
+        if value is None:
+            with self._derived_lock:
+                # Wait for a structure the background thread is building rather than building it twice
+                while key not in self._derived and key in self._prebuilders and self._prebuild_thread is not None:
+                    self._prebuilt.wait()
+                value = self._derived.get(key)
+                if value is None:
+                    value = self._derived[key] = builder()
+        return value
+
+    def prebuild(self, key: str, builder: Callable[[], Any]):
+        """
+        Build a derived structure on a background thread, now and after every change
+
+        Args:
+            key: Name of the derived structure (as passed to derived())
+            builder: Callable building the structure; structures it gets
+                through derived() are built against the same version
+        """
+        with self._derived_lock:
+            if key in self._prebuilders:
+                return
+            self._prebuilders[key] = builder
+            self._start_prebuild()
+
+    def _start_prebuild(self):
+        """Start the prebuild thread unless it is running (it re-checks for work before exiting)"""
+        if self._prebuild_thread is None:
+            self._prebuild_thread = threading.Thread(target=self._prebuild, name='hazard-kb-prebuild', daemon=True)
+            self._prebuild_thread.start()
+
+    def _prebuild(self):
+        """Build missing or outdated prebuilt structures until there is nothing left to do"""
+        while True:
+            with self._derived_lock:
+                version = self._prebuild_version or self.version
+                current = version == self.version
+                builders = {key: builder for key, builder in self._prebuilders.items()
+                            if not (current and key in self._derived)}
+                if not builders:
+                    self._prebuild_thread = None
+                    self._prebuilt.notify_all()
+                    return
+                # The current version only needs its missing structures; a new one starts empty
+                staging = dict(self._derived) if current else {}
+
+            start = time.perf_counter()
+            self._local.staging = staging
+            try:
+                for key, builder in builders.items():
+                    if key not in staging:
+                        staging[key] = builder()
+            except Exception:
+                logger.exception("Building hazard knowledge base structures failed - building on first use instead")
+                with self._derived_lock:
+                    self._prebuilders.clear()
+                    self._prebuild_version = None
+                    self._prebuild_thread = None
+                    self._prebuilt.notify_all()
+                return
+            finally:
+                self._local.staging = None
+
+            with self._derived_lock:
+                if current:
+                    for key, value in staging.items():
+                        self._derived.setdefault(key, value)
+                else:
+                    self._derived = staging
+                    self.version = version
+                    if self._prebuild_version == version:
+                        self._prebuild_version = None
+                    get_verdict_cache().invalidate()
+                self._prebuilt.notify_all()
+            logger.info(f"Built {len(builders)} hazard knowledge base structures for version {version} "
+                        f"in {time.perf_counter() - start:.2f}s")
+
+    def lookup(self, name: str) -> Optional[Dict]:
+        """
+        Look up a substance by exact normalized name, alias or CAS number
+
+        Args:
+            name: Substance name, alias or CAS number
+
+        Returns:
+            Substance record or None if unknown
+        """
+        normalized = normalize_name(name)
+        connection = self._connection()
+
+        row = connection.execute(
+            "SELECT * FROM substances WHERE normalized_name = ?", (normalized,)
+        ).fetchone()
+        if row is None:
+            row = connection.execute(
+                "SELECT s.* FROM aliases a JOIN substances s ON s.id = a.substance_id "
+                "WHERE a.alias = ? ORDER BY s.id LIMIT 1", (normalized,)
+            ).fetchone()
+        if row is None:
+            row = connection.execute(
+                "SELECT * FROM substances WHERE cas_number = ? ORDER BY id LIMIT 1", (normalized,)
+            ).fetchone()
+
+        return self._to_record(row) if row is not None else None
+
+    def hazard_table(self) -> Dict[str, Dict]:
+        """
+        Get every substance with a hazard score, in table order
+
+        Returns:
+            Mapping of normalized name to {'hazard', 'concerns'}
+        """
+        def build():
+            rows = self._connection().execute(
+                "SELECT normalized_name, hazard, concerns FROM substances "
+                "WHERE hazard IS NOT NULL ORDER BY id"
+            )
+            return {
+                row['normalized_name']: {'hazard': row['hazard'], 'concerns': json.loads(row['concerns'])}
+                for row in rows
+            }
+
+        return self.derived('hazard_table', build)
+
+    def allergens(self) -> List[str]:
+        """Get the common allergen names, in table order"""
+        return self.derived('allergens', lambda: self._names_where('allergen = 1'))
+
+    def banned_substances(self) -> List[str]:
+        """Get the banned or restricted substance names, in table order"""
+        return self.derived('banned_substances', lambda: self._names_where('banned = 1'))
+
+    def alternatives(self) -> Dict[str, List[str]]:
+        """
+        Get safer alternatives for every substance that has some
+
+        Returns:
+            Mapping of normalized name to ordered list of alternatives
+        """
+        def build():
+            table: Dict[str, List[str]] = {}
+            rows = self._connection().execute(
+                "SELECT s.normalized_name, a.alternative FROM alternatives a "
+                "JOIN substances s ON s.id = a.substance_id ORDER BY s.id, a.position"
+            )
+            for row in rows:
+                table.setdefault(row['normalized_name'], []).append(row['alternative'])
+            return table
+
+        return self.derived('alternatives', build)
+
+    def name_keys(self) -> Iterator[Tuple[str, int]]:
+        """
+        Iterate every lookup key of every substance
+
+        Yields:
+            (key, substance_id) for normalized names, then aliases, then
+            CAS numbers, each in table order
+        """
+        connection = self._connection()
+        yield from connection.execute("SELECT normalized_name, id FROM substances ORDER BY id")
+        yield from connection.execute("SELECT alias, substance_id FROM aliases ORDER BY substance_id")
+        yield from connection.execute(
+            "SELECT cas_number, id FROM substances WHERE cas_number IS NOT NULL ORDER BY id"
+        )
+
+    def count(self) -> int:
+        """Number of substances in the knowledge base"""
+        return self._connection().execute("SELECT COUNT(*) FROM substances").fetchone()[0]
+
+    def _names_where(self, condition: str) -> List[str]:
+        rows = self._connection().execute(
+            f"SELECT normalized_name FROM substances WHERE {condition} ORDER BY id"
+        )
+        return [row['normalized_name'] for row in rows]
+
+    def _to_record(self, row: sqlite3.Row) -> Dict:
+        return {
+            'id': row['id'],
+            'name': row['normalized_name'],
+            'cas_number': row['cas_number'],
+            'hazard': row['hazard'],
+            'concerns': json.loads(row['concerns']),
+            'banned': bool(row['banned']),
+            'allergen': bool(row['allergen'])
+        }
+
+
+def _read_records(path: str) -> Iterator[Dict]:
+    """Yield raw records from a CSV or JSONL file"""
+    if path.endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                yield {key: value for key, value in row.items() if value not in (None, '')}
+    else:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _parse_list(value: Any) -> List[str]:
+    """Lists come as JSON arrays (JSONL) or '|'-separated strings (CSV)"""
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [str(item).strip() for item in value if str(item).strip()]
+    value = str(value).strip()
+    if value.startswith('['):
+        return _parse_list(json.loads(value))
+    return [item.strip() for item in value.split('|') if item.strip()]
+
+
+def _parse_flag(value: Any) -> int:
+    if isinstance(value, str):
+        return int(value.strip().lower() in ('1', 'true', 'yes', 'y'))
+    return int(bool(value))
+
+
+def _file_digest(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+# Upserts by normalized name: imported values win, or existing values win and
+# the record only fills gaps (see bulk_import's overwrite argument)
+_UPSERT_OVERWRITE = (
+    "name = excluded.name, cas_number = COALESCE(excluded.cas_number, cas_number), "
+    "hazard = COALESCE(excluded.hazard, hazard), "
+    "concerns = CASE WHEN excluded.concerns = '[]' THEN concerns ELSE excluded.concerns END, "
+    "banned = MAX(banned, excluded.banned), allergen = MAX(allergen, excluded.allergen)"
+)
+_UPSERT_MERGE = (
+    "cas_number = COALESCE(cas_number, excluded.cas_number), "
+    "hazard = COALESCE(hazard, excluded.hazard), "
+    "concerns = CASE WHEN concerns = '[]' THEN excluded.concerns ELSE concerns END, "
+    "banned = MAX(banned, excluded.banned), allergen = MAX(allergen, excluded.allergen)"
+)
+
+
+def bulk_import(db_path: str, paths: Iterable[str], batch_size: int = 10000,
+                metadata: Optional[Dict[str, str]] = None, overwrite: bool = True) -> int:
+    """
+    Bulk-import substances from CSV or JSONL files into the knowledge base
+
+    Records are upserted by normalized name. Recognized fields are name
+    (required), cas_number, hazard, concerns, aliases, alternatives,
+    banned and allergen; list fields are JSON arrays in JSONL and
+    '|'-separated in CSV. The database version is bumped so running
+    services pick up the change on their next refresh().
+
+    Args:
+        db_path: Path to the SQLite database (created if missing)
+        paths: CSV (.csv) or JSONL files to import
+        batch_size: Records written per executemany batch
+        metadata: Extra metadata key/values to record with the import
+        overwrite: Whether imported values replace existing ones; when
+            False, existing substances keep their values and alternatives
+            and only gain missing fields, aliases and flags
+
+    Returns:
+        Number of records imported
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+    connection = sqlite3.connect(db_path)
+    connection.executescript(SCHEMA)
+    connection.execute("PRAGMA synchronous = OFF")
+
+    start = time.perf_counter()
+    imported = 0
+
+    def flush(batch: List[Dict]):
+        connection.executemany(
+            "INSERT INTO substances (name, normalized_name, cas_number, hazard, concerns, banned, allergen) "
+            "VALUES (:name, :normalized_name, :cas_number, :hazard, :concerns, :banned, :allergen) "
+            f"ON CONFLICT(normalized_name) DO UPDATE SET {_UPSERT_OVERWRITE if overwrite else _UPSERT_MERGE}",
+            batch
+        )
+        ids = {}
+        for record in batch:
+            ids[record['normalized_name']] = connection.execute(
+                "SELECT id FROM substances WHERE normalized_name = ?", (record['normalized_name'],)
+            ).fetchone()[0]
+
+        connection.executemany(
+            "INSERT OR IGNORE INTO aliases (alias, substance_id) VALUES (?, ?)",
+            [(alias, ids[record['normalized_name']]) for record in batch for alias in record['aliases']]
+        )
+        with_alternatives = [
+            record for record in batch if record['alternatives'] and (overwrite or connection.execute(
+                "SELECT 1 FROM alternatives WHERE substance_id = ? LIMIT 1", (ids[record['normalized_name']],)
+            ).fetchone() is None)
+        ]
+        connection.executemany(
+            "DELETE FROM alternatives WHERE substance_id = ?",
+            [(ids[record['normalized_name']],) for record in with_alternatives]
+        )
+        connection.executemany(
+            "INSERT INTO alternatives (substance_id, position, alternative) VALUES (?, ?, ?)",
+            [(ids[record['normalized_name']], position, alternative)
+             for record in with_alternatives
+             for position, alternative in enumerate(record['alternatives'])]
+        )
+
+    with connection:
+        batch: List[Dict] = []
+        for path in paths:
+            for raw in _read_records(path):
+                name = str(raw.get('name', '')).strip()
+                if not name:
+                    logger.warning(f"Skipping record without a name in {path}")
+                    continue
+
+                hazard = raw.get('hazard')
+                batch.append({
+                    'name': name,
+                    'normalized_name': normalize_name(name),
+                    'cas_number': str(raw['cas_number']).strip() if raw.get('cas_number') else None,
+                    'hazard': int(hazard) if hazard not in (None, '') else None,
+                    'concerns': json.dumps(_parse_list(raw.get('concerns'))),
+                    'banned': _parse_flag(raw.get('banned', False)),
+                    'allergen': _parse_flag(raw.get('allergen', False)),
+                    'aliases': [normalize_name(alias) for alias in _parse_list(raw.get('aliases'))],
+                    'alternatives': _parse_list(raw.get('alternatives'))
+                })
+
+                if len(batch) >= batch_size:
+                    flush(batch)
+                    imported += len(batch)
+                    batch = []
+
+        if batch:
+            flush(batch)
+            imported += len(batch)
+
+        connection.executemany(
+            "INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)",
+            [('version', uuid.uuid4().hex), *(metadata or {}).items()]
+        )
+
+    connection.execute("ANALYZE")
+    connection.close()
+
+    logger.info(f"Imported {imported} substances into {db_path} in {time.perf_counter() - start:.2f}s")
+    return imported
+
+
+def migrate_seed(db_path: str = Config.HAZARD_DB_PATH, seed_path: str = Config.HAZARD_SEED_PATH) -> int:
+    """
+    Merge a changed seed file into an existing knowledge base
+
+    Seed records are merged without overwriting (see bulk_import's
+    overwrite argument), so data loaded with the bulk import CLI is kept.
+    The seed digest is recorded, and a database already at this seed is
+    left alone, so the migration can be run any number of times.
+
+    Args:
+        db_path: Path to the SQLite database
+        seed_path: Seed JSONL file
+
+    Returns:
+        Number of seed records merged (0 when already up to date)
+    """
+    seed_digest = _file_digest(seed_path)
+    if os.path.exists(db_path):
+        connection = sqlite3.connect(db_path)
+        try:
+            connection.executescript(SCHEMA)
+            row = connection.execute("SELECT value FROM metadata WHERE key = 'seed_digest'").fetchone()
+        finally:
+            connection.close()
+        if row is not None and row[0] == seed_digest:
+            logger.info("Hazard knowledge base is already at the current seed data")
+            return 0
+
+    return bulk_import(db_path, [seed_path], metadata={'seed_digest': seed_digest}, overwrite=False)
+
+
+_shared_knowledge_base: Optional[HazardKnowledgeBase] = None
+_shared_knowledge_base_lock = threading.Lock()
+
+
+def get_knowledge_base() -> HazardKnowledgeBase:
+    """Get the process-wide knowledge base shared by all services"""
+    global _shared_knowledge_base
+    if _shared_knowledge_base is None:
+        with _shared_knowledge_base_lock:
+            if _shared_knowledge_base is None:
+                _shared_knowledge_base = HazardKnowledgeBase()
+    return _shared_knowledge_base
+
+
+def main():
+    """Command line loader: python -m src.services.hazard_knowledge_base [--migrate-seed] [FILE...]"""
+    parser = argparse.ArgumentParser(description="Bulk-import hazard data into the knowledge base")
+    parser.add_argument('files', nargs='*', help="CSV or JSONL files to import")
+    parser.add_argument('--db', default=Config.HAZARD_DB_PATH, help="SQLite database path")
+    parser.add_argument('--migrate-seed', action='store_true',
+                        help="Merge changes of the seed file, keeping existing records")
+    args = parser.parse_args()
+    if not args.files and not args.migrate_seed:
+        parser.error("give files to import and/or --migrate-seed")
+
+    if args.migrate_seed:
+        migrate_seed(args.db)
+    if args.files:
+        bulk_import(args.db, args.files)
+
+
+if __name__ == "__main__":
+    main()
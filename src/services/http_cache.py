@@ -0,0 +1,269 @@
+import hashlib
+import http.client
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+from typing import Callable, Dict, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# Add parent directory to path for config import
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Response headers kept with a cached body
+_STORED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Date')
+# Long-running processes purge old entries again after this many stores
+_PURGE_EVERY = 1000
+
+
+class HTTPResponseCache:
+    """Persistent cache of HTTP GET responses, shared by all processes on a host
+
+    Bodies are stored zlib-compressed in SQLite (WAL mode, so readers in
+    other processes are never blocked by a writer), keyed by the full
+    request URL. A fresh entry is answered without a request. Once its
+    endpoint's TTL has passed, the entry is revalidated with If-None-Match /
+    If-Modified-Since, and a 304 only renews it. Not-found answers are kept
+    for a shorter TTL of their own. When the network fails, a stale entry
+    is served instead of an error. Entries that expired more than max_age
+    seconds ago are purged when the cache opens and after every 1000
+    stores.
+    """
+
+    def __init__(self, db_path: str = Config.OPENFOODFACTS_CACHE_PATH,
+                 ttls: Optional[Dict[str, int]] = None,
+                 not_found_ttl: int = Config.OPENFOODFACTS_NOT_FOUND_TTL,
+                 max_age: int = Config.OPENFOODFACTS_CACHE_MAX_AGE):
+        """
+        Open (or create) the cache
+
+        Args:
+            db_path: Path to the SQLite cache file
+            ttls: Seconds a response stays fresh, per endpoint name; the
+                'default' entry covers unnamed endpoints
+            not_found_ttl: Seconds a not-found response stays fresh
+            max_age: Seconds past expiry an entry is kept before it is purged
+        """
+        self.db_path = db_path
+        self.ttls = dict(ttls if ttls is not None else Config.OPENFOODFACTS_CACHE_TTLS)
+        self.not_found_ttl = not_found_ttl
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'stale_served': 0,
+                       'stores': 0, 'bytes_saved': 0}
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self._connection = sqlite3.connect(db_path, timeout=10, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode = WAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                body_bytes INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                not_found INTEGER NOT NULL,
+                stored REAL NOT NULL,
+                expires REAL NOT NULL
+            )
+        """)
+        self._connection.execute("CREATE INDEX IF NOT EXISTS responses_expires ON responses (expires)")
+        self._connection.commit()
+        self._purge_quietly()
+
+    def get(self, session: requests.Session, url: str, params: Optional[Dict] = None,
+            endpoint: str = 'default', not_found: Optional[Callable[[requests.Response], bool]] = None,
+            **kwargs) -> requests.Response:
+        """
+        GET a URL through the cache
+
+        Args:
+            session: Session used for requests that reach the network
+            url: Request URL
+            params: Query parameters
+            endpoint: Endpoint name selecting the TTL
+            not_found: Whether a successful response means "not found"
+                (404 responses always do)
+            **kwargs: Passed on to session.get (e.g. timeout)
+
+        Returns:
+            The response, from the cache or the network
+        """
+        full_url = requests.Request('GET', url, params=params).prepare().url
+        key = hashlib.blake2b(full_url.encode(), digest_size=16).hexdigest()
+        try:
+            with self._lock:
+                row = self._connection.execute(
+                    "SELECT status, headers, body, body_bytes, etag, last_modified, expires "
+                    "FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"HTTP cache lookup failed, going to the network: {str(e)}")
+            row = None
+
+        if row is not None and row[6] > time.time():
+            self._count('hits', row[3])
+            return self._response(full_url, row)
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if row is not None:
+            if row[4]:
+                headers['If-None-Match'] = row[4]
+            if row[5]:
+                headers['If-Modified-Since'] = row[5]
+
+        try:
+            response = session.get(full_url, headers=headers, **kwargs)
+        except requests.RequestException as e:
+            if row is None:
+                raise
+            logger.warning(f"Serving stale cached response for {full_url}: {str(e)}")
+            self._count('stale_served', row[3])
+            return self._response(full_url, row)
+
+        # A write can fail if another process holds the lock for too long; the answer is still good
+        if response.status_code == 304 and row is not None:
+            try:
+                self._renew(key, response)
+            except sqlite3.Error as e:
+                logger.warning(f"Could not renew HTTP cache entry for {full_url}: {str(e)}")
+            self._count('revalidated', row[3])
+            return self._response(full_url, row)
+
+        self._count('misses')
+        try:
+            self._store(key, full_url, response, endpoint, not_found)
+        except sqlite3.Error as e:
+            logger.warning(f"Could not store HTTP cache entry for {full_url}: {str(e)}")
+        return response
+
+    def _response(self, url: str, row: tuple) -> requests.Response:
+        """Rebuild a response from a cache row"""
+        response = requests.Response()
+        response.status_code = row[0]
+        response.headers = CaseInsensitiveDict(json.loads(row[1]))
+        response._content = zlib.decompress(row[2])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.url = url
+        response.reason = http.client.responses.get(row[0], '')
+        return response
+
+    def _store(self, key: str, url: str, response: requests.Response, endpoint: str,
+               not_found: Optional[Callable[[requests.Response], bool]]):
+        """Store a response that may be reused (2xx or 404, not marked no-store)"""
+        if not (200 <= response.status_code < 300 or response.status_code == 404):
+            return
+        if 'no-store' in response.headers.get('Cache-Control', ''):
+            return
+
+        try:
+            is_not_found = response.status_code == 404 or bool(not_found and not_found(response))
+        except ValueError:
+            # Unparseable body: not worth caching
+            return
+        ttl = self.not_found_ttl if is_not_found else self.ttls.get(endpoint, self.ttls.get('default', 0))
+        if ttl <= 0:
+            return
+
+        body = response.content
+        headers = {name: response.headers[name] for name in _STORED_HEADERS if name in response.headers}
+        now = time.time()
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO responses (key, url, status, headers, body, body_bytes, etag, "
+                "last_modified, not_found, stored, expires) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, url, response.status_code, json.dumps(headers), zlib.compress(body, 6), len(body),
+                 response.headers.get('ETag'), response.headers.get('Last-Modified'),
+                 int(is_not_found), now, now + ttl)
+            )
+            self._connection.commit()
+            self._stats['stores'] += 1
+            purge_due = self._stats['stores'] % _PURGE_EVERY == 0
+        if purge_due:
+            self._purge_quietly()
+
+    def _renew(self, key: str, response: requests.Response):
+        """Extend an entry the server confirmed (304) by the TTL it was stored with"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT stored, expires, etag, last_modified FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return
+            stored, expires, etag, last_modified = row
+            now = time.time()
+            self._connection.execute(
+                "UPDATE responses SET stored = ?, expires = ?, etag = ?, last_modified = ? WHERE key = ?",
+                (now, now + (expires - stored), response.headers.get('ETag', etag),
+                 response.headers.get('Last-Modified', last_modified), key)
+            )
+            self._connection.commit()
+
+    def _count(self, kind: str, body_bytes: int = 0):
+        with self._lock:
+            self._stats[kind] += 1
+            if kind != 'misses':
+                self._stats['bytes_saved'] += body_bytes
+
+    def _purge_quietly(self):
+        """purge(), logging instead of raising when another process holds the lock"""
+        try:
+            deleted = self.purge()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not purge the HTTP cache: {str(e)}")
+            return
+        if deleted:
+            logger.info(f"Purged {deleted} expired HTTP cache entries")
+
+    def purge(self, max_age: Optional[float] = None) -> int:
+        """
+        Delete entries that expired more than max_age seconds ago
+
+        Args:
+            max_age: Seconds past expiry an entry is kept for revalidation
+                and for serving while the network is down (default: the
+                cache's max_age)
+
+        Returns:
+            Number of entries deleted
+        """
+        max_age = self.max_age if max_age is None else max_age
+        with self._lock:
+            cursor = self._connection.execute("DELETE FROM responses WHERE expires < ?", (time.time() - max_age,))
+            self._connection.commit()
+        return cursor.rowcount
+
+    def stats(self) -> Dict:
+        """
+        Get cumulative statistics of this process
+
+        Returns:
+            Dictionary with fresh hits, revalidated (304) hits, misses,
+            stale responses served, stores, hit rate, body bytes saved, and
+            the entries, body bytes and compressed bytes in the shared store
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            entries, body_bytes, stored_bytes, not_found = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(body_bytes), 0), COALESCE(SUM(LENGTH(body)), 0), "
+                "COALESCE(SUM(not_found), 0) FROM responses"
+            ).fetchone()
+
+        lookups = stats['hits'] + stats['revalidated'] + stats['misses'] + stats['stale_served']
+        stats['hit_rate'] = round((lookups - stats['misses']) / max(1, lookups), 3)
+        stats.update(entries=entries, not_found_entries=not_found, body_bytes=body_bytes,
+                     stored_bytes=stored_bytes)
+        return stats
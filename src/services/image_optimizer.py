@@ -0,0 +1,222 @@
+import io
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from typing import Dict, Optional, Tuple, Union
+
+from PIL import Image, ImageOps
+
+# Add parent directory to path for config import
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Formats Pillow decodes with the JPEG decoder; many phones save multi-picture
+# JPEGs, which Pillow reports as MPO
+_JPEG_FORMATS = {'JPEG', 'MPO'}
+
+
+class UploadOptimizer:
+    """Shrinks images in memory before they are uploaded to Vision
+
+    Phone photos are far larger than OCR needs. Each image is decoded at
+    reduced resolution where the format allows it (JPEG draft mode),
+    EXIF-rotated, downscaled so its long side fits the target, converted
+    to grayscale when only text detection will see it (label detection
+    needs color) and re-encoded at a tuned quality. The original
+    bytes are kept whenever re-encoding would not make them smaller.
+    """
+
+    def __init__(self, max_dimension: int = Config.UPLOAD_MAX_DIMENSION,
+                 grayscale: bool = Config.UPLOAD_GRAYSCALE,
+                 image_format: str = Config.UPLOAD_FORMAT,
+                 quality: int = Config.UPLOAD_QUALITY,
+                 bandwidth: float = Config.UPLOAD_BANDWIDTH):
+        """
+        Initialize the optimizer
+
+        Args:
+            max_dimension: Target length in pixels of the long image side
+            grayscale: Whether to drop color from uploads that only go to
+                text detection; uploads that also get label detection keep it
+            image_format: Output format, 'JPEG' or 'WEBP'
+            quality: Encoder quality (1-100)
+            bandwidth: Assumed upload bandwidth in bytes/s, used to estimate
+                the latency saved
+        """
+        self.max_dimension = max_dimension
+        self.grayscale = grayscale
+        self.image_format = image_format.upper()
+        self.quality = quality
+        self.bandwidth = bandwidth
+        self._lock = threading.Lock()
+        self._totals = {'images': 0, 'original_bytes': 0, 'optimized_bytes': 0,
+                        'processing_ms': 0.0, 'latency_saved_ms': 0.0}
+
+    def optimize(self, content: Union[bytes, memoryview],
+                 labels: bool = False) -> Tuple[Union[bytes, memoryview], Dict]:
+        """
+        Downscale and re-encode one image
+
+        Args:
+            content: Encoded image bytes (any bytes-like buffer)
+            labels: Whether the upload also goes to label detection, which
+                needs color
+
+        Returns:
+            Tuple of (bytes to upload, statistics for this image); the
+            input buffer itself is returned when it is already small
+        """
+        start = time.perf_counter()
+        original_size = optimized_size = None
+        optimized = content
+        mode = 'L' if self.grayscale and not labels else 'RGB'
+
+        try:
+            image = Image.open(io.BytesIO(content))
+            original_size = image.size
+            target = self._target_size(image.size)
+
+            # Let the JPEG decoder skip detail we would throw away anyway
+            if image.format in _JPEG_FORMATS and target != image.size:
+                image.draft(mode, target)
+
+            image = ImageOps.exif_transpose(image)
+            image = image.convert(mode)
+            if max(image.size) > self.max_dimension:
+                image.thumbnail((self.max_dimension, self.max_dimension), Image.LANCZOS, reducing_gap=2.0)
+            optimized_size = image.size
+
+            buffer = io.BytesIO()
+            image.save(buffer, format=self.image_format, quality=self.quality)
+            if buffer.tell() < memoryview(content).nbytes:
+                optimized = buffer.getvalue()
+
+        except Exception as e:
+            logger.warning(f"Could not optimize image for upload, sending original: {str(e)}")
+
+        processing_ms = (time.perf_counter() - start) * 1000
+        stats = self._record(content, memoryview(optimized).nbytes, processing_ms)
+        stats.update({'original_size': original_size, 'optimized_size': optimized_size})
+
+        logger.info(
+            f"Upload optimized {stats['original_bytes'] / 1024:.0f} KB -> {stats['optimized_bytes'] / 1024:.0f} KB "
+            f"({stats['compression_ratio']}x) in {processing_ms:.0f} ms, ~{stats['latency_saved_ms']:.0f} ms saved"
+        )
+        return optimized, stats
+
+    def optimize_region(self, content: Union[bytes, memoryview], box: Tuple[float, float, float, float],
+                        context_dimension: Optional[int]) -> Tuple[bytes, Optional[bytes], Dict]:
+        """
+        Crop one image to a region, plus a small view of the whole frame
+
+        The image is decoded once, at the reduced scale that still keeps the
+        region at full upload resolution. The region goes to text detection
+        (in grayscale when that is enabled); the whole-frame thumbnail keeps
+        label detection working and stays in color.
+
+        Args:
+            content: Encoded image bytes (any bytes-like buffer)
+            box: Region as (left, top, right, bottom) fractions of the
+                EXIF-rotated image
+            context_dimension: Long side (px) of the whole-frame thumbnail;
+                None to skip the thumbnail
+
+        Returns:
+            Tuple of (region bytes, thumbnail bytes or None, statistics for
+            this image, counting both uploads)
+        """
+        start = time.perf_counter()
+        image = Image.open(io.BytesIO(content))
+        original_size = image.size
+
+        # Size the decode for the region, in the stored (pre-rotation) orientation
+        rotated = image.getexif().get(0x0112) in (5, 6, 7, 8)
+        region_width = (box[2] - box[0]) * original_size[1 if rotated else 0]
+        region_height = (box[3] - box[1]) * original_size[0 if rotated else 1]
+        scale = min(1.0, self.max_dimension / max(region_width, region_height, 1))
+        if image.format in _JPEG_FORMATS and scale < 1:
+            image.draft('RGB', (math.ceil(original_size[0] * scale), math.ceil(original_size[1] * scale)))
+
+        image = ImageOps.exif_transpose(image)
+        image = image.convert('RGB')
+        width, height = image.size
+        region = image.crop((round(box[0] * width), round(box[1] * height),
+                             round(box[2] * width), round(box[3] * height)))
+        if self.grayscale:
+            region = region.convert('L')
+        if max(region.size) > self.max_dimension:
+            region.thumbnail((self.max_dimension, self.max_dimension), Image.LANCZOS, reducing_gap=2.0)
+        parts = [region]
+        if context_dimension is not None:
+            image.thumbnail((context_dimension, context_dimension), Image.LANCZOS, reducing_gap=2.0)
+            parts.append(image)
+
+        encoded = []
+        for part in parts:
+            buffer = io.BytesIO()
+            part.save(buffer, format=self.image_format, quality=self.quality)
+            encoded.append(buffer.getvalue())
+        thumbnail = encoded[1] if len(encoded) > 1 else None
+
+        processing_ms = (time.perf_counter() - start) * 1000
+        stats = self._record(content, sum(len(part) for part in encoded), processing_ms)
+        stats.update({'original_size': original_size, 'optimized_size': region.size,
+                      'context_size': image.size if thumbnail is not None else None})
+
+        logger.info(
+            f"Upload cropped {stats['original_bytes'] / 1024:.0f} KB -> {len(encoded[0]) / 1024:.0f} KB region"
+            + (f" + {len(thumbnail) / 1024:.0f} KB thumbnail" if thumbnail is not None else "")
+            + f" in {processing_ms:.0f} ms"
+        )
+        return encoded[0], thumbnail, stats
+
+    def _target_size(self, size: Tuple[int, int]) -> Tuple[int, int]:
+        """Image size once the long side fits max_dimension"""
+        scale = min(1.0, self.max_dimension / max(size))
+        return math.ceil(size[0] * scale), math.ceil(size[1] * scale)
+
+    def _record(self, content: Union[bytes, memoryview], optimized_bytes: int, processing_ms: float) -> Dict:
+        """Build the statistics of one image and add them to the totals"""
+        original_bytes = memoryview(content).nbytes
+        bytes_saved = original_bytes - optimized_bytes
+        upload_ms_saved = bytes_saved / self.bandwidth * 1000
+        latency_saved_ms = upload_ms_saved - processing_ms
+
+        with self._lock:
+            self._totals['images'] += 1
+            self._totals['original_bytes'] += original_bytes
+            self._totals['optimized_bytes'] += optimized_bytes
+            self._totals['processing_ms'] += processing_ms
+            self._totals['latency_saved_ms'] += latency_saved_ms
+
+        return {
+            'original_bytes': original_bytes,
+            'optimized_bytes': optimized_bytes,
+            'bytes_saved': bytes_saved,
+            'compression_ratio': round(original_bytes / max(1, optimized_bytes), 2),
+            'processing_ms': round(processing_ms, 2),
+            'upload_ms_saved': round(upload_ms_saved, 2),
+            'latency_saved_ms': round(latency_saved_ms, 2)
+        }
+
+    def stats(self) -> Dict:
+        """
+        Get cumulative statistics
+
+        Returns:
+            Dictionary with images, bytes before/after, bytes saved,
+            compression ratio, processing time and estimated latency saved
+        """
+        with self._lock:
+            totals = dict(self._totals)
+
+        totals['bytes_saved'] = totals['original_bytes'] - totals['optimized_bytes']
+        totals['compression_ratio'] = round(totals['original_bytes'] / max(1, totals['optimized_bytes']), 2)
+        totals['processing_ms'] = round(totals['processing_ms'], 2)
+        totals['latency_saved_ms'] = round(totals['latency_saved_ms'], 2)
+        return totals
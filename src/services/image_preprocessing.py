@@ -0,0 +1,183 @@
+import io
+import logging
+import os
+import sys
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Add parent directory to path for config import
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# An image given as a file path or as its encoded bytes (e.g. an upload buffer)
+ImageSource = Union[str, bytes, bytearray, memoryview]
+
+# JPEG decoders can scale by 1/2, 1/4 or 1/8 while decoding
+_REDUCED_GRAYSCALE_FLAGS = {
+    1: cv2.IMREAD_GRAYSCALE,
+    2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+    4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    8: cv2.IMREAD_REDUCED_GRAYSCALE_8
+}
+
+# Preset name -> ordered (stage, parameters) list. Every preset starts with a
+# reduced-resolution grayscale decode sized for its max_dimension.
+PREPROCESSING_PRESETS: Dict[str, List[Tuple[str, Dict]]] = {
+    'fast': [
+        ('downscale', {'max_dimension': 1600}),
+        ('median', {'ksize': 3})
+    ],
+    'balanced': [
+        ('downscale', {'max_dimension': 2000}),
+        ('median', {'ksize': 3}),
+        ('clahe', {'clip_limit': 2.0, 'tile_grid_size': 8})
+    ],
+    'quality': [
+        ('downscale', {'max_dimension': 3000}),
+        ('bilateral', {'diameter': 7, 'sigma_color': 50, 'sigma_space': 50}),
+        ('clahe', {'clip_limit': 2.5, 'tile_grid_size': 8}),
+        ('adaptive_threshold', {'block_size': 31, 'offset': 10})
+    ]
+}
+
+
+def _downscale(image: np.ndarray, max_dimension: int) -> np.ndarray:
+    """Shrink so the long side fits max_dimension"""
+    scale = max_dimension / max(image.shape[:2])
+    if scale >= 1:
+        return image
+    size = (round(image.shape[1] * scale), round(image.shape[0] * scale))
+    # Area averaging only pays off for large ratios; the reduced decode usually leaves < 2x
+    interpolation = cv2.INTER_AREA if scale < 0.5 else cv2.INTER_LINEAR
+    return cv2.resize(image, size, interpolation=interpolation)
+
+
+def _median(image: np.ndarray, ksize: int) -> np.ndarray:
+    """Remove salt-and-pepper noise"""
+    return cv2.medianBlur(image, ksize)
+
+
+def _bilateral(image: np.ndarray, diameter: int, sigma_color: float, sigma_space: float) -> np.ndarray:
+    """Smooth noise while keeping character edges sharp"""
+    return cv2.bilateralFilter(image, diameter, sigma_color, sigma_space)
+
+
+def _clahe(image: np.ndarray, clip_limit: float, tile_grid_size: int) -> np.ndarray:
+    """Local contrast enhancement (handles uneven lighting better than equalizeHist)"""
+    clahe = cv2.createCLAHE(clipLimit=clip_limit, tileGridSize=(tile_grid_size, tile_grid_size))
+    return clahe.apply(image)
+
+
+def _adaptive_threshold(image: np.ndarray, block_size: int, offset: float) -> np.ndarray:
+    """Binarize against the local mean"""
+    return cv2.adaptiveThreshold(
+        image, 255, cv2.ADAPTIVE_THRESH_MEAN_C, cv2.THRESH_BINARY, block_size, offset
+    )
+
+
+STAGES: Dict[str, Callable[..., np.ndarray]] = {
+    'downscale': _downscale,
+    'median': _median,
+    'bilateral': _bilateral,
+    'clahe': _clahe,
+    'adaptive_threshold': _adaptive_threshold
+}
+
+
+def image_dimensions(image: ImageSource) -> Optional[Tuple[int, int]]:
+    """
+    Read (width, height) from the image header without decoding pixels
+
+    Args:
+        image: Path or encoded bytes
+
+    Returns:
+        Image size, or None if the header cannot be read
+    """
+    try:
+        source = image if isinstance(image, str) else io.BytesIO(image)
+        with Image.open(source) as header:
+            return header.size
+    except Exception:
+        return None
+
+
+class PreprocessingPipeline:
+    """OCR preprocessing built from selectable stages
+
+    The image is decoded straight to grayscale at the smallest JPEG scale
+    (1/2, 1/4, 1/8) that still covers the pipeline's target resolution, so a
+    12 MP photo is never fully materialized when it does not need to be.
+    The remaining stages (downscale, median/bilateral filtering, CLAHE,
+    adaptive thresholding) run in order and each one is timed.
+    """
+
+    def __init__(self, preset: str = Config.PREPROCESSING_PRESET,
+                 stages: Optional[Sequence[Tuple[str, Dict]]] = None):
+        """
+        Initialize the pipeline
+
+        Args:
+            preset: Name of a preset in PREPROCESSING_PRESETS
+            stages: Explicit (stage, parameters) list overriding the preset
+        """
+        if stages is None:
+            if preset not in PREPROCESSING_PRESETS:
+                raise ValueError(f"Unknown preprocessing preset: {preset}")
+            stages = PREPROCESSING_PRESETS[preset]
+
+        unknown = [name for name, _ in stages if name not in STAGES]
+        if unknown:
+            raise ValueError(f"Unknown preprocessing stage(s): {', '.join(unknown)}")
+
+        self.preset = preset
+        self.stages = list(stages)
+        self.max_dimension = next(
+            (params['max_dimension'] for name, params in self.stages if name == 'downscale'), None
+        )
+
+    def run(self, image: ImageSource) -> Tuple[np.ndarray, Dict[str, float]]:
+        """
+        Preprocess one image
+
+        Args:
+            image: Path or encoded bytes
+
+        Returns:
+            Tuple of (processed grayscale image, milliseconds per stage
+            including 'decode' and 'total')
+        """
+        timings: Dict[str, float] = {}
+        start = time.perf_counter()
+
+        processed = self._decode(image)
+        if processed is None:
+            raise ValueError("Could not decode image")
+        timings['decode'] = (time.perf_counter() - start) * 1000
+
+        for name, params in self.stages:
+            stage_start = time.perf_counter()
+            processed = STAGES[name](processed, **params)
+            timings[name] = (time.perf_counter() - stage_start) * 1000
+
+        timings['total'] = (time.perf_counter() - start) * 1000
+        return processed, {name: round(ms, 2) for name, ms in timings.items()}
+
+    def _decode(self, image: ImageSource) -> Optional[np.ndarray]:
+        """Decode to grayscale at the coarsest scale that keeps max_dimension"""
+        factor = 1
+        dimensions = image_dimensions(image) if self.max_dimension else None
+        if dimensions:
+            while factor < 8 and max(dimensions) // (factor * 2) >= self.max_dimension:
+                factor *= 2
+
+        flag = _REDUCED_GRAYSCALE_FLAGS[factor]
+        if isinstance(image, str):
+            return cv2.imread(image, flag)
+        return cv2.imdecode(np.frombuffer(image, dtype=np.uint8), flag)
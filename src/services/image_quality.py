@@ -0,0 +1,196 @@
+import io
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Add parent directory to path for config import
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+from config import Config
+from .image_preprocessing import ImageSource, PreprocessingPipeline
+from .text_region import find_text_lines
+
+logger = logging.getLogger(__name__)
+
+# Sharpness is measured per tile of an 8x8 grid so flat packaging does not hide sharp text
+_SHARPNESS_GRID = 8
+
+
+class ImageQualityGate:
+    """Pre-flight check that rejects images OCR cannot read
+
+    Runs before any Vision request. File type, size and dimensions come
+    from the file header; blur (Laplacian variance of the sharpest tile),
+    exposure (mean brightness and clipped pixels) and the height of the
+    text lines are measured on a reduced grayscale decode. A failing
+    image is rejected with a reason, saving the remote call.
+    """
+
+    def __init__(self, min_dimension: int = Config.QUALITY_MIN_DIMENSION,
+                 min_sharpness: float = Config.QUALITY_MIN_SHARPNESS,
+                 brightness_range: Tuple[float, float] = Config.QUALITY_BRIGHTNESS_RANGE,
+                 max_clipped: float = Config.QUALITY_MAX_CLIPPED,
+                 min_text_height: float = Config.QUALITY_MIN_TEXT_HEIGHT,
+                 analysis_dimension: int = 1000):
+        """
+        Initialize the gate
+
+        Args:
+            min_dimension: Smallest accepted short side (px)
+            min_sharpness: Smallest accepted Laplacian variance of the
+                sharpest tile, at the analysis resolution
+            brightness_range: Accepted (min, max) mean gray level
+            max_clipped: Largest accepted fraction of near-black (or of
+                near-white) pixels
+            min_text_height: Smallest accepted median text-line height, in
+                pixels of the original image
+            analysis_dimension: Long side (px) of the image pixel checks run on
+        """
+        self.min_dimension = min_dimension
+        self.min_sharpness = min_sharpness
+        self.brightness_range = brightness_range
+        self.max_clipped = max_clipped
+        self.min_text_height = min_text_height
+        self.allowed_formats = {
+            Image.registered_extensions().get(extension) for extension in Config.ALLOWED_EXTENSIONS
+        } - {None}
+        self._pipeline = PreprocessingPipeline(stages=[('downscale', {'max_dimension': analysis_dimension})])
+        self._lock = threading.Lock()
+        self._totals = {'checked': 0, 'passed': 0, 'rejected': 0, 'check_ms': 0.0}
+        self._reasons = Counter()
+
+    def check(self, image: ImageSource, filename: Optional[str] = None) -> Dict:
+        """
+        Check one image
+
+        Args:
+            image: Path or encoded bytes
+            filename: Original file name, for the extension check of uploads
+                (defaults to the path)
+
+        Returns:
+            Dictionary with 'passed', 'check' (name of the failed check or
+            None), 'reason' (message for the user or None), 'metrics' and
+            'elapsed_ms'
+        """
+        start = time.perf_counter()
+        metrics: Dict = {}
+        failed = self._check_header(image, filename or (image if isinstance(image, str) else None), metrics)
+        if failed is None:
+            failed = self._check_pixels(image, metrics)
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        check, reason = failed if failed is not None else (None, None)
+        with self._lock:
+            self._totals['checked'] += 1
+            self._totals['passed' if check is None else 'rejected'] += 1
+            self._totals['check_ms'] += elapsed_ms
+            if check is not None:
+                self._reasons[check] += 1
+
+        if check is not None:
+            logger.info(f"Image rejected before OCR in {elapsed_ms:.0f} ms ({check}): {reason}")
+
+        return {
+            'passed': check is None,
+            'check': check,
+            'reason': reason,
+            'metrics': metrics,
+            'elapsed_ms': round(elapsed_ms, 2)
+        }
+
+    def _check_header(self, image: ImageSource, filename: Optional[str], metrics: Dict) -> Optional[Tuple[str, str]]:
+        """File type, size and dimensions; (check, reason) of the first failure"""
+        if filename:
+            extension = os.path.splitext(filename)[1].lower()
+            if extension not in Config.ALLOWED_EXTENSIONS:
+                return 'file_type', (f"Unsupported file type '{extension}'. Please upload one of: "
+                                     f"{', '.join(sorted(Config.ALLOWED_EXTENSIONS))}")
+
+        try:
+            size = os.path.getsize(image) if isinstance(image, str) else memoryview(image).nbytes
+        except OSError:
+            return 'unreadable', "The image file could not be read"
+        metrics['file_bytes'] = size
+        if size > Config.MAX_FILE_SIZE:
+            return 'file_size', (f"Image is too large ({size / 1024 / 1024:.1f} MB). "
+                                 f"The limit is {Config.MAX_FILE_SIZE / 1024 / 1024:.0f} MB")
+
+        try:
+            with Image.open(image if isinstance(image, str) else io.BytesIO(image)) as header:
+                image_format, dimensions = header.format, header.size
+            # Phone photos with an embedded preview are multi-picture JPEGs
+            if image_format == 'MPO':
+                image_format = 'JPEG'
+        except Exception:
+            return 'unreadable', "The file is not a readable image"
+        metrics['format'] = image_format
+        metrics['dimensions'] = list(dimensions)
+        if image_format not in self.allowed_formats:
+            return 'file_type', f"Unsupported image format '{image_format}'"
+        if min(dimensions) < self.min_dimension:
+            return 'resolution', (f"Image is too small ({dimensions[0]}x{dimensions[1]}). "
+                                  f"Please upload a photo at least {self.min_dimension} px on each side")
+        return None
+
+    def _check_pixels(self, image: ImageSource, metrics: Dict) -> Optional[Tuple[str, str]]:
+        """Exposure, blur and text height; (check, reason) of the first failure"""
+        try:
+            gray, _ = self._pipeline.run(image)
+        except Exception:
+            return 'unreadable', "The image could not be decoded"
+
+        histogram = np.bincount(gray.ravel(), minlength=256) / gray.size
+        brightness = float(gray.mean())
+        dark, bright = float(histogram[:16].sum()), float(histogram[240:].sum())
+        metrics['brightness'] = round(brightness, 1)
+        metrics['dark_fraction'] = round(dark, 3)
+        metrics['bright_fraction'] = round(bright, 3)
+        if brightness < self.brightness_range[0] or dark > self.max_clipped:
+            return 'exposure', "Image is too dark to read the ingredients. Please retake it in better light"
+        if brightness > self.brightness_range[1] or bright > self.max_clipped:
+            return 'exposure', "Image is overexposed. Please avoid glare and direct light on the label"
+
+        height, width = gray.shape
+        tile_height, tile_width = height // _SHARPNESS_GRID, width // _SHARPNESS_GRID
+        laplacian = cv2.Laplacian(gray, cv2.CV_32F)[:tile_height * _SHARPNESS_GRID, :tile_width * _SHARPNESS_GRID]
+        tiles = laplacian.reshape(_SHARPNESS_GRID, tile_height, _SHARPNESS_GRID, tile_width).var(axis=(1, 3))
+        sharpness = float(tiles.max())
+        metrics['sharpness'] = round(sharpness, 1)
+        if sharpness < self.min_sharpness:
+            return 'blur', "Image is too blurry to read the ingredients. Please hold the camera steady and refocus"
+
+        lines = find_text_lines(gray)
+        metrics['text_lines'] = len(lines)
+        if lines:
+            # Scale line heights back to the original resolution
+            scale = max(metrics['dimensions']) / max(width, height)
+            text_height = float(np.median([h for _, _, _, h in lines])) * scale
+            metrics['text_height'] = round(text_height, 1)
+            if text_height < self.min_text_height:
+                return 'text_size', "The text is too small to read. Please move closer to the ingredient list"
+        return None
+
+    def stats(self) -> Dict:
+        """
+        Get cumulative statistics
+
+        Returns:
+            Dictionary with images checked, passed and rejected, Vision calls
+            saved, rejections per check and average check time
+        """
+        with self._lock:
+            totals = dict(self._totals)
+            totals['rejections'] = dict(self._reasons)
+
+        totals['calls_saved'] = totals['rejected']
+        totals['average_ms'] = round(totals['check_ms'] / max(1, totals['checked']), 2)
+        totals['check_ms'] = round(totals['check_ms'], 2)
+        return totals
@@ -0,0 +1,136 @@
+import logging
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+# Add parent directory to path for config import
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class IngredientVerdictCache:
+    """Bounded LRU cache of per-ingredient safety verdicts
+
+    Entries are keyed on the normalized (lowercased, stripped) ingredient
+    name and hold the combined verdict for that ingredient. Each analyzer
+    fills in its own field the first time it sees an ingredient:
+
+    * ``hazard`` - EWG hazard verdict
+    * ``allergens`` - tuple of matched common allergens
+    * ``additive_risk`` - additive risk level
+    * ``banned`` - tuple of matched banned substances
+    * ``substances`` - tuple of canonical substance IDs
+    * ``scan`` - category hits from the risk analyzer's single-pass scan
+
+    so the common case costs a single dict hit per ingredient.
+    """
+
+    def __init__(self, max_size: int = Config.INGREDIENT_CACHE_SIZE):
+        """
+        Initialize the cache
+
+        Args:
+            max_size: Maximum number of ingredients kept before evicting
+                the least recently used one
+        """
+        self.max_size = max_size
+        self._entries: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_field(self, ingredient_lower: str, field: str, compute: Callable[[], Any]) -> Any:
+        """
+        Get one verdict field for an ingredient, computing it on a miss
+
+        Args:
+            ingredient_lower: Normalized ingredient name
+            field: Verdict field name
+            compute: Callable producing the field value on a miss
+
+        Returns:
+            Cached or freshly computed field value
+        """
+        with self._lock:
+            entry = self._entries.get(ingredient_lower)
+            if entry is not None and field in entry:
+                self._entries.move_to_end(ingredient_lower)
+                self.hits += 1
+                return entry[field]
+            self.misses += 1
+
+        # Compute outside the lock; a concurrent duplicate is harmless
+        value = compute()
+
+        with self._lock:
+            entry = self._entries.get(ingredient_lower)
+            if entry is None:
+                entry = self._entries[ingredient_lower] = {}
+                if len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+            else:
+                self._entries.move_to_end(ingredient_lower)
+            entry[field] = value
+
+        return value
+
+    def get_verdict(self, ingredient_lower: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a copy of every cached field for an ingredient
+
+        Args:
+            ingredient_lower: Normalized ingredient name
+
+        Returns:
+            Combined verdict dictionary or None if not cached
+        """
+        with self._lock:
+            entry = self._entries.get(ingredient_lower)
+            return dict(entry) if entry is not None else None
+
+    def invalidate(self):
+        """Drop every cached verdict (call when the knowledge base changes)"""
+        with self._lock:
+            self._entries.clear()
+        logger.info("Ingredient verdict cache invalidated")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get cache counters
+
+        Returns:
+            Dictionary with hits, misses, evictions, size and hit ratio
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+
+_shared_cache: Optional[IngredientVerdictCache] = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_verdict_cache() -> IngredientVerdictCache:
+    """Get the process-wide verdict cache shared by all analyzers"""
+    global _shared_cache
+    if _shared_cache is None:
+        with _shared_cache_lock:
+            if _shared_cache is None:
+                _shared_cache = IngredientVerdictCache()
+    return _shared_cache
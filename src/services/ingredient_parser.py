@@ -0,0 +1,266 @@
+import logging
+import re
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Headings that open an ingredient list; "contains" is only used when none is found.
+# A heading ending in a colon or opening a line is preferred over the bare word in
+# running text ("Made with natural ingredients")
+_HEADING = re.compile(
+    r'\b(?:ingredients?(?: list)?|ingr[ée]dients|ingredientes|ingredienti|zutaten|ingredi[ëe]nten|'
+    r'sk[łl]adniki|ingredienser|composition|inci)\b\s*[:：.\-]?',
+    re.IGNORECASE
+)
+_CONTAINS_HEADING = re.compile(r'\b(?:contains|contient|contiene|enth[äa]lt)\b\s*[:：]?', re.IGNORECASE)
+
+# Clauses that end the ingredient list or start an allergen statement. The pattern
+# is lower case, grouped by first letter and free of capture groups, which keeps
+# the regex engine's scan fast; it runs on a lowered copy of the text and the kind
+# of clause is read from the match (see _clause_kind)
+_CLAUSE = re.compile(
+    r'm(?:ay (?:also )?contain(?: traces? of)?\s*[:：]?|anufactured (?:by|for))'
+    r'|p(?:eut contenir(?: des)?(?: traces? d(?:e |\'))?|uede contener(?: trazas de)?|u[òo] contenere(?: tracce di)?)'
+    r'\s*[:：]?'
+    r'|kan(?:n spuren von| sporen van)\s*[:：]?'
+    r'|cont(?:ains|ient|iene)\s*[:：]|enth[äa]lt\s*[:：]'
+    r'|\.[ \t]*(?:\n|$|(?:cont(?:ains|ient|iene)|enth[äa]lt)\b(?![ \t]+(?:\d|less\b))[ \t]*[:：]?)'
+    r'|nutrition (?:facts|information)|best before|distributed by|store in'
+)
+# For the rare text whose length changes when lowered
+_CLAUSE_IGNORECASE = re.compile(_CLAUSE.pattern, re.IGNORECASE)
+_CONTAINS_PREFIXES = ('cont', 'enth')
+# After a full stop, "contains" needs no colon ("sugar, milk. Contains milk."); the
+# full stop is stripped before the clause prefix is read
+_SENTENCE_START = '. \t'
+_MAY_CONTAIN_PREFIXES = ('may ', 'peut', 'pu', 'kan')
+# German and Dutch put the verb after the allergens ("Kann Spuren von Sellerie enthalten")
+_TRAILING_VERB = re.compile(r'\s+(?:enthalten|bevatten)$', re.IGNORECASE)
+
+# One split yields ingredient text and the structural characters between it. A
+# comma directly followed by a digit belongs to a number ("2,5 %", "1,2-hexanediol");
+# the slower split that keeps those is only used when the segment has one. A line
+# break only separates ingredients in lists without other separators; elsewhere it
+# is an OCR line wrap ("Sodium\nChloride")
+_SPLIT = re.compile(r'([()\[\]{},;•·\n])')
+_SPLIT_KEEPING_NUMBERS = re.compile(r'([()\[\]{};•·\n]|,(?!\d))')
+_DIGIT_COMMA = re.compile(r',\d')
+_LIST_SEPARATORS = (',', ';', '•', '·')
+_LINE_WRAP = re.compile(r'[ \t]*\n[ \t]*')
+_STRUCTURE = {'(': 'open', '[': 'open', '{': 'open', ')': 'close', ']': 'close', '}': 'close',
+              ',': 'next', ';': 'next', '•': 'next', '·': 'next', '\n': 'next'}
+_PERCENT = re.compile(r'(\d+(?:[.,]\d+)?)\s*%')
+# US labels cap the minor ingredients in one qualifier ("Contains 2% or less of: salt,
+# soda", "less than 2% of salt"). It is not part of any name and becomes a separator
+_PERCENT_CAP = re.compile(
+    r'\b(?:contains?\s+(?:less than\s+)?\d+(?:[.,]\d+)?\s*%(?:\s*or less)?|less than\s+\d+(?:[.,]\d+)?\s*%'
+    r'|\d+(?:[.,]\d+)?\s*%\s*or less)(?:\s*of\b)?(?:\s*(?:each of\s+)?the following\b)?\s*[:：]?\s*',
+    re.IGNORECASE
+)
+_NAME_STRIP = ' \t.*:-–'
+
+
+def _new_node(name: str) -> Dict:
+    return {'name': name, 'percentage': None, 'children': []}
+
+
+def _clause_kind(clause: str) -> Optional[str]:
+    """Section a clause opens: 'contains', 'may_contain' or None (end of the list)"""
+    clause = clause.lower().lstrip(_SENTENCE_START)
+    if clause.startswith(_CONTAINS_PREFIXES):
+        return 'contains'
+    if clause.startswith(_MAY_CONTAIN_PREFIXES):
+        return 'may_contain'
+    return None
+
+
+class IngredientParser:
+    """Single-pass parser turning label text into ingredient nodes
+
+    The ingredient section starts after a heading in any of the supported
+    languages and ends at a full stop closing a line, a "contains" or
+    "may contain" statement, or a trailing section such as nutrition facts.
+    The section is split once on separators and brackets (line breaks only
+    count when the list has no other separator); a stack tracks
+    nesting, so "Chocolate (sugar, cocoa butter)" becomes one node with two
+    children. Percentages ("tomatoes 45%", "milk (2,5 %)") are moved from
+    the name into the node; a "contains 2% or less of:" qualifier is
+    dropped. Lists are not truncated.
+    """
+
+    def parse(self, text: str) -> Dict:
+        """
+        Parse the ingredient statement of a label
+
+        Args:
+            text: Full OCR text of the label
+
+        Returns:
+            Dictionary with 'ingredients' (nodes with 'name', 'percentage'
+            and 'children'), 'contains' (allergen statement names) and
+            'may_contain' (precautionary statement names)
+        """
+        result = {'ingredients': [], 'contains': [], 'may_contain': []}
+        heading = self._find_heading(text)
+        if heading is None:
+            return result
+
+        body = text[heading.end():]
+        lowered = body.lower()
+        clauses = (_CLAUSE.finditer(lowered) if len(lowered) == len(body)
+                   else _CLAUSE_IGNORECASE.finditer(body))
+        kind: Optional[str] = 'ingredients'
+        position = 0
+        for clause in clauses:
+            start = clause.start()
+            if start and lowered[start - 1].isalnum() and clause.group()[0] != '.':
+                continue
+            if kind is not None and start > position:
+                self._collect(result, kind, body[position:start])
+            kind = _clause_kind(clause.group())
+            position = clause.end()
+        if kind is not None:
+            self._collect(result, kind, body[position:])
+        return result
+
+    @staticmethod
+    def _find_heading(text: str) -> Optional[re.Match]:
+        """The heading opening the list: the first that ends in a colon or opens a line, else the first"""
+        first = None
+        for heading in _HEADING.finditer(text):
+            line_start = text.rfind('\n', 0, heading.start()) + 1
+            if heading.group().rstrip()[-1] in ':：' or not text[line_start:heading.start()].strip():
+                return heading
+            first = first or heading
+        return first or _CONTAINS_HEADING.search(text)
+
+    @classmethod
+    def has_heading(cls, text: str) -> bool:
+        """Whether text holds an ingredient-list heading (or a "contains" statement) that parse() would use"""
+        return cls._find_heading(text) is not None
+
+    @staticmethod
+    def opens_with_heading(text: str) -> bool:
+        """Whether text starts with an ingredient-list heading followed by a colon or a line break"""
+        heading = _HEADING.match(text.lstrip())
+        return heading is not None and (heading.group().rstrip()[-1] in ':：' or '\n' in heading.group())
+
+    def _collect(self, result: Dict, kind: str, segment: str):
+        """Add the names of one list segment to the result"""
+        nodes = self.parse_list(segment)
+        if kind == 'ingredients':
+            result['ingredients'].extend(nodes)
+        else:
+            result[kind].extend(_TRAILING_VERB.sub('', name) for name in self.names(nodes))
+
+    def parse_list(self, segment: str) -> List[Dict]:
+        """
+        Parse a comma-separated, possibly nested ingredient list
+
+        Args:
+            segment: List text without its heading
+
+        Returns:
+            Top-level ingredient nodes
+        """
+        root: List[Dict] = []
+        siblings = root
+        parents: List[Dict] = []
+        node: Optional[Dict] = None
+        # Set when a node may need _clean (a nameless or one-character name)
+        debris = False
+
+        if '\n' in segment and any(separator in segment for separator in _LIST_SEPARATORS):
+            segment = _LINE_WRAP.sub(' ', segment)
+        if '%' in segment:
+            segment = _PERCENT_CAP.sub(', ', segment)
+        split = _SPLIT_KEEPING_NUMBERS if _DIGIT_COMMA.search(segment) else _SPLIT
+        # Text and structural characters alternate: text at even positions, separators at odd ones
+        parts = split.split(segment)
+        last = len(parts) - 1
+        for index in range(0, len(parts), 2):
+            text = parts[index].strip(_NAME_STRIP)
+            if text:
+                percentage = None
+                if '%' in text:
+                    match = _PERCENT.search(text)
+                    if match:
+                        percentage = float(match.group(1).replace(',', '.'))
+                        text = ' '.join(f"{text[:match.start()]} {text[match.end():]}".split()).strip(_NAME_STRIP)
+                if not text:
+                    # A bare percentage belongs to the ingredient it follows or qualifies
+                    target = node if node is not None else (parents[-1] if parents else None)
+                    if target is not None and percentage is not None:
+                        target['percentage'] = percentage
+                elif node is None:
+                    node = {'name': text, 'percentage': percentage, 'children': []}
+                    siblings.append(node)
+                    debris = debris or len(text) == 1
+                else:
+                    node['name'] = f"{node['name']} {text}" if node['name'] else text
+                    if percentage is not None:
+                        node['percentage'] = percentage
+
+            if index == last:
+                break
+            structure = _STRUCTURE[parts[index + 1]]
+            if structure == 'next':
+                node = None
+            elif structure == 'open':
+                if node is None:
+                    node = _new_node('')
+                    siblings.append(node)
+                    debris = True
+                parents.append(node)
+                siblings = node['children']
+                node = None
+            elif parents:
+                node = parents.pop()
+                siblings = parents[-1]['children'] if parents else root
+
+        return self._clean(root) if debris else root
+
+    def _clean(self, nodes: List[Dict]) -> List[Dict]:
+        """Drop OCR debris and lift the children of nameless nodes"""
+        cleaned = []
+        for node in nodes:
+            node['children'] = self._clean(node['children']) if node['children'] else node['children']
+            if len(node['name']) > 1:
+                cleaned.append(node)
+            elif node['children']:
+                cleaned.extend(node['children'])
+        return cleaned
+
+    @staticmethod
+    def names(nodes: List[Dict]) -> List[str]:
+        """
+        Flatten ingredient nodes to names, depth-first
+
+        Args:
+            nodes: Ingredient nodes
+
+        Returns:
+            Every node name, each parent followed by its sub-ingredients
+        """
+        flat = []
+        stack = list(reversed(nodes))
+        while stack:
+            node = stack.pop()
+            flat.append(node['name'])
+            stack.extend(reversed(node['children']))
+        return flat
+
+    def ingredient_names(self, parsed: Dict) -> List[str]:
+        """
+        Flat ingredient list for analysis
+
+        Args:
+            parsed: Result of parse()
+
+        Returns:
+            Ingredient and sub-ingredient names, then allergen statement
+            names, then precautionary ones as "may contain <name>" (so
+            cross-contact checks still see them)
+        """
+        return (self.names(parsed['ingredients']) + parsed['contains'] +
+                [f"may contain {name}" for name in parsed['may_contain']])
@@ -0,0 +1,60 @@
+import logging
+from typing import Dict, Iterable, List, Tuple
+
+from .pattern_matcher import PatternMatcher
+
+logger = logging.getLogger(__name__)
+
+
+class IngredientScanner:
+    """Single-pass scanner emitting every category hit for an ingredient
+
+    All category patterns (allergens, additive markers, banned substances,
+    nutrition terms, ...) are compiled into one automaton, so an ingredient
+    is lowercased once and walked once no matter how many categories are
+    checked. A pattern may belong to several categories.
+    """
+
+    def __init__(self, categories: Dict[str, Iterable[str]]):
+        """
+        Compile the scanner
+
+        Args:
+            categories: Mapping of category name to its patterns, in the
+                order hits should be reported
+        """
+        self.categories = list(categories)
+        patterns: Dict[str, int] = {}
+        self._targets: List[List[Tuple[str, int]]] = []
+
+        for category, category_patterns in categories.items():
+            for position, pattern in enumerate(category_patterns):
+                if pattern not in patterns:
+                    patterns[pattern] = len(self._targets)
+                    self._targets.append([])
+                self._targets[patterns[pattern]].append((category, position))
+
+        self._matcher = PatternMatcher(patterns)
+        self._patterns = self._matcher.patterns
+
+    def scan(self, ingredient_lower: str) -> Dict[str, Tuple[str, ...]]:
+        """
+        Scan one normalized ingredient
+
+        Args:
+            ingredient_lower: Lowercased ingredient string
+
+        Returns:
+            Mapping of category to the matched patterns (in category
+            order); categories without hits are omitted
+        """
+        hits: Dict[str, List[Tuple[int, str]]] = {}
+        for index in self._matcher.find_all_in(ingredient_lower):
+            pattern = self._patterns[index]
+            for category, position in self._targets[index]:
+                hits.setdefault(category, []).append((position, pattern))
+
+        return {
+            category: tuple(pattern for _, pattern in sorted(found))
+            for category, found in hits.items()
+        }
@@ -0,0 +1,432 @@
+import csv
+import io
+import logging
+import os
+import re
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set
+
+import cv2
+from google.cloud import vision
+
+# Add parent directory to path for config import
+sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
+from config import Config
+from .image_preprocessing import PreprocessingPipeline, image_dimensions
+from .hazard_knowledge_base import get_knowledge_base
+from .fuzzy_index import load_lexicon
+from .ingredient_parser import IngredientParser
+
+logger = logging.getLogger(__name__)
+
+# Feature types a local OCR engine can answer
+_TEXT_FEATURES = {vision.Feature.Type.TEXT_DETECTION, vision.Feature.Type.DOCUMENT_TEXT_DETECTION}
+
+_WORD = re.compile(r'[^\W\d_]{3,}')
+
+
+class TesseractAnnotatorClient:
+    """Local OCR backend with the ImageAnnotatorClient interface
+
+    Each image is preprocessed (see PreprocessingPipeline) and passed to the
+    tesseract command line through a pipe; its TSV output is converted into
+    Vision-style text annotations: the full text first, then one annotation
+    per word with its bounding box in original image pixels. The full-text
+    score is the mean word confidence (0-1). Label detection has no local
+    equivalent and returns no labels.
+    """
+
+    def __init__(self, command: str = Config.TESSERACT_COMMAND,
+                 languages: str = Config.TESSERACT_LANGUAGES,
+                 preset: str = Config.PREPROCESSING_PRESET,
+                 timeout: float = Config.TESSERACT_TIMEOUT,
+                 max_workers: int = Config.TESSERACT_MAX_WORKERS):
+        """
+        Initialize the backend
+
+        Args:
+            command: tesseract executable name or path
+            languages: Tesseract language codes, e.g. 'eng' or 'eng+fra'
+            preset: Preprocessing preset applied before recognition
+            timeout: Seconds allowed per image
+            max_workers: Images recognized in parallel by batch requests
+        """
+        self.command = command
+        self.languages = languages
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self._pipeline = PreprocessingPipeline(preset)
+
+    @staticmethod
+    def available(command: str = Config.TESSERACT_COMMAND) -> bool:
+        """Whether the tesseract executable can be found"""
+        return shutil.which(command) is not None
+
+    def annotate_image(self, request: vision.AnnotateImageRequest) -> vision.AnnotateImageResponse:
+        """
+        Recognize the text of one image
+
+        Args:
+            request: Annotate request; only text detection features are served
+
+        Returns:
+            Response with text annotations, or with its error message set
+        """
+        if not any(feature.type_ in _TEXT_FEATURES for feature in request.features):
+            return vision.AnnotateImageResponse()
+
+        try:
+            return self._recognize(request.image.content)
+        except Exception as e:
+            logger.error(f"Local OCR failed: {str(e)}")
+            return vision.AnnotateImageResponse(error={'message': f'Local OCR error: {str(e)}'})
+
+    def batch_annotate_images(self, requests: List[vision.AnnotateImageRequest]) -> vision.BatchAnnotateImagesResponse:
+        """
+        Recognize several images, in parallel tesseract processes
+
+        Args:
+            requests: Annotate requests
+
+        Returns:
+            Batch response with one response per request, in order
+        """
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            responses = list(pool.map(self.annotate_image, requests))
+        return vision.BatchAnnotateImagesResponse(responses=responses)
+
+    def _recognize(self, content: bytes) -> vision.AnnotateImageResponse:
+        """Run tesseract on one encoded image"""
+        processed, timings = self._pipeline.run(content)
+        scale = 1.0
+        dimensions = image_dimensions(content)
+        if dimensions:
+            scale = max(dimensions) / max(processed.shape)
+
+        completed = subprocess.run(
+            [self.command, 'stdin', 'stdout', '-l', self.languages, '--psm', '3', 'tsv'],
+            input=cv2.imencode('.png', processed)[1].tobytes(),
+            capture_output=True, timeout=self.timeout, check=True
+        )
+        words = self._parse_tsv(completed.stdout.decode('utf-8', errors='replace'))
+        logger.info(f"Local OCR read {len(words)} words (preprocessing {timings['total']:.0f} ms)")
+        if not words:
+            return vision.AnnotateImageResponse()
+
+        # Lines of the same block and paragraph are joined with newlines, like Vision's full text
+        lines: Dict[tuple, List[str]] = {}
+        for word in words:
+            lines.setdefault(word['line'], []).append(word['text'])
+        full_text = '\n'.join(' '.join(line) for line in lines.values())
+
+        annotations = [vision.EntityAnnotation(
+            description=full_text,
+            score=sum(word['confidence'] for word in words) / len(words) / 100
+        )]
+        for word in words:
+            left, top, width, height = (round(value * scale) for value in word['box'])
+            annotations.append(vision.EntityAnnotation(
+                description=word['text'],
+                score=word['confidence'] / 100,
+                bounding_poly=vision.BoundingPoly(vertices=[
+                    vision.Vertex(x=left, y=top), vision.Vertex(x=left + width, y=top),
+                    vision.Vertex(x=left + width, y=top + height), vision.Vertex(x=left, y=top + height)
+                ])
+            ))
+        return vision.AnnotateImageResponse(text_annotations=annotations)
+
+    @staticmethod
+    def _parse_tsv(output: str) -> List[Dict]:
+        """Recognized words of tesseract's TSV output, in reading order"""
+        words = []
+        for row in csv.DictReader(io.StringIO(output), delimiter='\t', quoting=csv.QUOTE_NONE):
+            text = (row.get('text') or '').strip()
+            if row.get('level') != '5' or not text or float(row.get('conf') or -1) < 0:
+                continue
+            words.append({
+                'text': text,
+                'confidence': float(row['conf']),
+                'line': (row['block_num'], row['par_num'], row['line_num']),
+                'box': tuple(int(row[name]) for name in ('left', 'top', 'width', 'height'))
+            })
+        return words
+
+
+class OCRResultScorer:
+    """Scores how much an OCR result looks like a readable ingredient list
+
+    The score (0-1) combines whether an ingredient heading was found, the
+    share of words found in the ingredient lexicon (data file plus every
+    hazard knowledge base name and alias) and the engine's confidence.
+    Garbled OCR of a clean label scores low on all three.
+    """
+
+    # Weights of heading, lexicon hit rate and confidence
+    WEIGHTS = (0.3, 0.5, 0.2)
+
+    def __init__(self, lexicon_path: str = Config.OCR_LEXICON_PATH):
+        """
+        Initialize the scorer
+
+        Args:
+            lexicon_path: Word list file, one lowercase word per line
+                ('#' starts a comment line)
+        """
+        self.lexicon_path = lexicon_path
+        self._lexicon: Optional[Set[str]] = None
+
+    @property
+    def lexicon(self) -> Set[str]:
+        """Known ingredient words, loaded on first use"""
+        if self._lexicon is None:
+            words = load_lexicon(self.lexicon_path)
+            for key, _ in get_knowledge_base().name_keys():
+                words.update(_WORD.findall(key.lower()))
+            self._lexicon = words
+        return self._lexicon
+
+    def score(self, response: vision.AnnotateImageResponse) -> float:
+        """
+        Score one OCR response
+
+        Args:
+            response: Response whose first text annotation holds the full text
+
+        Returns:
+            Score between 0 (unusable) and 1
+        """
+        if response.error.message or not response.text_annotations:
+            return 0.0
+
+        text = response.text_annotations[0].description.lower()
+        words = _WORD.findall(text)
+        hit_rate = sum(word in self.lexicon for word in words) / len(words) if words else 0.0
+        heading = 1.0 if IngredientParser.has_heading(text) else 0.0
+        confidence = response.text_annotations[0].score
+
+        heading_weight, lexicon_weight, confidence_weight = self.WEIGHTS
+        return heading_weight * heading + lexicon_weight * hit_rate + confidence_weight * confidence
+
+
+class OCRCascadeClient:
+    """Two-tier OCR with the ImageAnnotatorClient interface
+
+    Text detection runs on the local engine first. Its result is scored
+    (see OCRResultScorer) and only requests scoring below the threshold
+    are escalated, unchanged, to the remote engine; a failed remote call
+    falls back to the local result. Label detection only exists remotely:
+    it is answered when a request is escalated, when another request for
+    the same image is (see the groups argument of batch_annotate_images),
+    and for every request when remote_labels is set. Requests marked as
+    not scored (a whole-frame thumbnail read only for its brand) keep their
+    local text and never escalate. Per-tier latencies and the escalation
+    rate of the scored requests are recorded.
+    """
+
+    def __init__(self, local, remote=None,
+                 threshold: float = Config.OCR_CASCADE_THRESHOLD,
+                 remote_labels: bool = Config.OCR_CASCADE_REMOTE_LABELS,
+                 scorer: Optional[OCRResultScorer] = None,
+                 history: int = 10000):
+        """
+        Initialize the cascade
+
+        Args:
+            local: Tier-one annotator client (e.g. TesseractAnnotatorClient)
+            remote: Tier-two annotator client (e.g. vision.ImageAnnotatorClient);
+                None keeps every result local
+            threshold: Smallest local score accepted without escalation
+            remote_labels: Whether requests answered locally still get label
+                detection from the remote engine
+            scorer: Result scorer (default OCRResultScorer())
+            history: Latest latencies kept per tier for the percentiles
+        """
+        self.local = local
+        self.remote = remote
+        self.threshold = threshold
+        self.remote_labels = remote_labels
+        self.scorer = scorer or OCRResultScorer()
+        self._lock = threading.Lock()
+        self._latencies = {'local': deque(maxlen=history), 'remote': deque(maxlen=history)}
+        self._counts = {'requests': 0, 'accepted_local': 0, 'escalated': 0, 'remote_failures': 0}
+
+    def annotate_image(self, request: vision.AnnotateImageRequest) -> vision.AnnotateImageResponse:
+        """
+        Annotate one image through the cascade
+
+        Args:
+            request: Annotate request
+
+        Returns:
+            Annotation response
+        """
+        return self.batch_annotate_images([request]).responses[0]
+
+    def batch_annotate_images(self, requests: List[vision.AnnotateImageRequest],
+                              groups: Optional[List[int]] = None,
+                              scored: Optional[List[bool]] = None) -> vision.BatchAnnotateImagesResponse:
+        """
+        Annotate several images: one local batch, then one remote batch for
+        the escalated requests
+
+        Args:
+            requests: Annotate requests
+            groups: Image number of each request, for images sent as several
+                requests (a text crop and a label thumbnail); when one of
+                them is escalated, the others get their labels remotely too.
+                By default every request is its own image.
+            scored: Whether each request's text is scored and may be
+                escalated; unscored text stays local. By default every
+                request with a text feature is scored.
+
+        Returns:
+            Batch response with one response per request, in order
+        """
+        responses: List[Optional[vision.AnnotateImageResponse]] = [None] * len(requests)
+        text_positions = [
+            position for position, request in enumerate(requests)
+            if any(feature.type_ in _TEXT_FEATURES for feature in request.features)
+        ]
+
+        local_responses = self._run_tier('local', self.local, [requests[p] for p in text_positions])
+        escalate = []
+        scored_count = 0
+        for position, response in zip(text_positions, local_responses):
+            responses[position] = response
+            if scored is not None and not scored[position]:
+                continue
+            scored_count += 1
+            score = self.scorer.score(response)
+            if score < self.threshold and self.remote is not None:
+                escalate.append(position)
+            logger.debug(f"Local OCR score {score:.2f} ({'escalated' if position in escalate else 'accepted'})")
+
+        # Escalated requests go remote unchanged; others only for their labels, when
+        # every request gets remote labels or when another request of their image escalated
+        groups = groups if groups is not None else range(len(requests))
+        escalated_images = {groups[position] for position in escalate}
+        remote_requests = {position: requests[position] for position in escalate}
+        if self.remote is not None:
+            for position, request in enumerate(requests):
+                if position in remote_requests or not (self.remote_labels or groups[position] in escalated_images):
+                    continue
+                label_request = self._label_request(request)
+                if label_request is not None:
+                    remote_requests[position] = label_request
+
+        remote_responses = self._run_tier('remote', self.remote, list(remote_requests.values())) if remote_requests else []
+        remote_failures = 0
+        for position, response in zip(remote_requests, remote_responses):
+            if position not in escalate:
+                responses[position] = self._with_labels(responses[position], response)
+            elif response.error.message:
+                remote_failures += 1
+                logger.warning(f"Remote OCR failed, keeping local result: {response.error.message}")
+            else:
+                responses[position] = response
+
+        with self._lock:
+            self._counts['requests'] += scored_count
+            self._counts['escalated'] += len(escalate)
+            self._counts['accepted_local'] += scored_count - len(escalate)
+            self._counts['remote_failures'] += remote_failures
+
+        return vision.BatchAnnotateImagesResponse(
+            responses=[response if response is not None else vision.AnnotateImageResponse() for response in responses]
+        )
+
+    def _run_tier(self, tier: str, client, requests: List[vision.AnnotateImageRequest]) -> List[vision.AnnotateImageResponse]:
+        """Send requests to one tier, recording the per-image latency"""
+        if not requests:
+            return []
+        start = time.perf_counter()
+        try:
+            responses = list(client.batch_annotate_images(requests=requests).responses)
+        except Exception as e:
+            logger.error(f"OCR tier '{tier}' failed: {str(e)}")
+            responses = [vision.AnnotateImageResponse(error={'message': str(e)}) for _ in requests]
+        per_image_ms = (time.perf_counter() - start) * 1000 / len(requests)
+        with self._lock:
+            self._latencies[tier].extend([per_image_ms] * len(requests))
+        return responses
+
+    @staticmethod
+    def _label_request(request: vision.AnnotateImageRequest) -> Optional[vision.AnnotateImageRequest]:
+        """The label-only part of a request, if it asks for labels"""
+        features = [feature for feature in request.features if feature.type_ not in _TEXT_FEATURES]
+        if not features:
+            return None
+        return vision.AnnotateImageRequest(image=request.image, features=features)
+
+    @staticmethod
+    def _with_labels(response: Optional[vision.AnnotateImageResponse],
+                     label_response: vision.AnnotateImageResponse) -> vision.AnnotateImageResponse:
+        """A local text response completed with remote labels"""
+        if response is None:
+            return label_response
+        if not label_response.error.message:
+            response.label_annotations.extend(label_response.label_annotations)
+        return response
+
+    def stats(self) -> Dict:
+        """
+        Get cascade statistics
+
+        Returns:
+            Dictionary with text requests, local acceptances, escalations,
+            escalation rate, remote failures and, per tier, the number of
+            images and mean / p50 / p90 / p99 latency in milliseconds (over
+            the latest images)
+        """
+        with self._lock:
+            stats = dict(self._counts)
+            latencies = {tier: sorted(values) for tier, values in self._latencies.items()}
+
+        stats['escalation_rate'] = round(stats['escalated'] / max(1, stats['requests']), 3)
+        stats['tiers'] = {}
+        for tier, values in latencies.items():
+            def percentile(fraction: float) -> float:
+                return round(values[min(len(values) - 1, int(fraction * len(values)))], 2) if values else 0.0
+            stats['tiers'][tier] = {
+                'images': len(values),
+                'mean_ms': round(sum(values) / len(values), 2) if values else 0.0,
+                'p50_ms': percentile(0.5),
+                'p90_ms': percentile(0.9),
+                'p99_ms': percentile(0.99)
+            }
+        return stats
+
+
+def create_annotator_client(backend: str = Config.OCR_BACKEND,
+                            remote_factory: Optional[Callable[[], object]] = None) -> Optional[object]:
+    """
+    Create the annotator client of a local OCR backend
+
+    Args:
+        backend: Backend name from Config.OCR_BACKEND
+        remote_factory: Callable creating the Vision client, used as the
+            remote tier of the 'cascade' backend (None = local only)
+
+    Returns:
+        Client instance, or None for the 'vision' backend (the Google client
+        is created by VisionAIService from the configured credentials)
+    """
+    if backend == 'vision':
+        return None
+    if backend in ('tesseract', 'cascade'):
+        if not TesseractAnnotatorClient.available():
+            raise RuntimeError(f"OCR backend '{backend}' selected but '{Config.TESSERACT_COMMAND}' was not found")
+        local = TesseractAnnotatorClient()
+        if backend == 'tesseract':
+            return local
+        remote = remote_factory() if remote_factory is not None else None
+        if remote is None:
+            logger.warning("OCR cascade has no remote tier - every result stays local")
+        return OCRCascadeClient(local, remote)
+    raise ValueError(f"Unknown OCR backend: {backend}")
@@ -0,0 +1,161 @@
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from google.cloud import vision
+
+from .ingredient_parser import IngredientParser
+
+logger = logging.getLogger(__name__)
+
+_TEXT_BLOCK = vision.Block.BlockType.TEXT
+_BreakType = vision.TextAnnotation.DetectedBreak.BreakType
+# Text that follows a word, by the break Vision detected after its last symbol
+_BREAKS = {
+    _BreakType.SPACE: ' ',
+    _BreakType.SURE_SPACE: ' ',
+    _BreakType.EOL_SURE_SPACE: '\n',
+    _BreakType.LINE_BREAK: '\n',
+}
+_LINE_BREAKS = {_BreakType.EOL_SURE_SPACE, _BreakType.LINE_BREAK}
+
+# A block's bounding box: (left, top, right, bottom) in pixels of the OCR image
+Box = Tuple[int, int, int, int]
+
+
+def _block_box(block) -> Box:
+    """Axis-aligned box of a (raw protobuf) block"""
+    xs = [vertex.x for vertex in block.bounding_box.vertices]
+    ys = [vertex.y for vertex in block.bounding_box.vertices]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _words(block):
+    for paragraph in block.paragraphs:
+        yield from paragraph.words
+
+
+def _word_text(word) -> Tuple[str, int]:
+    """Text of a word and the break type after it"""
+    symbols = word.symbols
+    return ''.join(symbol.text for symbol in symbols), symbols[-1].property.detected_break.type_ if symbols else 0
+
+
+def _separator_count(text: str) -> int:
+    return text.count(',') + text.count(';')
+
+
+class IngredientBlockLocator:
+    """Picks the ingredient list out of the layout of document text detection
+
+    document_text_detection returns pages of blocks of paragraphs of words.
+    The first few words of each text block are read to find blocks that
+    open with an ingredient heading followed by a colon or a line break
+    ("Only natural ingredients" does not open a list); when several do, the
+    one with the most list separators wins. Blocks directly below it
+    (starting within a couple of line heights and overlapping it
+    horizontally) are taken as the continuation of the list. Only those
+    blocks are turned into text, so nutrition panels and marketing copy
+    are never assembled or searched. The raw protobuf is read directly: going through the
+    proto-plus wrappers would convert every word object on access.
+    """
+
+    def __init__(self, heading_words: int = 4, max_gap_lines: float = 2.0, min_overlap: float = 0.5):
+        """
+        Initialize the locator
+
+        Args:
+            heading_words: Number of leading words of a block read for the
+                heading
+            max_gap_lines: Largest vertical gap, in line heights, between a
+                block and the one continuing it
+            min_overlap: Smallest horizontal overlap of a continuation block,
+                as a fraction of the narrower of the two
+        """
+        self.heading_words = heading_words
+        self.max_gap_lines = max_gap_lines
+        self.min_overlap = min_overlap
+
+    def locate(self, response: vision.AnnotateImageResponse) -> Optional[Dict]:
+        """
+        Locate the ingredient list of a document text detection response
+
+        Args:
+            response: Annotation response with a full_text_annotation
+
+        Returns:
+            Dictionary with 'text' (the list's blocks, in reading order),
+            'box' ([left, top, right, bottom] in pixels of the OCR image),
+            'block_count' and 'elapsed_ms'; None when the response has no
+            layout or no block opens with an ingredient heading
+        """
+        start = time.perf_counter()
+        annotation = vision.AnnotateImageResponse.pb(response).full_text_annotation
+        blocks = [block for page in annotation.pages for block in page.blocks if block.block_type == _TEXT_BLOCK]
+
+        candidates = [(block, self._block_text(block)) for block in blocks if self._opens_list(block)]
+        if not candidates:
+            return None
+
+        # Several blocks may open with a heading (a tagline, a list in two languages): take the most list-like
+        heading, (text, lines) = max(candidates, key=lambda candidate: _separator_count(candidate[1][0]))
+        selected = [heading]
+        box = _block_box(heading)
+        line_height = (box[3] - box[1]) / lines
+        remaining = [(block, _block_box(block)) for block in blocks if block is not heading]
+
+        # Follow the list down the column
+        while True:
+            below = [(candidate[1][1], index) for index, candidate in enumerate(remaining)
+                     if self._continues(box, candidate[1], line_height)]
+            if not below:
+                break
+            block, block_box = remaining.pop(min(below)[1])
+            block_text, _ = self._block_text(block)
+            text = f"{text}\n{block_text}"
+            selected.append(block)
+            box = (min(box[0], block_box[0]), box[1], max(box[2], block_box[2]), max(box[3], block_box[3]))
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        logger.info(f"Ingredient list found in {len(selected)} of {len(blocks)} text blocks")
+        return {
+            'text': text,
+            'box': list(box),
+            'block_count': len(selected),
+            'elapsed_ms': round(elapsed_ms, 2)
+        }
+
+    def _opens_list(self, block) -> bool:
+        """Whether a block starts with an ingredient heading followed by a colon or a line break"""
+        parts = []
+        for count, word in enumerate(_words(block), 1):
+            text, break_type = _word_text(word)
+            parts.append(text)
+            parts.append(_BREAKS.get(break_type, ''))
+            if count == self.heading_words:
+                break
+        return IngredientParser.opens_with_heading(''.join(parts))
+
+    @staticmethod
+    def _block_text(block) -> Tuple[str, int]:
+        """Text of a block with its word and line breaks, and its line count"""
+        parts: List[str] = []
+        line_breaks = 0
+        break_type = None
+        for word in _words(block):
+            text, break_type = _word_text(word)
+            parts.append(text)
+            parts.append(_BREAKS.get(break_type, ''))
+            line_breaks += break_type in _LINE_BREAKS
+        # The last line usually ends in a line break too
+        lines = line_breaks + (break_type not in _LINE_BREAKS)
+        return ''.join(parts).strip(), max(1, lines)
+
+    def _continues(self, box: Box, candidate: Box, line_height: float) -> bool:
+        """Whether a block starts just below the list and shares its column"""
+        gap = candidate[1] - box[3]
+        if not -line_height / 2 <= gap <= self.max_gap_lines * line_height:
+            return False
+        overlap = min(box[2], candidate[2]) - max(box[0], candidate[0])
+        narrower = min(box[2] - box[0], candidate[2] - candidate[0])
+        return narrower > 0 and overlap >= self.min_overlap * narrower
@@ -2,11 +2,18 @@ import requests
 import logging
 import os
 import sys
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, List, Optional
+from requests.adapters import HTTPAdapter
 
 # Add parent directory to path for config import
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
 from config import Config
+from .ingredient_cache import get_verdict_cache
+from .hazard_knowledge_base import get_knowledge_base
+from .http_cache import HTTPResponseCache
+from .substance_index import cached_substance_ids, get_substance_index
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -14,13 +21,39 @@ logger = logging.getLogger(__name__)
 class OpenFoodFactsService:
     """Service for OpenFoodFacts API integration"""
     
-    def __init__(self):
-        """Initialize the OpenFoodFacts service"""
+    # Additive risk tiers (sample lists), matched by substance ID so aliases such as
+    # E-numbers resolve to them
+    HIGH_RISK_ADDITIVES = ['monosodium glutamate', 'sodium nitrite', 'sodium benzoate']
+    MODERATE_RISK_ADDITIVES = ['citric acid', 'sodium chloride', 'potassium sorbate']
+    
+    def __init__(self, http_cache: Optional[HTTPResponseCache] = None):
+        """
+        Initialize the OpenFoodFacts service
+        
+        Args:
+            http_cache: Response cache to use; by default the shared on-disk
+                cache is opened (unless OPENFOODFACTS_CACHE is off)
+        """
         self.base_url = Config.OPENFOODFACTS_BASE_URL
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'IngredientInsight/1.0 (https://github.com/user/ingredient-insight)'
         })
+        # A blocking pool of this size caps the requests in flight to each host, across threads
+        adapter = HTTPAdapter(pool_maxsize=Config.OPENFOODFACTS_MAX_CONCURRENCY, pool_block=True)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        
+        self.http_cache = http_cache
+        if self.http_cache is None and Config.OPENFOODFACTS_CACHE:
+            try:
+                self.http_cache = HTTPResponseCache()
+            except (sqlite3.Error, OSError) as e:
+                logger.warning(f"OpenFoodFacts cache unavailable, requests go to the network: {str(e)}")
+        
+        # Verdicts and hazard knowledge base shared with the other analyzers
+        self.verdict_cache = get_verdict_cache()
+        self.knowledge_base = get_knowledge_base()
     
     def search_product_by_name(self, product_name: str) -> List[Dict]:
         """
@@ -42,7 +75,7 @@ class OpenFoodFactsService:
                 'page_size': 20
             }
             
-            response = self.session.get(url, params=params)
+            response = self._get(url, params=params, endpoint='search')
             response.raise_for_status()
             
             data = response.json()
@@ -74,7 +107,7 @@ class OpenFoodFactsService:
         """
         try:
             url = f"{self.base_url}/product/{barcode}.json"
-            response = self.session.get(url)
+            response = self._get(url, endpoint='product', not_found=lambda r: r.json().get('status') != 1)
             response.raise_for_status()
             
             data = response.json()
@@ -89,42 +122,80 @@ class OpenFoodFactsService:
             logger.error(f"Error getting product by barcode: {str(e)}")
             return None
     
-    def search_ingredients(self, ingredients: List[str]) -> Dict:
+    def _get(self, url: str, params: Optional[Dict] = None, endpoint: str = 'default', not_found=None):
+        """GET through the response cache when there is one"""
+        timeout = Config.OPENFOODFACTS_REQUEST_TIMEOUT
+        if self.http_cache is None:
+            return self.session.get(url, params=params, timeout=timeout)
+        return self.http_cache.get(self.session, url, params=params, endpoint=endpoint, not_found=not_found,
+                                   timeout=timeout)
+    
+    def cache_stats(self) -> Dict:
+        """
+        Get the hit ratio and bytes saved by the response cache
+        
+        Returns:
+            Cumulative HTTPResponseCache statistics (empty when disabled)
+        """
+        return self.http_cache.stats() if self.http_cache is not None else {}
+    
+    def search_ingredients(self, ingredients: List[str],
+                           max_concurrency: int = Config.OPENFOODFACTS_MAX_CONCURRENCY) -> Dict:
         """
         Search for information about specific ingredients
         
+        Lookups run in parallel on a thread pool. Names that differ only in
+        case or surrounding whitespace are looked up once.
+        
         Args:
             ingredients: List of ingredient names
+            max_concurrency: Lookups running at once (the session also never
+                has more than OPENFOODFACTS_MAX_CONCURRENCY requests in flight)
             
         Returns:
-            Dictionary with ingredient information
+            Dictionary with ingredient information, in input order
         """
-        ingredient_info = {}
-        
+        # One lookup per distinct name, answering every spelling of it
+        queries: Dict[str, List[str]] = {}
         for ingredient in ingredients:
-            try:
-                # Search for products containing this ingredient
-                products = self.search_product_by_name(ingredient)
-                
-                # Analyze ingredient usage
-                ingredient_info[ingredient] = {
-                    'found_in_products': len(products),
-                    'common_categories': self._get_common_categories(products),
-                    'potential_allergen': self._check_allergen_status(ingredient),
-                    'sample_products': products[:3]  # First 3 products as samples
-                }
-                
-            except Exception as e:
-                logger.error(f"Error searching ingredient '{ingredient}': {str(e)}")
-                ingredient_info[ingredient] = {
-                    'found_in_products': 0,
-                    'common_categories': [],
-                    'potential_allergen': False,
-                    'sample_products': []
-                }
+            queries.setdefault(ingredient.strip().lower(), []).append(ingredient)
+        if not queries:
+            return {}
+        
+        ingredient_info = dict.fromkeys(ingredients)
+        workers = max(1, min(max_concurrency, len(queries)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='openfoodfacts') as pool:
+            lookups = {pool.submit(self._ingredient_info, names[0]): names for names in queries.values()}
+            for lookup in as_completed(lookups):
+                info = lookup.result()
+                for ingredient in lookups[lookup]:
+                    ingredient_info[ingredient] = dict(info)
         
         return ingredient_info
     
+    def _ingredient_info(self, ingredient: str) -> Dict:
+        """Usage information of one ingredient"""
+        try:
+            # Search for products containing this ingredient
+            products = self.search_product_by_name(ingredient)
+            
+            # Analyze ingredient usage
+            return {
+                'found_in_products': len(products),
+                'common_categories': self._get_common_categories(products),
+                'potential_allergen': self._check_allergen_status(ingredient),
+                'sample_products': products[:3]  # First 3 products as samples
+            }
+            
+        except Exception as e:
+            logger.error(f"Error searching ingredient '{ingredient}': {str(e)}")
+            return {
+                'found_in_products': 0,
+                'common_categories': [],
+                'potential_allergen': False,
+                'sample_products': []
+            }
+    
     def get_nutrition_data(self, product_data: Dict) -> Dict:
         """
         Extract nutrition information from product data
@@ -198,13 +269,14 @@ class OpenFoodFactsService:
     
     def _check_allergen_status(self, ingredient: str) -> bool:
         """Check if ingredient is a common allergen"""
-        ingredient_lower = ingredient.lower()
+        ingredient_lower = ingredient.lower().strip()
         
-        for allergen in Config.COMMON_ALLERGENS:
-            if allergen in ingredient_lower:
-                return True
+        allergens = self.verdict_cache.get_field(
+            ingredient_lower, 'allergens',
+            lambda: tuple(allergen for allergen in self.knowledge_base.allergens() if allergen in ingredient_lower)
+        )
         
-        return False
+        return bool(allergens)
     
     def get_product_additives(self, product_data: Dict) -> List[Dict]:
         """
@@ -236,15 +308,19 @@ class OpenFoodFactsService:
     
     def _get_additive_risk_level(self, additive_name: str) -> str:
         """Determine risk level for additive (simplified approach)"""
-        # High-risk additives (sample list)
-        high_risk = ['monosodium glutamate', 'sodium nitrite', 'sodium benzoate']
-        moderate_risk = ['citric acid', 'sodium chloride', 'potassium sorbate']
+        substance_index = get_substance_index(self.knowledge_base)
+        high_risk_ids = self.knowledge_base.derived(
+            'off_high_risk_additive_ids', lambda: substance_index.ids_for(self.HIGH_RISK_ADDITIVES)
+        )
+        moderate_risk_ids = self.knowledge_base.derived(
+            'off_moderate_risk_additive_ids', lambda: substance_index.ids_for(self.MODERATE_RISK_ADDITIVES)
+        )
         
-        additive_lower = additive_name.lower()
+        substance_ids = cached_substance_ids(additive_name)
         
-        if any(risk in additive_lower for risk in high_risk):
+        if any(i in high_risk_ids for i in substance_ids):
             return 'HIGH'
-        elif any(risk in additive_lower for risk in moderate_risk):
+        elif any(i in moderate_risk_ids for i in substance_ids):
             return 'MODERATE'
         else:
-            return 'LOW' 
\ No newline at end of file
+            return 'LOW'
\ No newline at end of file
@@ -0,0 +1,266 @@
+import logging
+from collections import deque
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Sentinel for "no pattern reaches this state"
+_NO_MATCH = -1
+
+
+class PatternMatcher:
+    """Compiled multi-pattern matcher for partial hazard name lookups
+
+    Answers the question the EWG partial-match scan used to answer with a
+    linear loop: which is the first pattern (in table order) that either
+    occurs inside a text or contains that text? Two automata are compiled
+    once from the pattern table:
+
+    * an Aho-Corasick automaton for "pattern occurs inside text"
+    * a generalized suffix automaton for "text occurs inside pattern"
+
+    Both are walked once per lookup, so the cost depends on the length of
+    the text rather than on the number of patterns.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        """
+        Compile the matcher
+
+        Args:
+            patterns: Pattern strings in priority order (earlier wins)
+        """
+        self.patterns: List[str] = list(patterns)
+
+        # Aho-Corasick automaton
+        self._ac_goto: List[dict] = [{}]
+        self._ac_fail: List[int] = [0]
+        self._ac_best: List[int] = [_NO_MATCH]
+
+        # Generalized suffix automaton
+        self._sa_next: List[dict] = [{}]
+        self._sa_link: List[int] = [-1]
+        self._sa_len: List[int] = [0]
+        self._sa_first: List[int] = [_NO_MATCH]
+
+        self._build_aho_corasick()
+        self._build_suffix_automaton()
+
+        logger.info(f"Compiled pattern matcher for {len(self.patterns)} patterns "
+                    f"({len(self._ac_goto)} trie nodes, {len(self._sa_next)} suffix states)")
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def find_first(self, text: str) -> Optional[str]:
+        """
+        Find the first pattern related to the text by substring containment
+
+        Args:
+            text: Normalized (lowercased, stripped) text to look up
+
+        Returns:
+            The earliest pattern contained in the text or containing it,
+            or None if there is no such pattern
+        """
+        index = self.find_first_index(text)
+        return self.patterns[index] if index != _NO_MATCH else None
+
+    def find_first_index(self, text: str) -> int:
+        """
+        Same as find_first but returns the pattern index (-1 if none)
+
+        Args:
+            text: Normalized (lowercased, stripped) text to look up
+
+        Returns:
+            Index of the earliest matching pattern or -1
+        """
+        if not self.patterns:
+            return _NO_MATCH
+
+        contained = self._first_contained_in(text)
+        containing = self._first_containing(text)
+
+        if contained == _NO_MATCH:
+            return containing
+        if containing == _NO_MATCH:
+            return contained
+        return min(contained, containing)
+
+    def find_all_in(self, text: str) -> List[int]:
+        """
+        Find every pattern occurring inside the text
+
+        Args:
+            text: Normalized text to scan
+
+        Returns:
+            Sorted list of distinct pattern indexes found in the text
+        """
+        goto = self._ac_goto
+        fail = self._ac_fail
+        outputs = self._ac_outputs
+        found = set()
+        node = 0
+
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if outputs[node]:
+                found.update(outputs[node])
+
+        return sorted(found)
+
+    def _first_contained_in(self, text: str) -> int:
+        """Earliest pattern index occurring inside text (Aho-Corasick walk)"""
+        goto = self._ac_goto
+        fail = self._ac_fail
+        best_at = self._ac_best
+        best = best_at[0]
+        node = 0
+
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            candidate = best_at[node]
+            if candidate != _NO_MATCH and (best == _NO_MATCH or candidate < best):
+                best = candidate
+
+        return best
+
+    def _first_containing(self, text: str) -> int:
+        """Earliest pattern index that contains text (suffix automaton walk)"""
+        sa_next = self._sa_next
+        state = 0
+
+        for char in text:
+            state = sa_next[state].get(char)
+            if state is None:
+                return _NO_MATCH
+
+        return self._sa_first[state]
+
+    def _build_aho_corasick(self):
+        """Build the trie, failure links and per-node best match"""
+        goto = self._ac_goto
+        best = self._ac_best
+        own = [[]]
+
+        for index, pattern in enumerate(self.patterns):
+            node = 0
+            for char in pattern:
+                child = goto[node].get(char)
+                if child is None:
+                    child = len(goto)
+                    goto[node][char] = child
+                    goto.append({})
+                    self._ac_fail.append(0)
+                    best.append(_NO_MATCH)
+                    own.append([])
+                node = child
+            if best[node] == _NO_MATCH:
+                best[node] = index
+            own[node].append(index)
+
+        # Breadth-first pass: failure links and inherited matches
+        fail = self._ac_fail
+        outputs: List[tuple] = [tuple(indexes) for indexes in own]
+        queue = deque(goto[0].values())
+
+        while queue:
+            node = queue.popleft()
+            for char, child in goto[node].items():
+                queue.append(child)
+                fallback = fail[node]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                target = goto[fallback].get(char, 0)
+                fail[child] = target if target != child else 0
+
+                inherited = best[fail[child]]
+                if inherited != _NO_MATCH and (best[child] == _NO_MATCH or inherited < best[child]):
+                    best[child] = inherited
+                if outputs[fail[child]]:
+                    outputs[child] = outputs[child] + outputs[fail[child]]
+
+        self._ac_outputs = outputs
+
+    def _build_suffix_automaton(self):
+        """Build a generalized suffix automaton and earliest-pattern marks"""
+        sa_next = self._sa_next
+        link = self._sa_link
+
+        for pattern in self.patterns:
+            last = 0
+            for char in pattern:
+                last = self._sa_extend(last, char)
+
+        # Mark every state with the earliest pattern containing it. Walking
+        # patterns in order means the first mark a state receives is the
+        # minimum, and its suffix-link ancestors are already marked too.
+        first = self._sa_first = [_NO_MATCH] * len(sa_next)
+        for index, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                state = sa_next[state][char]
+                walker = state
+                while walker > 0 and first[walker] == _NO_MATCH:
+                    first[walker] = index
+                    walker = link[walker]
+            if first[0] == _NO_MATCH:
+                first[0] = index
+
+    def _sa_extend(self, last: int, char: str) -> int:
+        """Append one character to the generalized suffix automaton"""
+        sa_next = self._sa_next
+        link = self._sa_link
+        length = self._sa_len
+
+        # Transition already present: reuse or split the existing state
+        existing = sa_next[last].get(char)
+        if existing is not None:
+            if length[existing] == length[last] + 1:
+                return existing
+            return self._sa_clone(last, char, existing)
+
+        current = len(sa_next)
+        sa_next.append({})
+        link.append(0)
+        length.append(length[last] + 1)
+
+        state = last
+        while state != -1 and char not in sa_next[state]:
+            sa_next[state][char] = current
+            state = link[state]
+
+        if state == -1:
+            link[current] = 0
+        else:
+            target = sa_next[state][char]
+            if length[state] + 1 == length[target]:
+                link[current] = target
+            else:
+                link[current] = self._sa_clone(state, char, target)
+
+        return current
+
+    def _sa_clone(self, state: int, char: str, target: int) -> int:
+        """Split target so that a state of length len(state) + 1 exists"""
+        sa_next = self._sa_next
+        link = self._sa_link
+        length = self._sa_len
+
+        clone = len(sa_next)
+        sa_next.append(dict(sa_next[target]))
+        link.append(link[target])
+        length.append(length[state] + 1)
+
+        while state != -1 and sa_next[state].get(char) == target:
+            sa_next[state][char] = clone
+            state = link[state]
+
+        link[target] = clone
+        return clone
@@ -1,10 +1,19 @@
 import logging
 import os
 import sys
-from typing import Dict, List, Optional
-from .vision_ai_service import VisionAIService
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from .vision_ai_service import ImageSource, VisionAIService
 from .openfoodfacts_service import OpenFoodFactsService
 from .ewg_service import EWGService
+from .ingredient_cache import get_verdict_cache
+from .hazard_knowledge_base import get_knowledge_base
+from .substance_index import cached_substance_ids, get_substance_index
+from .ingredient_scanner import IngredientScanner
+from .feature_matrix import AllergenProfileMatrix, IngredientFeatureMatrix
+from .stage_executor import Stage, StageExecutor
+from .image_quality import ImageQualityGate
 
 # Add parent directory to path for config import
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
@@ -16,12 +25,39 @@ logger = logging.getLogger(__name__)
 class RiskAnalyzer:
     """Main risk analysis engine that combines all services"""
     
+    # Additive risk tiers and preservatives, matched by substance ID so aliases such
+    # as E-numbers resolve to them
+    HIGH_RISK_ADDITIVES = ['artificial color', 'sodium nitrite', 'bha', 'bht']
+    MODERATE_RISK_ADDITIVES = ['sodium benzoate', 'potassium sorbate', 'citric acid']
+    PRESERVATIVES = ['sodium benzoate', 'potassium sorbate']
+    
+    # Common additives patterns
+    ADDITIVE_PATTERNS = [
+        'e1', 'e2', 'e3', 'e4', 'e5', 'e6', 'e7', 'e8', 'e9',  # E-numbers
+        'sodium', 'potassium', 'calcium', 'artificial', 'natural'
+    ]
+    
+    # Cross-contamination warnings
+    CROSS_CONTACT_PATTERNS = ['may contain', 'traces of']
+    
+    # Nutrition concern -> ingredient terms that signal it
+    NUTRITION_PATTERNS = {
+        'high_sugar': ['sugar', 'syrup'],
+        'high_sodium': ['sodium', 'salt'],
+        'artificial_ingredients': ['artificial'],
+        'trans_fats': ['trans', 'hydrogenated']
+    }
+    
     def __init__(self):
         """Initialize all services"""
         try:
             self.vision_service = VisionAIService()
+            self.quality_gate = ImageQualityGate() if Config.QUALITY_GATE else None
             self.openfoodfacts_service = OpenFoodFactsService()
             self.ewg_service = EWGService()
+            self.verdict_cache = get_verdict_cache()
+            self.knowledge_base = get_knowledge_base()
+            self.stage_executor = StageExecutor(Config.ANALYSIS_MAX_WORKERS)
             
             if self.vision_service.demo_mode:
                 logger.info("Risk analyzer initialized successfully in DEMO MODE")
@@ -31,46 +67,49 @@ class RiskAnalyzer:
             logger.error(f"Error initializing risk analyzer: {str(e)}")
             raise
     
-    def analyze_product_image(self, image_path: str, user_allergens: List[str] = None) -> Dict:
+    def analyze_product_image(self, image: ImageSource, user_allergens: List[str] = None,
+                              filename: Optional[str] = None) -> Dict:
         """
         Comprehensive product analysis from image
         
         Args:
-            image_path: Path to the product image
+            image: Path to the product image, or its encoded bytes (e.g. an
+                upload buffer, analyzed without touching disk)
             user_allergens: List of user's known allergens
+            filename: Original name of an uploaded image (checked against
+                the allowed extensions)
             
         Returns:
-            Complete risk analysis
+            Complete risk analysis; an error result carrying the 'quality'
+            check when the image fails the pre-flight quality gate
         """
         try:
-            logger.info(f"Starting comprehensive analysis of {image_path}")
+            source = image if isinstance(image, str) else f"{memoryview(image).nbytes}-byte image"
+            logger.info(f"Starting comprehensive analysis of {source}")
             
-            # Step 1: Extract product information using Vision AI
-            product_info = self.vision_service.detect_product_info(image_path)
+            # Step 0: Reject images OCR cannot read before paying for a Vision call
+            if self.quality_gate is not None:
+                quality = self.quality_gate.check(image, filename)
+                if not quality['passed']:
+                    result = self._create_error_result(quality['reason'])
+                    result['quality'] = quality
+                    return result
             
-            if not product_info:
-                return self._create_error_result("Failed to extract product information from image")
+            # Pick up hazard data imported since the last analysis
+            self.knowledge_base.refresh()
             
-            # Step 2: Get additional product data from OpenFoodFacts
-            additional_data = None
-            if product_info.get('brand') and product_info.get('brand') != 'Unknown':
-                additional_data = self.openfoodfacts_service.search_product_by_name(
-                    f"{product_info['brand']} {product_info.get('labels', [{}])[0].get('description', '')}"
-                )
+            # Steps 1-4 run as a stage graph so independent stages overlap
+            outputs, stage_timings = self.stage_executor.run(
+                self._analysis_stages(image, user_allergens)
+            )
+            product_info = outputs['product_info']
             
-            # Step 3: Analyze ingredients for safety
-            ingredients = product_info.get('ingredients', [])
-            if not ingredients and additional_data:
-                # Try to get ingredients from OpenFoodFacts
-                for product in additional_data:
-                    if product.get('ingredients'):
-                        ingredients.extend(product['ingredients'])
-                        break
+            if not product_info:
+                return self._create_error_result("Failed to extract product information from image")
             
-            # Step 4: Perform risk analysis
-            risk_analysis = self._perform_comprehensive_risk_analysis(
-                ingredients, user_allergens, product_info.get('product_type', 'unknown')
-            )
+            additional_data = outputs['openfoodfacts']
+            ingredients = outputs['risk_analysis']['ingredients']
+            risk_analysis = outputs['risk_analysis']['risk_analysis']
             
             # Step 5: Generate personalized alerts
             alerts = self._generate_personalized_alerts(risk_analysis, user_allergens)
@@ -84,6 +123,8 @@ class RiskAnalyzer:
                 'alerts': alerts,
                 'summary': self._generate_summary(risk_analysis, alerts),
                 'recommendations': self._generate_recommendations(risk_analysis, product_info.get('product_type')),
+                'user_allergens': list(user_allergens or []),
+                'stage_timings': stage_timings,
                 'timestamp': self._get_timestamp()
             }
             
@@ -94,6 +135,122 @@ class RiskAnalyzer:
             logger.error(f"Error during comprehensive analysis: {str(e)}")
             return self._create_error_result(f"Analysis failed: {str(e)}")
     
+    def _analysis_stages(self, image: ImageSource, user_allergens: List[str]) -> List[Stage]:
+        """
+        Build the stage graph of analyze_product_image
+        
+        product_info -> openfoodfacts ---------------------> risk_analysis
+                     -> ingredient_analysis (OCR ingredients) ->
+        
+        The OpenFoodFacts search overlaps the analysis of the OCR'd
+        ingredients; risk_analysis only analyzes OpenFoodFacts ingredients
+        when OCR found none.
+        """
+        timeouts = Config.ANALYSIS_STAGE_TIMEOUTS
+        empty_analysis = {'ingredients': [], 'risk_analysis': self._empty_risk_analysis()}
+        
+        def product_info_stage(inputs):
+            # Step 1: Extract product information using Vision AI
+            return self.vision_service.detect_product_info(image)
+        
+        def openfoodfacts_stage(inputs):
+            # Step 2: Get additional product data from OpenFoodFacts
+            product_info = inputs['product_info']
+            if product_info.get('brand') and product_info.get('brand') != 'Unknown':
+                return self.openfoodfacts_service.search_product_by_name(
+                    f"{product_info['brand']} {product_info.get('labels', [{}])[0].get('description', '')}"
+                )
+            return None
+        
+        def ingredient_analysis_stage(inputs):
+            # Step 3: Analyze the OCR'd ingredients for safety
+            product_info = inputs['product_info']
+            ingredients = product_info.get('ingredients', [])
+            if not ingredients:
+                return None
+            return {
+                'ingredients': ingredients,
+                'risk_analysis': self._perform_comprehensive_risk_analysis(
+                    ingredients, user_allergens, product_info.get('product_type', 'unknown')
+                )
+            }
+        
+        def risk_analysis_stage(inputs):
+            # Step 4: Perform risk analysis, falling back to OpenFoodFacts ingredients
+            if inputs['ingredient_analysis'] is not None:
+                return inputs['ingredient_analysis']
+            
+            product_info = inputs['product_info']
+            additional_data = inputs['openfoodfacts']
+            ingredients = product_info.get('ingredients', [])
+            if not ingredients and additional_data:
+                # Try to get ingredients from OpenFoodFacts
+                for product in additional_data:
+                    if product.get('ingredients'):
+                        ingredients.extend(product['ingredients'])
+                        break
+            
+            return {
+                'ingredients': ingredients,
+                'risk_analysis': self._perform_comprehensive_risk_analysis(
+                    ingredients, user_allergens, product_info.get('product_type', 'unknown')
+                )
+            }
+        
+        return [
+            Stage('product_info', product_info_stage,
+                  timeout=timeouts.get('product_info'), default={}),
+            Stage('openfoodfacts', openfoodfacts_stage, depends=['product_info'],
+                  timeout=timeouts.get('openfoodfacts'), default=None),
+            Stage('ingredient_analysis', ingredient_analysis_stage, depends=['product_info'],
+                  timeout=timeouts.get('ingredient_analysis'), default=None),
+            Stage('risk_analysis', risk_analysis_stage,
+                  depends=['product_info', 'openfoodfacts', 'ingredient_analysis'],
+                  timeout=timeouts.get('risk_analysis'), default=empty_analysis)
+        ]
+    
+    def personalize_result(self, result: Dict, user_allergens: List[str] = None) -> Dict:
+        """
+        Re-personalize a stored analysis for a new allergen profile
+        
+        Only the profile-dependent parts (allergen analysis, overall risk
+        score, alerts, summary and recommendations) are recomputed; the
+        image, OpenFoodFacts and EWG results are reused as they are, so no
+        external calls are made.
+        
+        Args:
+            result: Result of analyze_product_image
+            user_allergens: New list of the user's known allergens
+            
+        Returns:
+            New result dictionary for the given profile
+        """
+        if result.get('error'):
+            return result
+        
+        user_allergens = list(user_allergens or [])
+        risk_analysis = dict(result['risk_analysis'])
+        
+        risk_analysis['allergen_analysis'] = self._personalize_allergen_analysis(
+            risk_analysis.get('allergen_analysis', {}), user_allergens
+        )
+        risk_analysis['overall_risk_score'] = self._calculate_overall_risk_score(
+            risk_analysis['ewg_analysis'], risk_analysis['allergen_analysis'],
+            risk_analysis['additive_analysis'], risk_analysis['banned_substances']
+        )
+        
+        alerts = self._generate_personalized_alerts(risk_analysis, user_allergens)
+        product_type = result.get('product_info', {}).get('product_type')
+        
+        return {
+            **result,
+            'risk_analysis': risk_analysis,
+            'alerts': alerts,
+            'summary': self._generate_summary(risk_analysis, alerts),
+            'recommendations': self._generate_recommendations(risk_analysis, product_type),
+            'user_allergens': user_allergens
+        }
+    
     def _perform_comprehensive_risk_analysis(self, ingredients: List[str], 
                                            user_allergens: List[str], 
                                            product_type: str) -> Dict:
@@ -102,19 +259,22 @@ class RiskAnalyzer:
             # EWG Safety Analysis
             ewg_analysis = self.ewg_service.get_product_safety_score(ingredients)
             
+            # One pass over the ingredients feeds every category below
+            scans = self._scan_ingredients(ingredients)
+            
             # Allergen Analysis
-            allergen_analysis = self._analyze_allergens(ingredients, user_allergens or [])
+            allergen_analysis = self._analyze_allergens(ingredients, user_allergens or [], scans)
             
             # Additive Analysis
-            additive_analysis = self._analyze_additives(ingredients)
+            additive_analysis = self._analyze_additives(ingredients, scans)
             
             # Banned Substances Check
-            banned_substances = self.ewg_service.check_banned_substances(ingredients)
+            banned_substances = self._find_banned_substances(ingredients, scans)
             
             # Nutrition Analysis (if food product)
             nutrition_analysis = None
             if product_type == 'food':
-                nutrition_analysis = self._analyze_nutrition_concerns(ingredients)
+                nutrition_analysis = self._analyze_nutrition_concerns(ingredients, scans)
             
             return {
                 'ewg_analysis': ewg_analysis,
@@ -129,39 +289,56 @@ class RiskAnalyzer:
             
         except Exception as e:
             logger.error(f"Error in comprehensive risk analysis: {str(e)}")
-            return {
-                'ewg_analysis': {},
-                'allergen_analysis': {},
-                'additive_analysis': {},
-                'banned_substances': [],
-                'nutrition_analysis': None,
-                'overall_risk_score': {'score': 0, 'level': 'UNKNOWN'}
-            }
+            return self._empty_risk_analysis()
     
-    def _analyze_allergens(self, ingredients: List[str], user_allergens: List[str]) -> Dict:
+    def _empty_risk_analysis(self) -> Dict:
+        """Risk analysis used when the ingredients could not be analyzed"""
+        return {
+            'ewg_analysis': {},
+            'allergen_analysis': {},
+            'additive_analysis': {},
+            'banned_substances': [],
+            'nutrition_analysis': None,
+            'overall_risk_score': {'score': 0, 'level': 'UNKNOWN'}
+        }
+    
+    def _analyze_allergens(self, ingredients: List[str], user_allergens: List[str],
+                           scans: Optional[List[Dict]] = None) -> Dict:
         """Analyze allergens in ingredients"""
         detected_allergens = []
         potential_allergens = []
         
-        for ingredient in ingredients:
-            ingredient_lower = ingredient.lower()
-            
+        for ingredient, scan in zip(ingredients, scans or self._scan_ingredients(ingredients)):
             # Check against common allergens
-            for allergen in Config.COMMON_ALLERGENS:
-                if allergen in ingredient_lower:
-                    detected_allergens.append({
-                        'allergen': allergen,
-                        'ingredient': ingredient,
-                        'severity': 'HIGH' if allergen in user_allergens else 'MODERATE'
-                    })
+            for allergen in scan.get('allergen', ()):
+                detected_allergens.append({
+                    'allergen': allergen,
+                    'ingredient': ingredient
+                })
             
             # Check for potential allergens (cross-contamination warnings)
-            if 'may contain' in ingredient_lower or 'traces of' in ingredient_lower:
+            if 'cross_contact' in scan:
                 potential_allergens.append(ingredient)
         
+        return self._personalize_allergen_analysis(
+            {'detected_allergens': detected_allergens, 'potential_allergens': potential_allergens},
+            user_allergens
+        )
+    
+    def _personalize_allergen_analysis(self, allergen_analysis: Dict, user_allergens: List[str]) -> Dict:
+        """Apply a user's allergen profile to the detected allergens of a product"""
+        detected_allergens = [
+            {
+                'allergen': da['allergen'],
+                'ingredient': da['ingredient'],
+                'severity': 'HIGH' if da['allergen'] in user_allergens else 'MODERATE'
+            }
+            for da in allergen_analysis.get('detected_allergens', [])
+        ]
+        
         return {
             'detected_allergens': detected_allergens,
-            'potential_allergens': potential_allergens,
+            'potential_allergens': allergen_analysis.get('potential_allergens', []),
             'user_allergen_matches': [
                 da for da in detected_allergens 
                 if da['allergen'] in user_allergens
@@ -169,22 +346,16 @@ class RiskAnalyzer:
             'allergen_risk_level': self._determine_allergen_risk_level(detected_allergens, user_allergens)
         }
     
-    def _analyze_additives(self, ingredients: List[str]) -> Dict:
+    def _analyze_additives(self, ingredients: List[str], scans: Optional[List[Dict]] = None) -> Dict:
         """Analyze food additives and preservatives"""
         additives = []
         preservatives = []
         
-        # Common additives patterns
-        additive_patterns = [
-            'e1', 'e2', 'e3', 'e4', 'e5', 'e6', 'e7', 'e8', 'e9',  # E-numbers
-            'sodium', 'potassium', 'calcium', 'artificial', 'natural'
-        ]
-        
-        for ingredient in ingredients:
-            ingredient_lower = ingredient.lower()
+        for ingredient, scan in zip(ingredients, scans or self._scan_ingredients(ingredients)):
+            is_additive, is_preservative = self._additive_kinds(ingredient, scan)
             
             # Check for E-numbers and additives
-            if any(pattern in ingredient_lower for pattern in additive_patterns):
+            if is_additive:
                 risk_level = self._assess_additive_risk(ingredient)
                 additives.append({
                     'name': ingredient,
@@ -193,7 +364,7 @@ class RiskAnalyzer:
                 })
             
             # Check for preservatives
-            if any(term in ingredient_lower for term in ['preservative', 'sodium benzoate', 'potassium sorbate']):
+            if is_preservative:
                 preservatives.append({
                     'name': ingredient,
                     'type': 'preservative',
@@ -207,15 +378,29 @@ class RiskAnalyzer:
             'high_risk_additives': len([a for a in additives + preservatives if a['risk_level'] == 'HIGH'])
         }
     
-    def _analyze_nutrition_concerns(self, ingredients: List[str]) -> Dict:
+    def _additive_kinds(self, ingredient: str, scan: Dict) -> Tuple[bool, bool]:
+        """Whether an ingredient counts as an additive and/or a preservative"""
+        substance_index = get_substance_index(self.knowledge_base)
+        preservative_ids = self._substance_id_set('preservative_ids', self.PRESERVATIVES)
+        substance_ids = cached_substance_ids(ingredient)
+        
+        is_additive = 'additive' in scan or any(i in substance_index.additive_ids for i in substance_ids)
+        is_preservative = 'preservative' in scan or any(i in preservative_ids for i in substance_ids)
+        return is_additive, is_preservative
+    
+    def _analyze_nutrition_concerns(self, ingredients: List[str], scans: Optional[List[Dict]] = None) -> Dict:
         """Analyze nutritional concerns for food products"""
         concerns = []
         
         # Check for high-concern ingredients
-        high_sugar = any('sugar' in ing.lower() or 'syrup' in ing.lower() for ing in ingredients)
-        high_sodium = any('sodium' in ing.lower() or 'salt' in ing.lower() for ing in ingredients)
-        artificial_ingredients = any('artificial' in ing.lower() for ing in ingredients)
-        trans_fats = any('trans' in ing.lower() or 'hydrogenated' in ing.lower() for ing in ingredients)
+        found = set()
+        for scan in scans or self._scan_ingredients(ingredients):
+            found.update(scan)
+        
+        high_sugar = 'high_sugar' in found
+        high_sodium = 'high_sodium' in found
+        artificial_ingredients = 'artificial_ingredients' in found
+        trans_fats = 'trans_fats' in found
         
         if high_sugar:
             concerns.append({
@@ -250,6 +435,176 @@ class RiskAnalyzer:
             'overall_nutrition_score': self._calculate_nutrition_score(concerns)
         }
     
+    def _find_banned_substances(self, ingredients: List[str], scans: Optional[List[Dict]] = None) -> List[Dict]:
+        """Check for banned or restricted substances (see EWGService.check_banned_substances)"""
+        banned_found = []
+        
+        for ingredient, scan in zip(ingredients, scans or self._scan_ingredients(ingredients)):
+            for banned_chem in scan.get('banned', ()):
+                banned_found.append({
+                    'ingredient': ingredient,
+                    'banned_substance': banned_chem,
+                    'reason': 'Potentially harmful chemical',
+                    'severity': 'HIGH'
+                })
+        
+        return banned_found
+    
+    def _scan_ingredients(self, ingredients: List[str]) -> List[Dict]:
+        """Category hits for each ingredient, from one compiled pass each"""
+        return [self._scan_ingredient(ingredient.lower().strip()) for ingredient in ingredients]
+    
+    def _scan_ingredient(self, ingredient_lower: str) -> Dict:
+        """Category hits for one normalized ingredient, memoized in the verdict cache"""
+        scanner = self.knowledge_base.derived('risk_scanner', self._build_scanner)
+        return self.verdict_cache.get_field(ingredient_lower, 'scan', lambda: scanner.scan(ingredient_lower))
+    
+    def _build_scanner(self) -> IngredientScanner:
+        """Compile every category pattern list into one scanner"""
+        return IngredientScanner({
+            'allergen': self.knowledge_base.allergens(),
+            'cross_contact': self.CROSS_CONTACT_PATTERNS,
+            'additive': self.ADDITIVE_PATTERNS,
+            'preservative': ['preservative'],
+            'banned': self.knowledge_base.banned_substances(),
+            **self.NUTRITION_PATTERNS
+        })
+    
+    @property
+    def feature_matrix(self) -> IngredientFeatureMatrix:
+        """Per-ingredient feature rows, rebuilt when the knowledge base changes"""
+        return self.knowledge_base.derived(
+            'feature_matrix',
+            lambda: IngredientFeatureMatrix(self.knowledge_base.allergens(), self._ingredient_features)
+        )
+    
+    def _ingredient_features(self, ingredient_keys: List[str]) -> List[Dict]:
+        """Feature dicts of normalized ingredients, from the per-ingredient verdicts"""
+        verdicts = self.ewg_service.analyze_ingredients_batch(ingredient_keys)
+        features = []
+        
+        for key, verdict in zip(ingredient_keys, verdicts):
+            scan = self._scan_ingredient(key)
+            is_additive, is_preservative = self._additive_kinds(key, scan)
+            features.append({
+                'hazard_score': verdict['hazard_score'],
+                'hazard_level': verdict['hazard_level'],
+                'allergens': scan.get('allergen', ()),
+                'banned': len(scan.get('banned', ())),
+                'additive': is_additive,
+                'preservative': is_preservative,
+                'additive_risk': self._assess_additive_risk(key),
+                'nutrition': [concern for concern in self.NUTRITION_PATTERNS if concern in scan]
+            })
+        
+        return features
+    
+    def score_products_batch(self, products: List[List[str]], 
+                             user_allergens: Optional[List[str]] = None) -> List[Dict]:
+        """
+        Score many products at once from the ingredient feature matrix
+        
+        Produces the same EWG summary counts and overall risk score as
+        _perform_comprehensive_risk_analysis, without the per-ingredient
+        detail lists (detailed analyses, recommendations).
+        
+        Args:
+            products: Ingredient lists, one per product
+            user_allergens: Allergen profile applied to every product
+            
+        Returns:
+            List of dictionaries with 'ewg_analysis' and 'overall_risk_score',
+            one per product
+        """
+        totals = self.feature_matrix.aggregate(products, user_allergens or [])
+        counts = totals['ingredients']
+        high_risk = totals['high_risk'].astype(np.int64)
+        moderate_risk = totals['moderate_risk'].astype(np.int64)
+        low_risk = totals['low_risk'].astype(np.int64)
+        
+        # EWG product level
+        ewg_levels = np.select(
+            [high_risk > 0, moderate_risk > counts * 0.3], ['HIGH', 'MODERATE'], 'LOW'
+        )
+        averages = totals['hazard_sum'] / np.maximum(counts, 1)
+        ewg_scores = np.array([round(float(average), 2) for average in averages])
+        ewg_scores[counts == 0] = 1
+        
+        # Overall risk score, penalties applied in the same order as _calculate_overall_risk_score
+        base_scores = (ewg_scores + totals['banned'] * 2 + totals['high_risk_additives'] * 0.5
+                       + totals['allergen_matches'] * 1.5)
+        final_scores = np.minimum(base_scores, 10)
+        risk_levels = np.select(
+            [final_scores >= 7, final_scores >= 5, final_scores >= 3], ['SEVERE', 'HIGH', 'MODERATE'], 'LOW'
+        )
+        
+        results = []
+        for i in range(len(products)):
+            # Keep the int/float types the scalar path produces
+            if base_scores[i] > 10:
+                score = 10
+            elif counts[i] == 0 and base_scores[i] == 1:
+                score = 1
+            else:
+                score = round(float(final_scores[i]), 2)
+            
+            results.append({
+                'ewg_analysis': {
+                    'overall_score': 1 if counts[i] == 0 else float(ewg_scores[i]),
+                    'overall_level': str(ewg_levels[i]),
+                    'total_ingredients': int(counts[i]),
+                    'high_risk_ingredients': int(high_risk[i]),
+                    'moderate_risk_ingredients': int(moderate_risk[i]),
+                    'low_risk_ingredients': int(low_risk[i])
+                },
+                'overall_risk_score': {
+                    'score': score,
+                    'level': str(risk_levels[i]),
+                    'max_score': 10
+                }
+            })
+        
+        return results
+    
+    def match_user_profiles(self, risk_analysis: Dict, profiles: AllergenProfileMatrix) -> Dict:
+        """
+        Evaluate one analyzed product against many user allergen profiles
+        
+        Gives, for every affected user, what _generate_personalized_alerts
+        and _calculate_overall_risk_score would report for that user's
+        allergens, computed for all profiles at once.
+        
+        Args:
+            risk_analysis: Result of _perform_comprehensive_risk_analysis
+            profiles: Compiled user profiles (see AllergenProfileMatrix.from_profiles)
+            
+        Returns:
+            Dictionary of arrays aligned on the affected users: user_ids,
+            match_counts (user allergen matches), priorities (highest alert
+            priority), risk_scores and risk_levels
+        """
+        detected = risk_analysis['allergen_analysis'].get('detected_allergens', [])
+        rows, match_counts = profiles.match(Counter(d['allergen'] for d in detected))
+        
+        base_score = self._base_risk_score(
+            risk_analysis['ewg_analysis'], risk_analysis['additive_analysis'], risk_analysis['banned_substances']
+        )
+        final_scores = np.minimum(base_score + match_counts * 1.5, 10)
+        risk_levels = np.select(
+            [final_scores >= 7, final_scores >= 5, final_scores >= 3], ['SEVERE', 'HIGH', 'MODERATE'], 'LOW'
+        )
+        
+        # Affected users always get the HIGH allergen alert; banned substances outrank it
+        priority = 'CRITICAL' if risk_analysis['banned_substances'] else 'HIGH'
+        
+        return {
+            'user_ids': profiles.user_ids[rows],
+            'match_counts': match_counts,
+            'priorities': np.full(len(rows), priority),
+            'risk_scores': np.round(final_scores, 2),
+            'risk_levels': risk_levels
+        }
+    
     def _generate_personalized_alerts(self, risk_analysis: Dict, user_allergens: List[str]) -> List[Dict]:
         """Generate personalized alerts based on risk analysis"""
         alerts = []
@@ -299,16 +654,7 @@ class RiskAnalyzer:
                                     additive_analysis: Dict, banned_substances: List) -> Dict:
         """Calculate overall risk score"""
         try:
-            # Base score from EWG analysis
-            base_score = ewg_analysis.get('overall_score', 1)
-            
-            # Add penalty for banned substances
-            if banned_substances:
-                base_score += len(banned_substances) * 2
-            
-            # Add penalty for high-risk additives
-            if additive_analysis.get('high_risk_additives', 0) > 0:
-                base_score += additive_analysis['high_risk_additives'] * 0.5
+            base_score = self._base_risk_score(ewg_analysis, additive_analysis, banned_substances)
             
             # Add penalty for allergens
             if allergen_analysis.get('user_allergen_matches'):
@@ -337,6 +683,21 @@ class RiskAnalyzer:
             logger.error(f"Error calculating overall risk score: {str(e)}")
             return {'score': 0, 'level': 'UNKNOWN', 'max_score': 10}
     
+    def _base_risk_score(self, ewg_analysis: Dict, additive_analysis: Dict, banned_substances: List) -> float:
+        """Uncapped risk score before the profile-dependent allergen penalty"""
+        # Base score from EWG analysis
+        base_score = ewg_analysis.get('overall_score', 1)
+        
+        # Add penalty for banned substances
+        if banned_substances:
+            base_score += len(banned_substances) * 2
+        
+        # Add penalty for high-risk additives
+        if additive_analysis.get('high_risk_additives', 0) > 0:
+            base_score += additive_analysis['high_risk_additives'] * 0.5
+        
+        return base_score
+    
     def _generate_summary(self, risk_analysis: Dict, alerts: List[Dict]) -> str:
         """Generate a summary of the analysis"""
         overall_score = risk_analysis['overall_risk_score']
@@ -405,16 +766,31 @@ class RiskAnalyzer:
     
     def _assess_additive_risk(self, ingredient: str) -> str:
         """Assess risk level of additive"""
-        ingredient_lower = ingredient.lower()
+        ingredient_lower = ingredient.lower().strip()
+        return self.verdict_cache.get_field(
+            ingredient_lower, 'additive_risk', lambda: self._classify_additive_risk(ingredient_lower)
+        )
+    
+    def _classify_additive_risk(self, ingredient_lower: str) -> str:
+        """Classify additive risk for a normalized ingredient name"""
+        substance_ids = cached_substance_ids(ingredient_lower)
+        high_risk_ids = self._substance_id_set('high_risk_additive_ids', self.HIGH_RISK_ADDITIVES)
+        moderate_risk_ids = self._substance_id_set('moderate_risk_additive_ids', self.MODERATE_RISK_ADDITIVES)
         
         # High-risk additives
-        if any(term in ingredient_lower for term in ['artificial color', 'sodium nitrite', 'bha', 'bht']):
+        if any(i in high_risk_ids for i in substance_ids):
             return 'HIGH'
-        elif any(term in ingredient_lower for term in ['sodium benzoate', 'potassium sorbate', 'citric acid']):
+        elif any(i in moderate_risk_ids for i in substance_ids):
             return 'MODERATE'
         else:
             return 'LOW'
     
+    def _substance_id_set(self, key: str, names: List[str]) -> frozenset:
+        """Substance IDs for a list of names, resolved once per knowledge base version"""
+        return self.knowledge_base.derived(
+            key, lambda: get_substance_index(self.knowledge_base).ids_for(names)
+        )
+    
     def _calculate_nutrition_score(self, concerns: List[Dict]) -> int:
         """Calculate nutrition score based on concerns"""
         if not concerns:
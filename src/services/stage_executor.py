@@ -0,0 +1,146 @@
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class Stage:
+    """One node of an analysis pipeline
+
+    The stage function receives a dict with the outputs of the stages it
+    depends on and returns its own output. If it raises or runs past its
+    timeout, the stage's default value is used as its output instead.
+    """
+
+    def __init__(self, name: str, func: Callable[[Dict[str, Any]], Any],
+                 depends: Sequence[str] = (), timeout: Optional[float] = None,
+                 default: Any = None):
+        """
+        Define a stage
+
+        Args:
+            name: Unique stage name
+            func: Callable taking the dependency outputs by stage name
+            depends: Names of the stages whose outputs func needs
+            timeout: Seconds the stage may run once a worker picks it up
+                (None = no limit). A timed-out stage keeps its worker until it
+                returns, so only give timeouts to stages that wait on the
+                network with their own request timeouts, not to CPU-bound ones
+            default: Output used when the stage fails or times out
+        """
+        self.name = name
+        self.func = func
+        self.depends = tuple(depends)
+        self.timeout = timeout
+        self.default = default
+
+
+class StageExecutor:
+    """Runs a DAG of stages on a thread pool
+
+    Every stage is submitted as soon as all of its dependencies have
+    finished, so independent I/O-bound stages overlap. A stage's timeout
+    counts from when a worker starts it, not from submission, so time spent
+    queued behind other stages is not held against it. A stage that times
+    out is abandoned (its thread cannot be interrupted and finishes in the
+    background) and its dependents continue with its default output.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        """
+        Initialize the executor
+
+        Args:
+            max_workers: Size of the shared thread pool
+        """
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='analysis-stage')
+
+    def run(self, stages: List[Stage]) -> Tuple[Dict[str, Any], Dict[str, Dict]]:
+        """
+        Run a pipeline to completion
+
+        Args:
+            stages: Stages in any order; dependencies must name stages of the list
+
+        Returns:
+            Tuple of (outputs by stage name, timings by stage name). Each
+            timing holds 'status' ('ok', 'error' or 'timeout'), 'started'
+            (seconds after the pipeline started), 'queued' (seconds between
+            submission and start) and 'wall_time' (seconds once started)
+        """
+        by_name = {stage.name: stage for stage in stages}
+        for stage in stages:
+            missing = [name for name in stage.depends if name not in by_name]
+            if missing:
+                raise ValueError(f"Stage '{stage.name}' depends on unknown stage(s): {', '.join(missing)}")
+
+        outputs: Dict[str, Any] = {}
+        timings: Dict[str, Dict] = {}
+        # Per running stage: submission time, and start time once a worker picks it up
+        running: Dict[Future, Tuple[Stage, Dict[str, float]]] = {}
+        pending = list(stages)
+        pipeline_start = time.perf_counter()
+
+        while pending or running:
+            # Submit every stage whose dependencies are all done
+            for stage in [s for s in pending if all(name in outputs for name in s.depends)]:
+                pending.remove(stage)
+                inputs = {name: outputs[name] for name in stage.depends}
+                clock = {'submitted': time.perf_counter()}
+                running[self._pool.submit(self._timed, stage.func, inputs, clock)] = (stage, clock)
+
+            if not running:
+                raise ValueError(f"Dependency cycle between stages: {', '.join(s.name for s in pending)}")
+
+            # Wait until a stage finishes or the earliest deadline passes
+            now = time.perf_counter()
+            deadlines = [clock['started'] + stage.timeout for stage, clock in running.values()
+                         if stage.timeout is not None and 'started' in clock]
+            # A queued stage with a timeout has no deadline yet; check again shortly
+            queued = any(stage.timeout is not None and 'started' not in clock for stage, clock in running.values())
+            if queued:
+                deadlines.append(now + 0.05)
+            wait_for = max(0.0, min(deadlines) - now) if deadlines else None
+            done, _ = wait(list(running), timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            now = time.perf_counter()
+            for future, (stage, clock) in list(running.items()):
+                started = clock.get('started')
+                if future in done:
+                    try:
+                        outputs[stage.name] = future.result()
+                        status = 'ok'
+                    except Exception as e:
+                        logger.error(f"Stage '{stage.name}' failed: {str(e)}")
+                        outputs[stage.name] = stage.default
+                        status = 'error'
+                elif stage.timeout is not None and started is not None and now - started >= stage.timeout:
+                    logger.warning(f"Stage '{stage.name}' timed out after {stage.timeout}s")
+                    future.cancel()
+                    outputs[stage.name] = stage.default
+                    status = 'timeout'
+                else:
+                    continue
+
+                del running[future]
+                started = started if started is not None else clock['submitted']
+                timings[stage.name] = {
+                    'status': status,
+                    'started': round(started - pipeline_start, 4),
+                    'queued': round(started - clock['submitted'], 4),
+                    'wall_time': round(now - started, 4)
+                }
+
+        return outputs, timings
+
+    @staticmethod
+    def _timed(func: Callable[[Dict[str, Any]], Any], inputs: Dict[str, Any], clock: Dict[str, float]) -> Any:
+        """Run a stage function on a worker, recording when it started"""
+        clock['started'] = time.perf_counter()
+        return func(inputs)
+
+    def shutdown(self):
+        """Stop accepting stages; running ones finish in the background"""
+        self._pool.shutdown(wait=False)
@@ -0,0 +1,171 @@
+import logging
+import re
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+from .hazard_knowledge_base import HazardKnowledgeBase, get_knowledge_base
+from .ingredient_cache import get_verdict_cache
+
+logger = logging.getLogger(__name__)
+
+# "E211", "e 211", "E-211", "INS 211", "E150d", "E450(i)" -> "e211" / "e150d" / "e450"
+E_NUMBER_PATTERN = re.compile(r'^(?:e|ins)\s*-?\s*(\d{3,4})\s*([a-z]?)(?:\s*\(\s*[ivx]+\s*\))?$')
+
+# Parenthesized qualifiers, e.g. "preservative (e202)"
+PARENTHESIZED_PATTERN = re.compile(r'\(([^()]*)\)')
+
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# Punctuation around the words of an ingredient, ignored when looking up word sequences
+WORD_PUNCTUATION = '.,;:()[]*"'
+
+
+def canonical_key(token: str) -> str:
+    """
+    Normalize a token to the form used by the alias index
+
+    Args:
+        token: Raw ingredient token
+
+    Returns:
+        Lowercased, whitespace-collapsed key with E/INS numbers unified
+    """
+    key = WHITESPACE_PATTERN.sub(' ', token.lower()).strip()
+    match = E_NUMBER_PATTERN.match(key)
+    if match:
+        return f"e{match.group(1)}{match.group(2)}"
+    return key
+
+
+class SubstanceIndex:
+    """Alias hash index mapping ingredient tokens to canonical substance IDs
+
+    Every substance name, alias (synonyms, E/INS numbers) and CAS number in
+    the knowledge base is keyed into one dict, so canonicalizing a token is
+    a single hash lookup. Analyzers then reason about integer substance IDs
+    instead of re-scanning strings for each spelling.
+    """
+
+    def __init__(self, keys: Iterable[Tuple[str, int]]):
+        """
+        Build the index
+
+        Args:
+            keys: (name/alias/CAS, substance_id) pairs; the first pair for a
+                key wins, so names take precedence over aliases
+        """
+        self._ids: Dict[str, int] = {}
+        self._names: Dict[int, str] = {}
+        additive_ids = set()
+        # Longest key in words, bounding the word sequences looked up in an ingredient
+        self._max_words = 1
+
+        for key, substance_id in keys:
+            if substance_id not in self._names:
+                self._names[substance_id] = key
+            canonical = canonical_key(key)
+            self._ids.setdefault(canonical, substance_id)
+            self._max_words = max(self._max_words, canonical.count(' ') + 1)
+            if E_NUMBER_PATTERN.match(canonical):
+                additive_ids.add(substance_id)
+
+        self.additive_ids: FrozenSet[int] = frozenset(additive_ids)
+        logger.info(f"Built substance index with {len(self._ids)} keys for {len(self._names)} substances")
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def canonicalize(self, token: str) -> Optional[int]:
+        """
+        Map a token to its canonical substance ID
+
+        Args:
+            token: Ingredient name, synonym, E/INS number or CAS number
+
+        Returns:
+            Substance ID or None if the token is unknown
+        """
+        return self._ids.get(canonical_key(token))
+
+    def substances_in(self, ingredient: str) -> List[int]:
+        """
+        Canonicalize an ingredient, its parenthesized qualifiers and the
+        word sequences within it
+
+        "Preservative (E202)" yields the ID of potassium sorbate,
+        "Sodium Benzoate (Preservative)" the ID of sodium benzoate and
+        "natural and artificial colors" the ID of artificial colors. Only
+        whole words match, so "bha" is not found in "bhang".
+
+        Args:
+            ingredient: Raw ingredient string
+
+        Returns:
+            Distinct substance IDs: whole ingredient first, then qualifiers,
+            then word sequences by position (longest first)
+        """
+        found = []
+        candidates = [ingredient]
+        if '(' in ingredient:
+            candidates.append(PARENTHESIZED_PATTERN.sub(' ', ingredient))
+            candidates.extend(PARENTHESIZED_PATTERN.findall(ingredient))
+
+        words = [word.strip(WORD_PUNCTUATION) for word in ingredient.split()]
+        words = [word for word in words if word]
+        for start in range(len(words)):
+            for end in range(min(len(words), start + self._max_words), start, -1):
+                candidates.append(' '.join(words[start:end]))
+
+        for candidate in candidates:
+            substance_id = self._ids.get(canonical_key(candidate))
+            if substance_id is not None and substance_id not in found:
+                found.append(substance_id)
+
+        return found
+
+    def name_of(self, substance_id: int) -> str:
+        """Canonical (normalized) name of a substance"""
+        return self._names[substance_id]
+
+    def ids_for(self, names: Iterable[str]) -> FrozenSet[int]:
+        """
+        Resolve a list of names to the set of their substance IDs
+
+        Args:
+            names: Names or aliases; unknown ones are ignored
+
+        Returns:
+            Frozen set of substance IDs
+        """
+        ids = (self.canonicalize(name) for name in names)
+        return frozenset(substance_id for substance_id in ids if substance_id is not None)
+
+
+def get_substance_index(knowledge_base: Optional[HazardKnowledgeBase] = None) -> SubstanceIndex:
+    """
+    Get the substance index for a knowledge base, building it once
+
+    Args:
+        knowledge_base: Knowledge base to index (defaults to the shared one)
+
+    Returns:
+        Shared SubstanceIndex, rebuilt only when the knowledge base changes
+    """
+    knowledge_base = knowledge_base or get_knowledge_base()
+    return knowledge_base.derived('substance_index', lambda: SubstanceIndex(knowledge_base.name_keys()))
+
+
+def cached_substance_ids(ingredient: str) -> Tuple[int, ...]:
+    """
+    Substance IDs of an ingredient, memoized in the shared verdict cache
+
+    Args:
+        ingredient: Raw ingredient string
+
+    Returns:
+        Tuple of substance IDs (see SubstanceIndex.substances_in)
+    """
+    ingredient_lower = ingredient.lower().strip()
+    return get_verdict_cache().get_field(
+        ingredient_lower, 'substances',
+        lambda: tuple(get_substance_index().substances_in(ingredient_lower))
+    )
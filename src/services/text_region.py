@@ -0,0 +1,161 @@
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .image_preprocessing import ImageSource, PreprocessingPipeline, image_dimensions
+
+logger = logging.getLogger(__name__)
+
+# A text-line box: (x, y, width, height) in analysis pixels
+Box = Tuple[int, int, int, int]
+
+
+def find_text_lines(gray: np.ndarray) -> List[Box]:
+    """
+    Find text lines with a morphological gradient
+
+    Args:
+        gray: Grayscale image
+
+    Returns:
+        Bounding boxes (x, y, width, height) of line-shaped groups of
+        character strokes
+    """
+    height, width = gray.shape
+    gradient = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3)))
+    _, strokes = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+
+    # Join the characters of a line, then drop isolated specks
+    joined = cv2.morphologyEx(strokes, cv2.MORPH_CLOSE,
+                              cv2.getStructuringElement(cv2.MORPH_RECT, (max(3, width // 80), 1)))
+    joined = cv2.morphologyEx(joined, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (3, 3)))
+
+    contours, _ = cv2.findContours(joined, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    lines = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if not (4 <= h <= height * 0.1 and w >= 2 * h):
+            continue
+        # Text lines are a mix of strokes and gaps, not solid shapes
+        fill = cv2.countNonZero(strokes[y:y + h, x:x + w]) / (w * h)
+        if 0.1 <= fill <= 0.9:
+            lines.append((x, y, w, h))
+    return lines
+
+
+class TextRegionLocator:
+    """Finds the densest block of text in a photo (usually the ingredient panel)
+
+    The photo is decoded to grayscale at low resolution. A morphological
+    gradient highlights character strokes, Otsu binarizes them and a wide
+    closing fuses characters into text lines. Line-shaped contours are kept
+    and grouped into blocks by dilating them by about one line height; the
+    block holding the most text-line area wins. Everything runs locally in
+    a few milliseconds, so the OCR upload can be cropped to that block.
+    """
+
+    def __init__(self, analysis_dimension: int = 1000, padding: float = 0.02,
+                 max_area_fraction: float = 0.8):
+        """
+        Initialize the locator
+
+        Args:
+            analysis_dimension: Long side (px) of the image the search runs on
+            padding: Margin added around the block, as a fraction of the
+                image size on each side
+            max_area_fraction: Blocks covering more of the image than this
+                are not worth cropping to
+        """
+        self.padding = padding
+        self.max_area_fraction = max_area_fraction
+        self._pipeline = PreprocessingPipeline(stages=[('downscale', {'max_dimension': analysis_dimension})])
+
+    def locate(self, image: ImageSource) -> Optional[Dict]:
+        """
+        Locate the densest text block of an image
+
+        Args:
+            image: Path or encoded bytes
+
+        Returns:
+            Dictionary with 'box' (left, top, right, bottom as fractions of
+            the image), 'pixel_box' ([x, y, width, height] in the original
+            image), 'image_size', 'line_count', 'area_fraction' and
+            'elapsed_ms'; None when no croppable block is found
+        """
+        start = time.perf_counter()
+        try:
+            gray, _ = self._pipeline.run(image)
+        except Exception as e:
+            logger.warning(f"Could not decode image for text region search: {str(e)}")
+            return None
+
+        height, width = gray.shape
+        lines = find_text_lines(gray)
+        block = self._densest_block(lines, gray.shape)
+        if block is None:
+            return None
+
+        x, y, w, h = block
+        pad_x, pad_y = self.padding * width, self.padding * height
+        box = (
+            max(0.0, (x - pad_x) / width),
+            max(0.0, (y - pad_y) / height),
+            min(1.0, (x + w + pad_x) / width),
+            min(1.0, (y + h + pad_y) / height)
+        )
+        area_fraction = (box[2] - box[0]) * (box[3] - box[1])
+        if area_fraction > self.max_area_fraction:
+            return None
+
+        # Header size is before EXIF rotation; the decoded image is after it
+        original = image_dimensions(image) or (width, height)
+        if (original[0] > original[1]) != (width > height):
+            original = (original[1], original[0])
+
+        region = {
+            'box': [round(value, 4) for value in box],
+            'pixel_box': [
+                round(box[0] * original[0]), round(box[1] * original[1]),
+                round((box[2] - box[0]) * original[0]), round((box[3] - box[1]) * original[1])
+            ],
+            'image_size': list(original),
+            'line_count': sum(1 for line in lines if self._contains(block, line)),
+            'area_fraction': round(area_fraction, 4),
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 2)
+        }
+        logger.info(f"Text region {region['pixel_box']} covers {area_fraction:.0%} of the image")
+        return region
+
+    def _densest_block(self, lines: List[Box], shape: Tuple[int, int]) -> Optional[Box]:
+        """Group text lines into blocks and return the one with the most text"""
+        if not lines:
+            return None
+
+        line_height = int(np.median([h for _, _, _, h in lines]))
+        mask = np.zeros(shape, dtype=np.uint8)
+        for x, y, w, h in lines:
+            mask[y:y + h, x:x + w] = 255
+        # Lines less than about a line height apart belong to the same block
+        mask = cv2.dilate(mask, cv2.getStructuringElement(cv2.MORPH_RECT, (3 * line_height, 2 * line_height)))
+
+        count, labels, blocks, _ = cv2.connectedComponentsWithStats(mask)
+        text_area = np.zeros(count)
+        for x, y, w, h in lines:
+            text_area[labels[y + h // 2, x + w // 2]] += w * h
+        text_area[0] = 0
+
+        best = int(np.argmax(text_area))
+        if text_area[best] == 0:
+            return None
+        x, y, w, h, _ = blocks[best]
+        return int(x), int(y), int(w), int(h)
+
+    @staticmethod
+    def _contains(block: Box, line: Box) -> bool:
+        """Whether a line's center lies inside a block"""
+        cx, cy = line[0] + line[2] / 2, line[1] + line[3] / 2
+        return block[0] <= cx <= block[0] + block[2] and block[1] <= cy <= block[1] + block[3]
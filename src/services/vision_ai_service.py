@@ -1,7 +1,12 @@
+import hashlib
+import json
 import os
 import sys
 import logging
-from typing import List, Dict, Optional, Tuple
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple, Union
 from google.cloud import vision
 from PIL import Image
 import io
@@ -11,6 +16,13 @@ import numpy as np
 # Add parent directory to path for config import
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
 from config import Config
+from .annotation_cache import AnnotationCache
+from .image_optimizer import UploadOptimizer
+from .image_preprocessing import ImageSource, PreprocessingPipeline
+from .ingredient_parser import IngredientParser
+from .ocr_backends import OCRCascadeClient, create_annotator_client
+from .ocr_layout import IngredientBlockLocator
+from .text_region import TextRegionLocator
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,14 +30,38 @@ logger = logging.getLogger(__name__)
 class VisionAIService:
     """Service for Google Cloud Vision AI integration"""
     
-    def __init__(self):
-        """Initialize the Vision AI client"""
+    def __init__(self, client: Optional[vision.ImageAnnotatorClient] = None,
+                 annotation_cache: Optional[AnnotationCache] = None):
+        """
+        Initialize the Vision AI client
+        
+        Args:
+            client: Annotator client to use instead of the one selected by
+                Config.OCR_BACKEND (e.g. a local fake)
+            annotation_cache: Response cache to use; by default the shared
+                on-disk cache is opened for the real clients of every
+                OCR_BACKEND (not for a client passed in, so fakes never
+                write into it)
+        """
         self.demo_mode = False
+        self.annotation_cache = annotation_cache
+        self.upload_optimizer = UploadOptimizer() if Config.UPLOAD_OPTIMIZATION else None
+        # Cropping re-encodes the upload, so it is part of upload optimization
+        self.text_locator = TextRegionLocator() if Config.UPLOAD_OPTIMIZATION and Config.TEXT_REGION_CROP else None
+        self.ingredient_parser = IngredientParser()
+        self.layout_locator = IngredientBlockLocator() if Config.OCR_LAYOUT else None
+        self.text_feature = (vision.Feature.Type.DOCUMENT_TEXT_DETECTION if Config.OCR_LAYOUT
+                             else vision.Feature.Type.TEXT_DETECTION)
         try:
-            if Config.GOOGLE_CLOUD_CREDENTIALS_PATH and Config.GOOGLE_CLOUD_CREDENTIALS_PATH.strip():
-                os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = Config.GOOGLE_CLOUD_CREDENTIALS_PATH
-                self.client = vision.ImageAnnotatorClient()
-                logger.info("Google Cloud Vision AI client initialized successfully")
+            if client is not None:
+                self.client = client
+            elif Config.OCR_BACKEND != 'vision':
+                self.client = create_annotator_client(Config.OCR_BACKEND, remote_factory=self._create_vision_client)
+                logger.info(f"Using local OCR backend '{Config.OCR_BACKEND}'")
+                self._open_annotation_cache()
+            elif Config.GOOGLE_CLOUD_CREDENTIALS_PATH and Config.GOOGLE_CLOUD_CREDENTIALS_PATH.strip():
+                self.client = self._create_vision_client()
+                self._open_annotation_cache()
             else:
                 logger.warning("No Google Cloud credentials found - running in demo mode")
                 self.demo_mode = True
@@ -35,12 +71,39 @@ class VisionAIService:
             self.demo_mode = True
             self.client = None
     
-    def detect_product_labels(self, image_path: str) -> List[Dict]:
+    def _open_annotation_cache(self):
+        """Open the shared on-disk response cache for a real client, whichever backend it is"""
+        if self.annotation_cache is None and Config.VISION_CACHE:
+            self.annotation_cache = AnnotationCache(namespace=self._cache_namespace())
+    
+    def _cache_namespace(self) -> str:
+        """Fingerprint of the settings that shape a cached response: features, cropping and upload encoding"""
+        optimizer = self.upload_optimizer
+        settings = {
+            'text_feature': self.text_feature.name,
+            'upload': ([optimizer.max_dimension, optimizer.grayscale, optimizer.image_format, optimizer.quality]
+                       if optimizer is not None else None),
+            'crop': [Config.TEXT_REGION_CONTEXT_DIMENSION, Config.TEXT_REGION_FRAME_TEXT]
+                    if self.text_locator is not None else None,
+            'backend': Config.OCR_BACKEND
+        }
+        return hashlib.blake2b(json.dumps(settings, sort_keys=True).encode(), digest_size=8).hexdigest()
+    
+    def _create_vision_client(self) -> Optional[vision.ImageAnnotatorClient]:
+        """Google Cloud Vision client from the configured credentials (None without them)"""
+        if not (Config.GOOGLE_CLOUD_CREDENTIALS_PATH and Config.GOOGLE_CLOUD_CREDENTIALS_PATH.strip()):
+            return None
+        os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = Config.GOOGLE_CLOUD_CREDENTIALS_PATH
+        client = vision.ImageAnnotatorClient()
+        logger.info("Google Cloud Vision AI client initialized successfully")
+        return client
+    
+    def detect_product_labels(self, image: ImageSource) -> List[Dict]:
         """
         Detect product labels and objects in the image
         
         Args:
-            image_path: Path to the image file
+            image: Path to the image file, or its encoded bytes
             
         Returns:
             List of detected labels with confidence scores
@@ -56,39 +119,19 @@ class VisionAIService:
             ]
         
         try:
-            with io.open(image_path, 'rb') as image_file:
-                content = image_file.read()
-            
-            image = vision.Image(content=content)
-            
-            # Perform label detection
-            response = self.client.label_detection(image=image)
-            labels = response.label_annotations
-            
-            if response.error.message:
-                raise Exception(f'Vision API error: {response.error.message}')
-            
-            detected_labels = []
-            for label in labels:
-                detected_labels.append({
-                    'description': label.description,
-                    'score': label.score,
-                    'confidence': label.score * 100
-                })
-            
-            logger.info(f"Detected {len(detected_labels)} labels in the image")
-            return detected_labels
+            response, _ = self._annotate(self._read_image(image), text=False)
+            return self._labels_from_response(response)
             
         except Exception as e:
             logger.error(f"Error detecting labels: {str(e)}")
             return []
     
-    def extract_text_from_image(self, image_path: str) -> Dict:
+    def extract_text_from_image(self, image: ImageSource) -> Dict:
         """
         Extract text from image using OCR
         
         Args:
-            image_path: Path to the image file
+            image: Path to the image file, or its encoded bytes
             
         Returns:
             Dictionary containing extracted text and confidence
@@ -114,106 +157,387 @@ class VisionAIService:
             }
         
         try:
-            with io.open(image_path, 'rb') as image_file:
-                content = image_file.read()
-            
-            image = vision.Image(content=content)
-            
-            # Perform text detection
-            response = self.client.text_detection(image=image)
-            texts = response.text_annotations
+            response, region = self._annotate(self._read_image(image), labels=False)
+            return self._text_info_from_response(response, region)
             
-            if response.error.message:
-                raise Exception(f'Vision API error: {response.error.message}')
-            
-            if not texts:
-                return {'text': '', 'confidence': 0, 'ingredients': []}
-            
-            # The first text annotation contains the entire text
-            full_text = texts[0].description
+        except Exception as e:
+            logger.error(f"Error extracting text: {str(e)}")
+            return {'text': '', 'confidence': 0, 'ingredients': []}
+    
+    def annotate_image(self, content: Union[bytes, memoryview]) -> vision.AnnotateImageResponse:
+        """
+        Run label and text detection on an image in a single Vision request
+        
+        Args:
+            content: Encoded image bytes (any bytes-like buffer)
             
-            # Extract potential ingredients
-            ingredients = self._extract_ingredients_from_text(full_text)
+        Returns:
+            Vision API response carrying both label and text annotations
+        """
+        return self._annotate(content)[0]
+    
+    def _annotate(self, content: Union[bytes, memoryview], labels: bool = True,
+                  text: bool = True) -> Tuple[vision.AnnotateImageResponse, Optional[Dict]]:
+        """
+        annotate_image, also returning the text region OCR was cropped to
+        
+        With labels or text off, only the other feature is requested. A
+        cached combined response still answers such a request, but its own
+        partial response is not cached.
+        """
+        cached, key = self.annotation_cache.get(content) if self.annotation_cache is not None else (None, None)
+        if cached is not None:
+            return cached
+        if not (labels and text):
+            key = None
+        
+        requests, region = self._annotate_requests(content, labels, text)
+        if len(requests) == 1:
+            response = self.client.annotate_image(requests[0])
+        else:
+            response = self._merge_responses(self._batch_annotate(requests, [0] * len(requests)).responses, region)
+        
+        if response.error.message:
+            raise Exception(f'Vision API error: {response.error.message}')
+        
+        if key is not None:
+            self.annotation_cache.put(key, response, region)
+        return response, region
+    
+    def annotate_images(self, images: Iterable[ImageSource],
+                        batch_size: int = Config.VISION_BATCH_SIZE,
+                        max_in_flight: int = Config.VISION_MAX_IN_FLIGHT) -> Iterator[vision.AnnotateImageResponse]:
+        """
+        Annotate many images with batch_annotate_images requests
+        
+        Images are grouped into requests of up to batch_size images and up to
+        max_in_flight requests run concurrently. Images are only read when
+        their batch is sent, so arbitrarily long inputs stream through.
+        
+        Args:
+            images: Image paths or encoded image bytes
+            batch_size: Images per request (the Vision API accepts up to 16)
+            max_in_flight: Requests kept running at once
             
-            result = {
-                'text': full_text,
-                'confidence': texts[0].score if hasattr(texts[0], 'score') else 0.9,
-                'ingredients': ingredients,
-                'word_count': len(full_text.split())
-            }
+        Returns:
+            Generator of annotation responses in input order; a failed image
+            or request yields a response whose error message is set
+        """
+        for response, _ in self._annotate_stream(images, batch_size, max_in_flight):
+            yield response
+    
+    def _annotate_stream(self, images: Iterable[ImageSource], batch_size: int,
+                         max_in_flight: int) -> Iterator[Tuple[vision.AnnotateImageResponse, Optional[Dict]]]:
+        """annotate_images, also yielding the text region of each image"""
+        images = iter(images)
+        with ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix='vision-batch') as pool:
+            in_flight = deque()
+            for batch in iter(lambda: list(islice(images, batch_size)), []):
+                in_flight.append(pool.submit(self._annotate_batch, batch))
+                if len(in_flight) >= max_in_flight:
+                    yield from in_flight.popleft().result()
+            
+            while in_flight:
+                yield from in_flight.popleft().result()
+    
+    def detect_product_info_batch(self, images: Iterable[ImageSource],
+                                  batch_size: int = Config.VISION_BATCH_SIZE,
+                                  max_in_flight: int = Config.VISION_MAX_IN_FLIGHT) -> Iterator[Dict]:
+        """
+        Product information for many images, streamed in input order
+        
+        Args:
+            images: Image paths or encoded image bytes
+            batch_size: Images per batch_annotate_images request
+            max_in_flight: Requests kept running at once
             
-            logger.info(f"Extracted {len(ingredients)} potential ingredients from text")
-            return result
+        Returns:
+            Generator of dictionaries shaped like detect_product_info results
+        """
+        if self.demo_mode:
+            for image in images:
+                yield self.detect_product_info(image)
+            return
+        
+        for response, region in self._annotate_stream(images, batch_size, max_in_flight):
+            if response.error.message:
+                logger.error(f"Error annotating image: Vision API error: {response.error.message}")
+                labels, text_info = [], {'text': '', 'confidence': 0, 'ingredients': []}
+            else:
+                labels = self._labels_from_response(response)
+                text_info = self._text_info_from_response(response, region)
+            yield self._product_info(labels, text_info)
+    
+    def _annotate_batch(self, batch: List[ImageSource]) -> List[Tuple[vision.AnnotateImageResponse, Optional[Dict]]]:
+        """Send one batch of images, one (response, text region) per image"""
+        try:
+            contents = [self._read_image(image) for image in batch]
+            lookups = [
+                self.annotation_cache.get(content) if self.annotation_cache is not None else (None, None)
+                for content in contents
+            ]
+            # Cached images send no requests
+            prepared = [
+                self._annotate_requests(content) if cached is None else ([], None)
+                for content, (cached, _) in zip(contents, lookups)
+            ]
             
+            # Cropped images take two requests; stay within the per-call limit without
+            # splitting an image's requests across calls (the cascade escalates them together)
+            responses = []
+            requests: List[vision.AnnotateImageRequest] = []
+            groups: List[int] = []
+            for image, (image_requests, _) in enumerate(prepared):
+                if requests and len(requests) + len(image_requests) > Config.VISION_BATCH_SIZE:
+                    responses.extend(self._batch_annotate(requests, groups).responses)
+                    requests, groups = [], []
+                requests.extend(image_requests)
+                groups.extend([image] * len(image_requests))
+            if requests:
+                responses.extend(self._batch_annotate(requests, groups).responses)
+            
+            results = []
+            position = 0
+            for (cached, key), (image_requests, region) in zip(lookups, prepared):
+                if cached is not None:
+                    results.append(cached)
+                    continue
+                image_responses = responses[position:position + len(image_requests)]
+                position += len(image_requests)
+                response = (image_responses[0] if len(image_responses) == 1
+                            else self._merge_responses(image_responses, region))
+                if key is not None:
+                    self.annotation_cache.put(key, response, region)
+                results.append((response, region))
+            return results
         except Exception as e:
-            logger.error(f"Error extracting text: {str(e)}")
-            return {'text': '', 'confidence': 0, 'ingredients': []}
+            logger.error(f"Error in batch annotation of {len(batch)} images: {str(e)}")
+            return [(vision.AnnotateImageResponse(error={'message': str(e)}), None) for _ in batch]
+    
+    def _batch_annotate(self, requests: List[vision.AnnotateImageRequest],
+                        groups: List[int]) -> vision.BatchAnnotateImagesResponse:
+        """batch_annotate_images, telling the OCR cascade which requests belong to one image"""
+        if isinstance(self.client, OCRCascadeClient):
+            # Of an image sent as two requests, the one asking for labels is the whole-frame
+            # thumbnail: its text only supplies the brand and is not scored
+            sizes = Counter(groups)
+            scored = [sizes[group] == 1 or not any(feature.type_ == vision.Feature.Type.LABEL_DETECTION
+                                                   for feature in request.features)
+                      for request, group in zip(requests, groups)]
+            return self.client.batch_annotate_images(requests=requests, groups=groups, scored=scored)
+        return self.client.batch_annotate_images(requests=requests)
     
-    def detect_product_info(self, image_path: str) -> Dict:
+    def _annotate_requests(self, content: Union[bytes, memoryview], labels: bool = True,
+                           text: bool = True) -> Tuple[List[vision.AnnotateImageRequest], Optional[Dict]]:
+        """
+        Vision requests for one image, shrunk for upload
+        
+        Normally one label + text detection request (document text detection
+        when OCR_LAYOUT is set). When a text region is found, text detection
+        gets the cropped region and label detection a thumbnail of the whole
+        frame, as two requests. With TEXT_REGION_FRAME_TEXT the thumbnail
+        also gets plain text detection so the brand can be read from the
+        whole frame (a third billable feature per image).
+        
+        Args:
+            content: Encoded image bytes
+            labels: Request label detection
+            text: Request text detection
+        
+        Returns:
+            Tuple of (requests, text region or None)
+        """
+        region = self.text_locator.locate(content) if text and self.text_locator is not None else None
+        if region is not None:
+            try:
+                text_content, label_content, _ = self.upload_optimizer.optimize_region(
+                    content, region['box'], Config.TEXT_REGION_CONTEXT_DIMENSION if labels else None
+                )
+                text_request = self._image_request(text_content, self.text_feature)
+                if not labels:
+                    return [text_request], region
+                thumbnail_features = [vision.Feature.Type.LABEL_DETECTION]
+                if Config.TEXT_REGION_FRAME_TEXT:
+                    thumbnail_features.append(vision.Feature.Type.TEXT_DETECTION)
+                return [self._image_request(label_content, *thumbnail_features), text_request], region
+            except Exception as e:
+                logger.warning(f"Could not crop image to its text region, sending whole frame: {str(e)}")
+        
+        if self.upload_optimizer is not None:
+            content, _ = self.upload_optimizer.optimize(content, labels=labels)
+        
+        features = []
+        if labels:
+            features.append(vision.Feature.Type.LABEL_DETECTION)
+        if text:
+            features.append(self.text_feature)
+        return [self._image_request(content, *features)], None
+    
+    def _image_request(self, content: Union[bytes, memoryview], *features) -> vision.AnnotateImageRequest:
+        """Annotate request for the given feature types"""
+        return vision.AnnotateImageRequest(
+            # The request message needs its own bytes; this is the only copy
+            image=vision.Image(content=content if isinstance(content, bytes) else bytes(content)),
+            features=[vision.Feature(type_=feature) for feature in features]
+        )
+    
+    def _merge_responses(self, responses: List[vision.AnnotateImageResponse],
+                         region: Dict) -> vision.AnnotateImageResponse:
+        """
+        One response from the label (thumbnail) and text (region) responses of an image
+        
+        The thumbnail's own text, when requested, is kept as
+        region['frame_text']: the crop only holds the ingredient list, not
+        the brand.
+        """
+        label_response, text_response = responses
+        error = label_response.error.message or text_response.error.message
+        if error:
+            return vision.AnnotateImageResponse(error={'message': error})
+        
+        if label_response.text_annotations:
+            region['frame_text'] = label_response.text_annotations[0].description
+        return vision.AnnotateImageResponse(
+            label_annotations=label_response.label_annotations,
+            text_annotations=text_response.text_annotations,
+            full_text_annotation=text_response.full_text_annotation
+        )
+    
+    def upload_stats(self) -> Dict:
+        """
+        Get the bytes and estimated latency saved by pre-upload optimization
+        
+        Returns:
+            Cumulative UploadOptimizer statistics (empty when disabled)
+        """
+        return self.upload_optimizer.stats() if self.upload_optimizer is not None else {}
+    
+    def cache_stats(self) -> Dict:
+        """
+        Get the hit statistics of the Vision response cache
+        
+        Returns:
+            Cumulative AnnotationCache statistics (empty when disabled)
+        """
+        return self.annotation_cache.stats() if self.annotation_cache is not None else {}
+    
+    def ocr_stats(self) -> Dict:
+        """
+        Get the escalation rate and per-tier latency of the OCR cascade
+        
+        Returns:
+            OCRCascadeClient statistics (empty for other backends)
+        """
+        return self.client.stats() if isinstance(self.client, OCRCascadeClient) else {}
+    
+    def _read_image(self, image: ImageSource) -> Union[bytes, memoryview]:
+        """Encoded bytes of an image; buffers pass through uncopied, paths are read once"""
+        if isinstance(image, (bytes, bytearray, memoryview)):
+            return image
+        with io.open(image, 'rb') as image_file:
+            return image_file.read()
+    
+    def _labels_from_response(self, response: vision.AnnotateImageResponse) -> List[Dict]:
+        """Label view of an annotation response"""
+        detected_labels = []
+        for label in response.label_annotations:
+            detected_labels.append({
+                'description': label.description,
+                'score': label.score,
+                'confidence': label.score * 100
+            })
+        
+        logger.info(f"Detected {len(detected_labels)} labels in the image")
+        return detected_labels
+    
+    def _text_info_from_response(self, response: vision.AnnotateImageResponse,
+                                 region: Optional[Dict] = None) -> Dict:
+        """OCR text view of an annotation response (region: the crop OCR ran on)"""
+        texts = response.text_annotations
+        
+        if not texts:
+            return {'text': '', 'confidence': 0, 'ingredients': [], 'text_region': region}
+        
+        # The first text annotation contains the entire text
+        full_text = texts[0].description
+        
+        # Extract potential ingredients, from the ingredient block alone when the layout shows it
+        block = self.layout_locator.locate(response) if self.layout_locator is not None else None
+        parsed = self.ingredient_parser.parse(block['text']) if block is not None else None
+        if parsed is None or not parsed['ingredients']:
+            parsed = self.ingredient_parser.parse(full_text)
+        ingredients = self.ingredient_parser.ingredient_names(parsed)
+        
+        result = {
+            'text': full_text,
+            'confidence': texts[0].score if hasattr(texts[0], 'score') else 0.9,
+            'ingredients': ingredients,
+            'ingredient_tree': parsed['ingredients'],
+            'allergen_statement': parsed['contains'],
+            'may_contain': parsed['may_contain'],
+            'word_count': len(full_text.split()),
+            'text_region': region,
+            'ingredient_block': block
+        }
+        
+        logger.info(f"Extracted {len(ingredients)} potential ingredients from text")
+        return result
+    
+    def detect_product_info(self, image: ImageSource) -> Dict:
         """
         Comprehensive product detection combining labels and text
         
         Args:
-            image_path: Path to the image file
+            image: Path to the image file, or its encoded bytes
             
         Returns:
             Dictionary with product information
         """
         try:
-            # Get labels and text simultaneously
-            labels = self.detect_product_labels(image_path)
-            text_info = self.extract_text_from_image(image_path)
-            
-            # Determine product type
-            product_type = self._determine_product_type(labels)
-            
-            # Extract brand information
-            brand = self._extract_brand_from_text(text_info['text'])
+            # Get labels and text from one Vision round-trip
+            if self.demo_mode:
+                labels = self.detect_product_labels(image)
+                text_info = self.extract_text_from_image(image)
+            else:
+                labels, text_info = self._labels_and_text(self._read_image(image))
             
-            return {
-                'product_type': product_type,
-                'brand': brand,
-                'labels': labels,
-                'text_info': text_info,
-                'ingredients': text_info['ingredients'],
-                'confidence': text_info['confidence']
-            }
+            return self._product_info(labels, text_info)
             
         except Exception as e:
             logger.error(f"Error detecting product info: {str(e)}")
             return {}
     
-    def _extract_ingredients_from_text(self, text: str) -> List[str]:
-        """Extract ingredients from OCR text"""
-        ingredients = []
+    def _product_info(self, labels: List[Dict], text_info: Dict) -> Dict:
+        """Combine labels and OCR text into product information"""
+        # Determine product type
+        product_type = self._determine_product_type(labels)
         
-        # Common patterns for ingredient lists
-        ingredient_keywords = [
-            'ingredients:', 'ingredients', 'contains:', 'contains',
-            'ingrédients:', 'composition:', 'composition'
-        ]
+        # Extract brand information, from the whole frame when OCR ran on a crop
+        region = text_info.get('text_region') or {}
+        brand = self._extract_brand_from_text(region.get('frame_text') or text_info['text'])
+        
+        return {
+            'product_type': product_type,
+            'brand': brand,
+            'labels': labels,
+            'text_info': text_info,
+            'ingredients': text_info['ingredients'],
+            'confidence': text_info['confidence']
+        }
+    
+    def _labels_and_text(self, content: Union[bytes, memoryview]) -> Tuple[List[Dict], Dict]:
+        """Labels and OCR text of an image from a single annotate request"""
+        try:
+            response, region = self._annotate(content)
+        except Exception as e:
+            logger.error(f"Error annotating image: {str(e)}")
+            return [], {'text': '', 'confidence': 0, 'ingredients': []}
         
-        text_lower = text.lower()
-        
-        # Find ingredient section
-        for keyword in ingredient_keywords:
-            if keyword in text_lower:
-                # Extract text after the keyword
-                start_idx = text_lower.find(keyword) + len(keyword)
-                ingredient_text = text[start_idx:].strip()
-                
-                # Split by common separators
-                separators = [',', ';', '\n', '•', '·']
-                for sep in separators:
-                    if sep in ingredient_text:
-                        ingredients = [ing.strip() for ing in ingredient_text.split(sep)]
-                        break
-                
-                # Clean up ingredients
-                ingredients = [ing for ing in ingredients if ing and len(ing) > 1]
-                break
-        
-        return ingredients[:20]  # Limit to first 20 ingredients
+        return self._labels_from_response(response), self._text_info_from_response(response, region)
+    
+    def _extract_ingredients_from_text(self, text: str) -> List[str]:
+        """Extract ingredients from OCR text (see IngredientParser.ingredient_names)"""
+        return self.ingredient_parser.ingredient_names(self.ingredient_parser.parse(text))
     
     def _determine_product_type(self, labels: List[Dict]) -> str:
         """Determine if product is food or personal care"""
@@ -248,35 +572,31 @@ class VisionAIService:
         
         return "Unknown"
     
-    def preprocess_image(self, image_path: str) -> str:
+    def preprocess_image(self, image: ImageSource, preset: str = Config.PREPROCESSING_PRESET) -> Union[str, bytes]:
         """
         Preprocess image for better OCR results
         
         Args:
-            image_path: Path to the original image
+            image: Path to the original image, or its encoded bytes
+            preset: Preprocessing preset ('fast', 'balanced' or 'quality')
             
         Returns:
-            Path to the preprocessed image
+            Path to the preprocessed image when given a path; PNG-encoded
+            preprocessed image when given bytes (nothing is written to disk)
         """
         try:
-            # Read image
-            image = cv2.imread(image_path)
-            
-            # Convert to grayscale
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            
-            # Apply denoising
-            denoised = cv2.fastNlMeansDenoising(gray)
+            enhanced, timings = PreprocessingPipeline(preset).run(image)
+            logger.info(f"Preprocessed image with '{preset}' preset in {timings['total']:.0f} ms: {timings}")
             
-            # Enhance contrast
-            enhanced = cv2.equalizeHist(denoised)
+            if not isinstance(image, str):
+                return cv2.imencode('.png', enhanced)[1].tobytes()
             
             # Save preprocessed image
-            preprocessed_path = image_path.replace('.', '_preprocessed.')
+            preprocessed_path = image.replace('.', '_preprocessed.')
             cv2.imwrite(preprocessed_path, enhanced)
             
             return preprocessed_path
             
         except Exception as e:
             logger.error(f"Error preprocessing image: {str(e)}")
-            return image_path 
\ No newline at end of file
+            return image if isinstance(image, (str, bytes)) else bytes(image)
@@ -11,6 +11,7 @@ from typing import Dict, List
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
 from services.risk_analyzer import RiskAnalyzer
+from services.hazard_knowledge_base import get_knowledge_base
 from config import Config
 
 # Page configuration
@@ -624,7 +625,7 @@ class IngredientInsightApp:
         
         # User allergens with better styling
         st.sidebar.markdown("#### 🤧 Your Allergens")
-        allergen_options = Config.COMMON_ALLERGENS
+        allergen_options = get_knowledge_base().allergens()
         user_allergens = st.sidebar.multiselect(
             "Select allergens you're sensitive to:",
             options=allergen_options,
@@ -633,6 +634,13 @@ class IngredientInsightApp:
         )
         st.session_state.user_allergens = user_allergens
         
+        # Re-personalize the current result instead of re-analyzing the image
+        current_analysis = st.session_state.get('current_analysis')
+        if current_analysis and current_analysis.get('user_allergens') != user_allergens:
+            st.session_state.current_analysis = self.risk_analyzer.personalize_result(
+                current_analysis, user_allergens
+            )
+        
         if user_allergens:
             st.sidebar.success(f"✅ Monitoring {len(user_allergens)} allergen(s)")
         
@@ -722,7 +730,7 @@ class IngredientInsightApp:
         # Image upload with better styling
         uploaded_file = st.file_uploader(
             "Choose a product image",
-            type=['jpg', 'jpeg', 'png', 'bmp', 'tiff'],
+            type=sorted(extension.lstrip('.') for extension in Config.ALLOWED_EXTENSIONS),
             help="📸 Upload a clear photo showing the ingredients list",
             label_visibility="collapsed"
         )
@@ -761,6 +769,10 @@ class IngredientInsightApp:
                 # Analysis button with enhanced styling
                 if st.button("🔍 **Analyze Product**", type="primary", use_container_width=True):
                     self.analyze_product(uploaded_file)
+                elif st.session_state.get('current_upload') == uploaded_file.name and \
+                        st.session_state.get('current_analysis'):
+                    # Kept up to date with the sidebar allergens by render_sidebar
+                    self.display_analysis_results(st.session_state.current_analysis)
                 
                 # Additional options
                 st.markdown("**Quick Actions:**")
@@ -839,11 +851,6 @@ class IngredientInsightApp:
     def analyze_product(self, uploaded_file):
         """Analyze the uploaded product image"""
         try:
-            # Save uploaded file temporarily
-            temp_path = f"temp_{uploaded_file.name}"
-            with open(temp_path, "wb") as f:
-                f.write(uploaded_file.getvalue())
-            
             # Modern progress indicator
             progress_container = st.container()
             with progress_container:
@@ -868,20 +875,20 @@ class IngredientInsightApp:
                 # Get user allergens
                 user_allergens = st.session_state.get('user_allergens', [])
                 
-                # Analyze the product
-                result = self.risk_analyzer.analyze_product_image(temp_path, user_allergens)
+                # Analyze the product straight from the upload buffer (no temp file)
+                result = self.risk_analyzer.analyze_product_image(
+                    uploaded_file.getbuffer(), user_allergens, filename=uploaded_file.name
+                )
                 
                 status_text.markdown("**✅ Analysis complete!**")
                 progress_bar.progress(100)
                 
-                # Clean up temp file
-                os.remove(temp_path)
-                
                 # Store in session state
                 if 'analysis_history' not in st.session_state:
                     st.session_state.analysis_history = []
                 st.session_state.analysis_history.append(result)
                 st.session_state.current_analysis = result
+                st.session_state.current_upload = uploaded_file.name
                 
                 # Show success message
                 st.markdown("""
@@ -902,8 +909,6 @@ class IngredientInsightApp:
             
         except Exception as e:
             st.error(f"Analysis failed: {str(e)}")
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
     
     def run_demo_analysis(self):
         """Run a demo analysis with sample data"""
@@ -991,6 +996,7 @@ class IngredientInsightApp:
             'alerts': alerts,
             'summary': self.risk_analyzer._generate_summary(risk_analysis, alerts),
             'recommendations': self.risk_analyzer._generate_recommendations(risk_analysis, 'food'),
+            'user_allergens': list(user_allergens),
             'timestamp': datetime.now().isoformat(),
             'demo_mode': True
         }